@@ -5,6 +5,7 @@ import json
 from urllib.request import urlopen
 import pandas as pd
 import numpy as np
+from pandemic.helpers import save_trade_cube, load_trade_cube
 
 
 def nested_list(original_list, list_length):
@@ -97,14 +98,104 @@ def download_trade_data(hs_str, freq_str, year_country_dict, auth_code_str):
     return data
 
 
+def assemble_hs_cube(timesteps_list, trade_data, un_country_df, un_to_iso_dict):
+    """Assembles a timestep x country x country cube of import trade values
+    for all timesteps at once. Reporter, partner, and period codes are mapped
+    to cube indices and trade values are summed into place, so country pairs
+    with no downloaded data are zero. UN codes that share an ISO3 code are
+    mapped to the same index and summed.
+
+    Returns cube of trade values, timestep x country array flagging which
+    reporters had data, and list of ISO3 codes for the cube rows and columns.
+
+    Parameters
+    ----------
+    timesteps_list : list of int
+        list of timesteps downloaded, will use format YYYY or YYYYMM
+    trade_data: dataframe
+        dataframe of downloaded trade data
+    un_country_df: dataframe
+        dataframe with single column containing all UN country codes, used as template
+        for HS matrix
+    un_to_iso_dict: dict
+        dictionary crosswalk of UN to ISO3 codes
+    """
+    # Use crosswalk to give each ISO3 code a single row and column index.
+    # Duplicate ISO codes should only occur for a few historical cases -
+    # Germany, Viet Nam, Yemen - and are summed by sharing an index.
+    un_codes = un_country_df["UN"].astype(str).to_list()
+    iso_codes = list(dict.fromkeys(un_to_iso_dict[code] for code in un_codes))
+    iso_index = {iso: idx for idx, iso in enumerate(iso_codes)}
+    un_index = pd.Series(
+        {code: iso_index[un_to_iso_dict[code]] for code in un_codes}, dtype=int
+    )
+    period_index = pd.Series(range(len(timesteps_list)), index=timesteps_list)
+
+    periods = trade_data["period"].map(period_index)
+    reporters = trade_data["rtCode"].astype(int).astype(str).map(un_index)
+    partners = trade_data["ptCode"].astype(str).map(un_index)
+    keep = periods.notna() & reporters.notna() & partners.notna()
+    periods = periods[keep].astype(int).values
+    reporters = reporters[keep].astype(int).values
+    partners = partners[keep].astype(int).values
+
+    # Rows are importing reporters (destinations) and columns are exporting
+    # partners (origins) to match other model input data
+    hs_cube = np.zeros((len(timesteps_list), len(iso_codes), len(iso_codes)))
+    np.add.at(
+        hs_cube,
+        (periods, reporters, partners),
+        trade_data.loc[keep, "TradeValue"].fillna(0).values,
+    )
+    reported = np.zeros((len(timesteps_list), len(iso_codes)), dtype=bool)
+    reported[periods, reporters] = True
+
+    return hs_cube, reported, iso_codes
+
+
+def write_hs_cube(hs_str, hs_cube, timesteps_list, iso_codes, timesteps_to_write):
+    """Saves a matrix for each of the selected timesteps as CSVs and the full
+    cube as a single trade cube file (see pandemic.helpers.save_trade_cube).
+
+    Parameters
+    ----------
+    hs_str : str
+        HS commodity code, can be 2, 4, or 6 digits depending on desired
+        aggregation
+    hs_cube : numpy array
+        timestep x country x country cube of import trade values
+    timesteps_list : list of int
+        list of timesteps of the cube, will use format YYYY or YYYYMM
+    iso_codes : list
+        list of ISO3 codes for the cube rows and columns
+    timesteps_to_write : list of int
+        list of timesteps to save as CSVs
+    """
+    # create a directory to save downloaded data
+    if not os.path.exists(hs_str):
+        os.makedirs(hs_str)
+    for t, timestep in enumerate(timesteps_list):
+        if timestep not in timesteps_to_write:
+            continue
+        HS_matrix = pd.DataFrame(hs_cube[t], index=iso_codes, columns=iso_codes)
+        HS_matrix.to_csv(
+            hs_str + "/" + hs_str + "_" + str(timestep) + ".csv", index=True
+        )
+    save_trade_cube(
+        hs_str + "/" + hs_str + "_trades.npz", hs_cube, timesteps_list, iso_codes
+    )
+
+
 def save_hs_timestep_matrices(
     hs_str, timesteps_list, trade_data, un_country_df, un_to_iso_dict
 ):
-    """Loops over timesteps and creates country x country matrix of import
-    trade values. If no data were downloaded for a country pair, will add zeros and
-    print a message. Changes US codes to ISO3 codes in column, row names.
+    """Creates country x country matrices of import trade values for all
+    timesteps (see assemble_hs_cube). Country pairs with no downloaded data
+    are zero and a message is printed with the number of reporters without
+    data. Uses ISO3 codes in column, row names.
 
-    Saves a matrix for each timestep as CSVs.
+    Saves a matrix for each timestep as CSVs and the full cube as a single
+    trade cube file.
 
     Parameters
     ----------
@@ -122,74 +213,239 @@ def save_hs_timestep_matrices(
         dictionary crosswalk of UN to ISO3 codes
     """
     print(f"Saving HS{hs_str} matrices for each timestep...")
-    for timestep in timesteps_list:
-        timestep_data = trade_data[trade_data.period.eq(timestep)]
-        HS_matrix = un_country_df.copy()
-        for reporter in un_to_iso_dict.keys():
-            reporter_data = timestep_data[timestep_data.rtCode.eq(int(reporter))]
-            reporter_data = reporter_data[["ptCode", "TradeValue"]]
-            # if no data were downloaded for reporter/timestep, add column of
-            # zeros to commodity/year df and move to next country
-            if len(reporter_data) == 0:
-                HS_matrix = HS_matrix.assign(x=0)
-                HS_matrix.rename(columns={"x": reporter}, inplace=True)
-                print(
-                    "HS"
-                    + hs_str
-                    + " "
-                    + str(timestep)
-                    + " "
-                    + str(un_to_iso_dict[reporter])
-                    + ": no data"
-                )
-                continue
+    timesteps_list = list(timesteps_list)
+    hs_cube, reported, iso_codes = assemble_hs_cube(
+        timesteps_list, trade_data, un_country_df, un_to_iso_dict
+    )
+    for t, timestep in enumerate(timesteps_list):
+        print(
+            "HS"
+            + hs_str
+            + " "
+            + str(timestep)
+            + ": no data for "
+            + str(int((~reported[t]).sum()))
+            + " reporters"
+        )
+    write_hs_cube(hs_str, hs_cube, timesteps_list, iso_codes, timesteps_list)
 
-            # Merge to commodity/year df
-            HS_matrix = pd.merge(
-                HS_matrix,
-                reporter_data,
-                how="left",
-                left_on="UN",
-                right_on="ptCode",
-            )
-            HS_matrix.drop("ptCode", axis=1, inplace=True)
-            HS_matrix.rename(columns={"TradeValue": reporter}, inplace=True)
-            print(
-                "HS"
-                + hs_str
-                + " "
-                + str(timestep)
-                + " "
-                + str(un_to_iso_dict[reporter])
-                + ": finished"
-            )
 
-        # Use crosswalk to change UN country codes to ISO3
-        HS_matrix.fillna(0, inplace=True)
-        HS_matrix.rename(columns={"UN": "ISO"}, inplace=True)
-        HS_matrix.set_index("ISO", inplace=True)
-        HS_matrix.rename(mapper=un_to_iso_dict, inplace=True, axis=0)
-        HS_matrix.rename(mapper=un_to_iso_dict, inplace=True, axis=1)
-
-        # Check to see if there are any duplicate ISO codes in matrix
-        # Should only occur for a few historical cases - Germany, Viet Nam, Yemen.
-        # If so, group and sum any rows and columns with matching ISO codes.
-        if len(HS_matrix.columns.to_list()) != len(set(HS_matrix.columns.to_list())):
-            HS_matrix = HS_matrix.groupby("ISO", sort=False).sum()
-            HS_matrix = HS_matrix.transpose()
-            HS_matrix = HS_matrix.reset_index()
-            HS_matrix = HS_matrix.groupby("index", sort=False).sum().transpose()
-        assert len(HS_matrix.columns.to_list()) == len(set(HS_matrix.columns.to_list()))
-        # Tranpose matrix so that columns are exporting partners (origins) and
-        # rows are importing reporters (destinations) to match other model input data
-        HS_matrix = HS_matrix.transpose()
-        # create a directory to save downloaded data
-        if not os.path.exists(hs_str):
-            os.makedirs(hs_str)
-        HS_matrix.to_csv(
-            hs_str + "/" + hs_str + "_" + str(timestep) + ".csv", index=True
+def update_hs_timestep_matrices(
+    hs_str, timesteps_list, trade_data, un_country_df, un_to_iso_dict, changed
+):
+    """Updates the saved trade cube for an HS code with newly downloaded data.
+    Rows (reporters) of the changed reporter and year pairs are replaced with
+    the new trade values, timesteps not yet in the cube are added, and only
+    the matrices of affected timesteps are rewritten as CSVs. A row is
+    rebuilt from trade_data alone, so trade_data must include every UN
+    reporter mapped to the ISO3 code of a changed reporter (see
+    plan_hs_fetch).
+
+    Parameters
+    ----------
+    hs_str : str
+        HS commodity code, can be 2, 4, or 6 digits depending on desired
+        aggregation
+    timesteps_list : list of int
+        list of all timesteps requested, will use format YYYY or YYYYMM
+    trade_data: dataframe
+        dataframe of downloaded trade data for the changed reporters and years
+        and the reporters sharing their ISO3 codes
+    un_country_df: dataframe
+        dataframe with single column containing all UN country codes, used as template
+        for HS matrix
+    un_to_iso_dict: dict
+        dictionary crosswalk of UN to ISO3 codes
+    changed : dataframe
+        dataframe of changed UN reporter codes ("country") and years ("year")
+    """
+    print(f"Updating HS{hs_str} matrices for changed timesteps...")
+    timesteps_list = list(timesteps_list)
+    new_cube, unused_reported, iso_codes = assemble_hs_cube(
+        timesteps_list, trade_data, un_country_df, un_to_iso_dict
+    )
+    old_cube, old_timesteps, old_iso_codes = load_trade_cube(
+        hs_str + "/" + hs_str + "_trades.npz"
+    )
+    if old_iso_codes != iso_codes:
+        raise ValueError(
+            f"Saved HS{hs_str} trade cube countries do not match the crosswalk, "
+            "download all data again instead of updating"
         )
 
+    # Start from saved matrices, then replace reporter rows of changed years
+    hs_cube = np.zeros_like(new_cube)
+    old_index = {int(ts): t for t, ts in enumerate(old_timesteps)}
+    years = np.array([int(str(ts)[:4]) for ts in timesteps_list])
+    timesteps_to_write = []
+    for t, timestep in enumerate(timesteps_list):
+        if timestep in old_index:
+            hs_cube[t] = old_cube[old_index[timestep]]
+        else:
+            timesteps_to_write.append(timestep)
+    for country, year in zip(changed["country"], changed["year"]):
+        row = iso_codes.index(un_to_iso_dict[str(country)])
+        year_idx = np.flatnonzero(years == int(year))
+        hs_cube[year_idx, row, :] = new_cube[year_idx, row, :]
+        timesteps_to_write.extend(timesteps_list[t] for t in year_idx)
+
+    timesteps_to_write = sorted(set(timesteps_to_write))
+    print(f"HS{hs_str}: rewriting {len(timesteps_to_write)} timesteps")
+    write_hs_cube(hs_str, hs_cube, timesteps_list, iso_codes, timesteps_to_write)
+
+
+def get_data_availability():
+    """Reads the Comtrade data availability listing for HS commodity data.
+    Returns dataframe with one row per reporter ("r"), period ("ps") and
+    frequency ("freq"), including the date the data were published
+    ("publicationDate").
+    """
+    data_availability_url = urlopen(
+        "http://comtrade.un.org/api/refs/da/view?type=C&freq=all&ps=all&px=HS"
+    )
+    data_availability_raw = json.loads(data_availability_url.read().decode())
+    data_availability_url.close()
+    data_availability = pd.json_normalize(data_availability_raw)
+    data_availability["r"] = data_availability["r"].astype(str)
+    data_availability["ps"] = data_availability["ps"].astype(str)
+
+    return data_availability
+
+
+def read_fetch_manifest(manifest_path):
+    """Reads the manifest of previously fetched reporter, period, frequency,
+    and HS code combinations with their Comtrade publication dates. Returns
+    an empty manifest if none has been saved yet.
+
+    Parameters
+    ----------
+    manifest_path : str
+        Location of manifest csv
+    """
+    if os.path.exists(manifest_path):
+        return pd.read_csv(manifest_path, dtype=str)
+    return pd.DataFrame(columns=["hs", "r", "ps", "freq", "publicationDate"])
+
+
+def changed_availability(data_availability, manifest, hs_str):
+    """Compares the current data availability listing to the manifest of
+    fetched data for an HS code. Returns the availability rows that have not
+    been fetched or have been republished since they were fetched.
+
+    Parameters
+    ----------
+    data_availability : dataframe
+        Comtrade data availability listing (see get_data_availability)
+    manifest : dataframe
+        manifest of previously fetched data (see read_fetch_manifest)
+    hs_str : str
+        HS commodity code, can be 2, 4, or 6 digits depending on desired
+        aggregation
+    """
+    keys = ["r", "ps", "freq", "publicationDate"]
+    available = data_availability[keys].astype(str)
+    fetched = manifest.loc[manifest["hs"] == hs_str, keys].astype(str)
+    compared = available.merge(fetched.drop_duplicates(), how="left", indicator=True)
+
+    return available[(compared["_merge"] == "left_only").values]
+
+
+def update_fetch_manifest(manifest, fetched, hs_str, manifest_path):
+    """Records fetched availability rows for an HS code in the manifest,
+    replacing any earlier record of the same reporter, period and frequency,
+    and saves it as CSV. Returns the updated manifest.
+
+    Parameters
+    ----------
+    manifest : dataframe
+        manifest of previously fetched data (see read_fetch_manifest)
+    fetched : dataframe
+        availability rows fetched for the HS code
+    hs_str : str
+        HS commodity code, can be 2, 4, or 6 digits depending on desired
+        aggregation
+    manifest_path : str
+        Location of manifest csv
+    """
+    fetched = fetched[["r", "ps", "freq", "publicationDate"]].astype(str)
+    fetched.insert(0, "hs", hs_str)
+    manifest = pd.concat([manifest, fetched], ignore_index=True)
+    manifest = manifest.drop_duplicates(["hs", "r", "ps", "freq"], keep="last")
+    manifest.to_csv(manifest_path, index=False)
+
+    return manifest
+
+
+def plan_hs_fetch(
+    hs_str,
+    requested,
+    manifest,
+    use_annual_dict,
+    use_monthly_dict,
+    incremental,
+    un_to_iso_dict,
+):
+    """Determines which reporters and years to download for an HS code. For a
+    full download, all requested data are fetched. For an incremental
+    download of an HS code with a saved trade cube, only reporter and year
+    pairs with availability rows that are new or republished since the last
+    fetch (according to the manifest) are fetched, along with the other
+    reporters mapped to the same ISO3 code in those years.
+
+    Returns availability rows covered by the download, dataframe of changed
+    reporters ("country") and years ("year") or None for a full download, and
+    the annual and monthly year-country dictionaries to download.
+
+    Parameters
+    ----------
+    hs_str : str
+        HS commodity code, can be 2, 4, or 6 digits depending on desired
+        aggregation
+    requested : dataframe
+        Comtrade data availability rows of the requested countries and years
+    manifest : dataframe
+        manifest of previously fetched data (see read_fetch_manifest)
+    use_annual_dict: dict
+        specifies which countries to use annual data for which years
+    use_monthly_dict: dict
+        specifies which countries to use monthly data for which years
+    incremental : bool
+        Whether to only download data that are new or have been revised
+    un_to_iso_dict: dict
+        dictionary crosswalk of UN to ISO3 codes
+    """
+    if not incremental or not os.path.exists(hs_str + "/" + hs_str + "_trades.npz"):
+        return requested, None, use_annual_dict, use_monthly_dict
+
+    fetched = changed_availability(requested, manifest, hs_str)
+    changed = pd.DataFrame(
+        {"country": fetched["r"], "year": fetched["ps"].str[:4].astype(int)}
+    ).drop_duplicates()
+    # Reporters sharing an ISO3 code are summed into the same cube row, so
+    # all reporters mapped to the ISO3 code of a changed reporter are
+    # downloaded again to rebuild the whole row
+    changed_rows = set(
+        zip(changed["year"], [un_to_iso_dict[str(c)] for c in changed["country"]])
+    )
+    year_country_dicts = []
+    for year_country_dict in [use_annual_dict, use_monthly_dict]:
+        changed_dict = {}
+        for year, countries in year_country_dict.items():
+            countries = [
+                c
+                for c in countries
+                if (int(year), un_to_iso_dict[str(c)]) in changed_rows
+            ]
+            if len(countries) > 0:
+                changed_dict[year] = countries
+        year_country_dicts.append(changed_dict)
+    print(
+        f"HS{hs_str}: {len(fetched)} new or revised periods "
+        f"for {len(changed)} reporter years"
+    )
+
+    return fetched, changed, year_country_dicts[0], year_country_dicts[1]
+
 
 def query_comtrade(
     model_inputs_dir,
@@ -200,10 +456,14 @@ def query_comtrade(
     end_year,
     temporal_res,
     crosswalk_path,
+    incremental=False,
 ):
     """
     Runs trade data request and download process, including
-    review of data completeness.
+    review of data completeness. Fetched reporters, periods, and HS codes are
+    recorded with their Comtrade publication dates in a manifest
+    (comtrade_manifest_{temporal_res}.csv) so later incremental runs only
+    download and rebuild new or revised periods.
 
     Parameters
     ----------
@@ -225,6 +485,10 @@ def query_comtrade(
         temporal resolution of data, "A" for annual, "M" for monthly
     crosswalk_path : str
         Location of UN code to ISO3 code crosswalk csv
+    incremental : bool
+        Only download reporter and year pairs that are new or have been
+        revised since the last download recorded in the manifest, and only
+        rewrite the affected timestep matrices. Default is False.
 
     """
 
@@ -249,12 +513,11 @@ def query_comtrade(
     crosswalk_dict = pd.Series(crosswalk.ISO3.values, index=crosswalk.UN).to_dict()
 
     # Get data availability from Comtrade and compare to desired data
-    data_availability_url = urlopen(
-        "http://comtrade.un.org/api/refs/da/view?type=C&freq=all&ps=all&px=HS"
-    )
-    data_availability_raw = json.loads(data_availability_url.read().decode())
-    data_availability_url.close()
-    data_availability = pd.json_normalize(data_availability_raw)
+    data_availability = get_data_availability()
+    requested = data_availability[
+        data_availability["r"].isin(crosswalk.UN)
+        & data_availability["ps"].str[:4].isin([str(year) for year in years])
+    ]
 
     # Create summary of availability, tracking availability of annual,
     # and monthly (all 12 months, or less than 12)
@@ -337,6 +600,12 @@ def query_comtrade(
     use_annual_dict = use_annual.groupby("year")["country"].apply(list).to_dict()
     use_monthly_dict = use_monthly.groupby("year")["country"].apply(list).to_dict()
 
+    # Read record of previously fetched data
+    manifest_path = os.path.abspath(
+        model_inputs_dir + "/comtrade_manifest_" + temporal_res + ".csv"
+    )
+    manifest = read_fetch_manifest(manifest_path)
+
     # create a directory to save downloaded data
     if temporal_res == "A":
         if not os.path.exists(model_inputs_dir + "/annual"):
@@ -350,24 +619,45 @@ def query_comtrade(
     # loop over commodities, 1 at a time (could do more at once to speed it up)
     if temporal_res == "A":
         for hs in hs_list:
+            fetched, changed, annual_dict, monthly_dict = plan_hs_fetch(
+                str(hs),
+                requested,
+                manifest,
+                use_annual_dict,
+                use_monthly_dict,
+                incremental,
+                crosswalk_dict,
+            )
+            if len(fetched) == 0:
+                continue
             # Download either annual or monthly depending on availability
             freq = "A"
-            annual_data = download_trade_data(str(hs), freq, use_annual_dict, auth_code)
+            annual_data = download_trade_data(str(hs), freq, annual_dict, auth_code)
             freq = "M"
-            monthly_data = download_trade_data(
-                str(hs), freq, use_monthly_dict, auth_code
-            )
+            monthly_data = download_trade_data(str(hs), freq, monthly_dict, auth_code)
             # Sum monthly to get annual
-            monthly_data_agg = (
-                monthly_data.groupby(["yr", "rtCode", "ptCode"]).sum().reset_index()
-            )
-            annual_data = annual_data.append(monthly_data_agg)
+            if len(monthly_data) > 0:
+                monthly_data_agg = (
+                    monthly_data.groupby(["yr", "rtCode", "ptCode"]).sum().reset_index()
+                )
+                annual_data = annual_data.append(monthly_data_agg)
             # loop over timesteps (YYYY) and save a country x country matrix
             # per timestep per HS code as csv
             timesteps = years
-            save_hs_timestep_matrices(
-                str(hs), timesteps, annual_data, crosswalk[["UN"]], crosswalk_dict
-            )
+            if changed is None:
+                save_hs_timestep_matrices(
+                    str(hs), timesteps, annual_data, crosswalk[["UN"]], crosswalk_dict
+                )
+            else:
+                update_hs_timestep_matrices(
+                    str(hs),
+                    timesteps,
+                    annual_data,
+                    crosswalk[["UN"]],
+                    crosswalk_dict,
+                    changed,
+                )
+            manifest = update_fetch_manifest(manifest, fetched, str(hs), manifest_path)
 
     if temporal_res == "M":
         for hs in hs_list:
@@ -390,16 +680,27 @@ def query_comtrade(
                 for month in months:
                     timesteps.append(str(year) + month)
             timesteps = list(map(int, timesteps))
+            fetched, changed, annual_dict, monthly_dict = plan_hs_fetch(
+                str(hs),
+                requested,
+                manifest,
+                use_annual_dict,
+                use_monthly_dict,
+                incremental,
+                crosswalk_dict,
+            )
+            if len(fetched) == 0:
+                continue
             # Download either annual or monthly depending on availability
             freq = "M"
-            monthly_data = download_trade_data(
-                str(hs), freq, use_monthly_dict, auth_code
-            )
+            monthly_data = download_trade_data(str(hs), freq, monthly_dict, auth_code)
             freq = "A"
-            annual_data = download_trade_data(str(hs), freq, use_annual_dict, auth_code)
+            annual_data = download_trade_data(str(hs), freq, annual_dict, auth_code)
             # Split annual data into monthly by dividing by 12
             annual_split = pd.DataFrame()
             for month in months:
+                if len(annual_data) == 0:
+                    break
                 month_portion = annual_data.copy()
                 month_portion["TradeValue"] = month_portion["TradeValue"].apply(
                     lambda x: x / 12
@@ -410,9 +711,20 @@ def query_comtrade(
             monthly_data = monthly_data.append(annual_split)
             # loop over timesteps (YYYY or YYYYMM) and save a country x country matrix
             # per timestep per HS code as csv
-            save_hs_timestep_matrices(
-                str(hs), timesteps, monthly_data, crosswalk[["UN"]], crosswalk_dict
-            )
+            if changed is None:
+                save_hs_timestep_matrices(
+                    str(hs), timesteps, monthly_data, crosswalk[["UN"]], crosswalk_dict
+                )
+            else:
+                update_hs_timestep_matrices(
+                    str(hs),
+                    timesteps,
+                    monthly_data,
+                    crosswalk[["UN"]],
+                    crosswalk_dict,
+                    changed,
+                )
+            manifest = update_fetch_manifest(manifest, fetched, str(hs), manifest_path)
 
 
 # project_path = "H:/My drive/Projects/Pandemic"
@@ -0,0 +1,3 @@
+from pandemic.model import main
+
+main()
@@ -0,0 +1,326 @@
+"""
+PoPS Pandemic - Simulation
+
+Golden output harness used to check that alternative engines reproduce the
+reference (python backend) outputs of pandemic_multiple_time_steps on fixed,
+seeded synthetic inputs. Deterministic outputs are compared exactly or within
+a tolerance and stochastic outcomes are compared in distribution over many
+seeds. Golden fixtures are written and checked with, e.g.:
+
+    python -m pandemic.benchmarks.golden --write tests/golden
+    python -m pandemic.benchmarks.golden --check tests/golden --backend numba
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import argparse
+import logging
+import os
+
+import numpy as np
+from scipy import stats
+
+from pandemic.benchmarks.synthetic import model_parameters, synthetic_world
+from pandemic.model_equations import pandemic_multiple_time_steps
+
+# Fixed inputs of the golden fixtures
+GOLDEN_CASES = {
+    "monthly_no_lag": {"n_steps": 24, "monthly": True, "lag": None},
+    "monthly_static": {"n_steps": 24, "monthly": True, "lag": "static"},
+    "monthly_stochastic": {"n_steps": 24, "monthly": True, "lag": "stochastic"},
+    "annual_static": {"n_steps": 4, "monthly": False, "lag": "static"},
+}
+
+GOLDEN_WORLD = {"n_locations": 16, "trade_density": 0.5, "n_native": 2, "seed": 7}
+
+# Parameters updating model_parameters so that introductions occur in every
+# case (phi * w_phi * alpha <= 1 keeps establishment a probability)
+GOLDEN_PARAMETERS = {"alpha": 1.0, "beta": 0.02, "mu": 0.00001, "phi": 1}
+
+GOLDEN_SEED = 4
+
+CUBES = ["entry", "establishment", "introduction", "country_introduction"]
+
+
+def run_case(case, backend="python", seed=GOLDEN_SEED, **options):
+    """
+    Returns the outputs of pandemic_multiple_time_steps for a golden case.
+
+    Parameters
+    ----------
+    case : str
+        Name of the golden case (see GOLDEN_CASES)
+    backend : str
+        Pair evaluation backend (i.e., python, numpy, or numba). Default is
+        python.
+    seed : int
+        Random seed of the simulation. Default is GOLDEN_SEED.
+    **options
+        Other arguments of pandemic_multiple_time_steps (e.g., checkpoint_dir)
+
+    Returns
+    -------
+    outputs : tuple
+        The six outputs of pandemic_multiple_time_steps
+
+    """
+    settings = GOLDEN_CASES[case]
+    world = synthetic_world(
+        n_steps=settings["n_steps"], monthly=settings["monthly"], **GOLDEN_WORLD
+    )
+    parameters = model_parameters(world)
+    parameters.update(GOLDEN_PARAMETERS)
+
+    # silence the per time step log of the engine during the run only
+    logger = logging.getLogger("pandemic")
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        return pandemic_multiple_time_steps(
+            trades=world["trades"],
+            distances=world["distances"],
+            climate_similarities=world["climate_similarities"],
+            locations=world["locations"].copy(),
+            start_year=int(world["date_list"][0][:4]),
+            date_list=world["date_list"],
+            season_dict=world["season_dict"],
+            transmission_lag_type=settings["lag"],
+            time_infect_units="year",
+            time_infect=1,
+            gamma_shape=2,
+            gamma_scale=0.5,
+            backend=backend,
+            random_seed=seed,
+            **parameters,
+            **options,
+        )
+    finally:
+        logger.setLevel(level)
+
+
+def outputs_to_arrays(outputs):
+    """
+    Returns the outputs of pandemic_multiple_time_steps as a dictionary of
+    arrays that can be saved with numpy.savez.
+
+    Parameters
+    ----------
+    outputs : tuple
+        The six outputs of pandemic_multiple_time_steps
+
+    Returns
+    -------
+    arrays : dict
+        Dictionary of the entry, establishment, and introduction probability
+        and country introduction cubes, the presence, probability of
+        introduction, and infective time step of each location and time
+        step, and the origin, destination, and time step of each
+        introduction
+
+    """
+    locations, entry, establishment, introduction, origin_destination, intros = outputs
+    presence_cols = [c for c in locations.columns if c.startswith("Presence ")]
+    prob_cols = [
+        c for c in locations.columns if c.startswith("Probability of introduction ")
+    ]
+
+    return {
+        "entry": entry,
+        "establishment": establishment,
+        "introduction": introduction,
+        "country_introduction": intros,
+        "presence": locations[presence_cols].values.astype(bool),
+        "probability_of_introduction": locations[prob_cols].values.astype(float),
+        "infective": np.array(
+            ["" if v is None else str(v) for v in locations["Infective"]]
+        ),
+        "origin": origin_destination["Origin"].values.astype(str),
+        "destination": origin_destination["Destination"].values.astype(str),
+        "time_step": origin_destination["TS"].values.astype(str),
+    }
+
+
+def write_golden(directory):
+    """
+    Runs the reference (python backend) engine for each golden case and
+    saves its outputs to {case}.npz in a directory.
+
+    Parameters
+    ----------
+    directory : str
+        Directory path to save the golden fixtures
+
+    Returns
+    -------
+    None
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    for case in GOLDEN_CASES:
+        arrays = outputs_to_arrays(run_case(case, backend="python"))
+        np.savez_compressed(os.path.join(directory, f"{case}.npz"), **arrays)
+
+
+def compare_outputs(golden, outputs, rtol=1e-12, atol=1e-15):
+    """
+    Returns the result of each check of outputs against golden outputs.
+    Probabilities must be equal within a tolerance and introductions,
+    presence, and infective time steps must be exactly equal.
+
+    Parameters
+    ----------
+    golden : dict
+        Golden outputs (see outputs_to_arrays)
+    outputs : dict
+        Outputs to check (see outputs_to_arrays)
+    rtol : float
+        Relative tolerance of probabilities. Default is 1e-12.
+    atol : float
+        Absolute tolerance of probabilities. Default is 1e-15.
+
+    Returns
+    -------
+    checks : dict
+        Dictionary of check names and results (True if equal)
+
+    """
+    checks = {}
+    for key in [
+        "entry",
+        "establishment",
+        "introduction",
+        "probability_of_introduction",
+    ]:
+        checks[key] = golden[key].shape == outputs[key].shape and bool(
+            np.allclose(golden[key], outputs[key], rtol=rtol, atol=atol)
+        )
+    for key in [
+        "country_introduction",
+        "presence",
+        "infective",
+        "origin",
+        "destination",
+        "time_step",
+    ]:
+        checks[key] = bool(np.array_equal(golden[key], outputs[key]))
+
+    return checks
+
+
+def check_golden(directory, backend="python"):
+    """
+    Returns the result of each check of a backend against the golden
+    fixtures of each case.
+
+    Parameters
+    ----------
+    directory : str
+        Directory path of the golden fixtures (see write_golden)
+    backend : str
+        Pair evaluation backend (i.e., python, numpy, or numba). Default is
+        python.
+
+    Returns
+    -------
+    checks : dict
+        Dictionary of case names and dictionaries of check results (see
+        compare_outputs)
+
+    """
+    checks = {}
+    for case in GOLDEN_CASES:
+        with np.load(os.path.join(directory, f"{case}.npz")) as fixture:
+            golden = {key: fixture[key] for key in fixture.files}
+        outputs = outputs_to_arrays(run_case(case, backend=backend))
+        checks[case] = compare_outputs(golden, outputs)
+
+    return checks
+
+
+def compare_distributions(
+    case, backend, reference="python", seeds=range(100), seed_offset=1000000
+):
+    """
+    Returns distributional comparisons of stochastic outcomes of a backend
+    and the reference backend over many seeds: a two-sample Kolmogorov-Smirnov
+    test of the number of introductions per run and the largest difference
+    in the probability of presence of each location at the last time step,
+    relative to its binomial standard error. The backend is run with other
+    seeds than the reference, so the two samples come from independent
+    random number streams and the comparison checks the distribution of
+    outcomes rather than the exact match of compare_outputs (backends
+    drawing from the same streams give the same introductions).
+
+    Parameters
+    ----------
+    case : str
+        Name of the golden case (see GOLDEN_CASES)
+    backend : str
+        Pair evaluation backend to check
+    reference : str
+        Reference pair evaluation backend. Default is python.
+    seeds : iterable
+        Seeds of the runs of the reference backend. Default is range(100).
+    seed_offset : int
+        Offset added to seeds for the runs of the backend. Default is
+        1000000.
+
+    Returns
+    -------
+    comparison : dict
+        Dictionary of the KS statistic and p-value of the number of
+        introductions and the largest standardized difference (z) in
+        the final probability of presence
+
+    """
+    seeds = list(seeds)
+    runs = [(reference, seeds), (backend, [seed + seed_offset for seed in seeds])]
+    introductions = []
+    presence = []
+    for name, run_seeds in runs:
+        run_introductions = []
+        run_presence = []
+        for seed in run_seeds:
+            arrays = outputs_to_arrays(run_case(case, backend=name, seed=seed))
+            run_introductions.append(arrays["country_introduction"].sum())
+            run_presence.append(arrays["presence"][:, -1])
+        introductions.append(run_introductions)
+        presence.append(run_presence)
+
+    ks = stats.ks_2samp(introductions[0], introductions[1])
+    p_ref = np.mean(presence[0], axis=0)
+    p_new = np.mean(presence[1], axis=0)
+    pooled = (p_ref + p_new) / 2
+    se = np.sqrt(2 * pooled * (1 - pooled) / len(seeds))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(se > 0, np.abs(p_ref - p_new) / se, 0)
+
+    return {
+        "ks_statistic": float(ks.statistic),
+        "ks_pvalue": float(ks.pvalue),
+        "max_presence_z": float(z.max()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pandemic golden outputs")
+    parser.add_argument("--write", default=None, help="directory to write")
+    parser.add_argument("--check", default=None, help="directory to check")
+    parser.add_argument("--backend", default="python")
+    args = parser.parse_args()
+
+    if args.write is not None:
+        write_golden(args.write)
+    if args.check is not None:
+        for case, case_checks in check_golden(args.check, args.backend).items():
+            failed = [key for key, ok in case_checks.items() if not ok]
+            print(case, "OK" if not failed else f"FAILED: {', '.join(failed)}")
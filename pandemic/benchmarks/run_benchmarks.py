@@ -0,0 +1,344 @@
+"""
+PoPS Pandemic - Simulation
+
+Benchmarks of the model engine, input preparation, and output writing on
+synthetic worlds of increasing size. Results are written as JSON so they can
+be tracked and compared between versions, e.g.:
+
+    python -m pandemic.benchmarks.run_benchmarks --sizes 50 250 1000 5000
+        --output benchmark_results.json --previous old_results.json
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from pandemic.benchmarks.synthetic import model_parameters, synthetic_world
+from pandemic.ecological_calculations import create_climate_similarities_matrix
+from pandemic.generate_trade_forecasts import create_trade_arrays
+from pandemic.helpers import active_location_pairs, trade_normalization_bounds
+from pandemic.model_equations import (
+    pandemic_multiple_time_steps,
+    pandemic_single_time_step,
+)
+from pandemic.output_files import create_model_dirs, save_model_output
+from pandemic.random_streams import create_generator
+from pandemic.time_steps import infective_months
+
+BENCHMARK_SIZES = [50, 250, 1000, 5000]
+
+# Largest number of locations run by default for each benchmark; larger
+# sizes are skipped (pure Python loops or memory use grow with n x n x t)
+MAX_LOCATIONS = {
+    "pandemic_single_time_step[python]": 250,
+    "pandemic_single_time_step[numpy]": 5000,
+    "pandemic_single_time_step[numba]": 5000,
+    "pandemic_multiple_time_steps[numpy]": 1000,
+    "create_climate_similarities_matrix": 250,
+    "create_trade_arrays": 1000,
+    "save_model_output": 1000,
+}
+
+
+def time_call(function, repeat=3):
+    """
+    Returns the shortest wall time of repeated calls of a function.
+
+    Parameters
+    ----------
+    function : callable
+        Function called without arguments
+    repeat : int
+        Number of calls. Default is 3.
+
+    Returns
+    -------
+    seconds : float
+        Shortest wall time (seconds)
+
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def single_time_step_benchmark(world, backend):
+    """
+    Returns a function running one monthly time step of a synthetic world
+    with the given pair evaluation backend.
+    """
+    locations = world["locations"]
+    trades = world["trades"]
+    min_Tc, max_Tc = trade_normalization_bounds(trades, world["date_list"])
+    infective = infective_months(locations["Infective"])
+    pairs = active_location_pairs(
+        np.flatnonzero(locations["Presence"].values),
+        locations["Host Percent Area"].values > 0,
+    )
+
+    def run():
+        pandemic_single_time_step(
+            trade=trades[0],
+            distances=world["distances"],
+            locations=locations.copy(),
+            locations_list=None,
+            climate_similarities=world["climate_similarities"],
+            min_Tc=min_Tc[0],
+            max_Tc=max_Tc[0],
+            time_step=world["date_list"][0],
+            season_dict=world["season_dict"],
+            transmission_lag_type="static",
+            time_infect_units="year",
+            time_infect=1,
+            gamma_shape=None,
+            gamma_scale=None,
+            backend=backend,
+            pairs=pairs,
+            infective=infective.copy(),
+            rng=create_generator(0),
+            **model_parameters(world),
+        )
+
+    # compile the Numba kernel before timing
+    if backend == "numba":
+        run()
+
+    return run
+
+
+def multiple_time_steps_benchmark(world, backend):
+    """
+    Returns a function running all time steps of a synthetic world with the
+    given pair evaluation backend.
+    """
+
+    def run():
+        return pandemic_multiple_time_steps(
+            trades=world["trades"],
+            distances=world["distances"],
+            climate_similarities=world["climate_similarities"],
+            locations=world["locations"].copy(),
+            start_year=int(world["date_list"][0][:4]),
+            date_list=world["date_list"],
+            season_dict=world["season_dict"],
+            transmission_lag_type="static",
+            time_infect_units="year",
+            time_infect=1,
+            gamma_shape=None,
+            gamma_scale=None,
+            backend=backend,
+            random_seed=0,
+            **model_parameters(world),
+        )
+
+    return run
+
+
+def trade_arrays_benchmark(world, directory):
+    """
+    Returns a function creating a one year trade forecast from trade CSV
+    files of a synthetic world.
+    """
+    codes = world["locations"]["ISO3"]
+    list_of_csvs = []
+    for t, ts in enumerate(world["date_list"]):
+        path = os.path.join(directory, f"trades_{ts}.csv")
+        pd.DataFrame(world["trades"][t], index=codes, columns=codes).to_csv(path)
+        list_of_csvs.append(path)
+
+    def run():
+        create_trade_arrays(list_of_csvs, number_forecast_years=1, random_seed=0)
+
+    return run
+
+
+def save_output_benchmark(world, directory):
+    """
+    Returns a function saving the main output and probability of
+    introduction matrices of a synthetic world run.
+    """
+    output = multiple_time_steps_benchmark(world, "numpy")()
+    codes = world["locations"]["ISO3"]
+    example_trade_matrix = pd.DataFrame(world["trades"][0], index=codes, columns=codes)
+    create_model_dirs(
+        outpath=directory + "/",
+        write_intro_probs=True,
+        output_dict={
+            "prob_entry": "probability_of_entry",
+            "prob_intro": "probability_of_introduction",
+            "prob_est": "probability_of_establishment",
+            "country_introduction": "country_introduction",
+        },
+    )
+
+    def run():
+        save_model_output(
+            model_output_object=output,
+            example_trade_matrix=example_trade_matrix,
+            outpath=directory,
+            date_list=world["date_list"],
+            write_intro_probs=True,
+        )
+
+    return run
+
+
+def run_benchmarks(sizes=None, n_steps=3, repeat=3, max_locations=None):
+    """
+    Returns benchmark results for synthetic worlds of each size.
+
+    Parameters
+    ----------
+    sizes : list
+        Numbers of locations (n) to benchmark. Default is BENCHMARK_SIZES.
+    n_steps : int
+        Number of monthly time steps of the synthetic worlds. Default is 3.
+    repeat : int
+        Number of calls of each benchmark; the shortest time is kept.
+        Default is 3.
+    max_locations : dict
+        Largest number of locations run for each benchmark, updating
+        MAX_LOCATIONS. Default is None.
+
+    Returns
+    -------
+    results : dict
+        Dictionary of run metadata and a list of results with the benchmark
+        name, number of locations, and seconds (None if skipped)
+
+    """
+    sizes = BENCHMARK_SIZES if sizes is None else sizes
+    limits = dict(MAX_LOCATIONS)
+    if max_locations is not None:
+        limits.update(max_locations)
+
+    # keep engine progress messages out of the timings
+    logging.getLogger("pandemic").setLevel(logging.WARNING)
+
+    results = []
+    for n in sizes:
+        world = synthetic_world(n, n_steps, n_native=max(1, n // 10))
+        for name, limit in limits.items():
+            seconds = None
+            if n <= limit:
+                backend = name[name.find("[") + 1 : -1]
+                with tempfile.TemporaryDirectory() as directory:
+                    if name.startswith("pandemic_single_time_step"):
+                        function = single_time_step_benchmark(world, backend)
+                    elif name.startswith("pandemic_multiple_time_steps"):
+                        function = multiple_time_steps_benchmark(world, backend)
+                    elif name == "create_climate_similarities_matrix":
+
+                        def function():
+                            create_climate_similarities_matrix(
+                                world["distances"], world["locations"]
+                            )
+
+                    elif name == "create_trade_arrays":
+                        function = trade_arrays_benchmark(world, directory)
+                    else:
+                        function = save_output_benchmark(world, directory)
+                    seconds = time_call(function, repeat)
+            results.append({"benchmark": name, "n": n, "seconds": seconds})
+            print(f"{name:40s} n={n:5d} ", "skipped" if seconds is None else seconds)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "n_steps": n_steps,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_results(previous, current, tolerance=1.25):
+    """
+    Returns the benchmarks that are slower than in a previous run.
+
+    Parameters
+    ----------
+    previous : dict
+        Previous benchmark results (see run_benchmarks)
+    current : dict
+        Current benchmark results (see run_benchmarks)
+    tolerance : float
+        Ratio of current to previous time above which a benchmark is
+        reported as a regression. Default is 1.25.
+
+    Returns
+    -------
+    regressions : list
+        List of dictionaries with the benchmark name, number of locations,
+        previous and current seconds, and their ratio
+
+    """
+    before = {
+        (r["benchmark"], r["n"]): r["seconds"]
+        for r in previous["results"]
+        if r["seconds"]
+    }
+    regressions = []
+    for r in current["results"]:
+        key = (r["benchmark"], r["n"])
+        if r["seconds"] and key in before and r["seconds"] > tolerance * before[key]:
+            regressions.append(
+                {
+                    "benchmark": r["benchmark"],
+                    "n": r["n"],
+                    "previous": before[key],
+                    "current": r["seconds"],
+                    "ratio": r["seconds"] / before[key],
+                }
+            )
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Pandemic model")
+    parser.add_argument("--sizes", type=int, nargs="+", default=BENCHMARK_SIZES)
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--previous", default=None)
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.sizes, n_steps=args.steps, repeat=args.repeat)
+    with open(args.output, "w") as file:
+        json.dump(current, file, indent=4)
+
+    if args.previous is not None:
+        with open(args.previous) as file:
+            previous = json.load(file)
+        for regression in compare_results(previous, current):
+            print(
+                f"REGRESSION {regression['benchmark']} n={regression['n']}: "
+                f"{regression['previous']:.4f}s -> {regression['current']:.4f}s"
+            )
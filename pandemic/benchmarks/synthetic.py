@@ -0,0 +1,218 @@
+"""
+PoPS Pandemic - Simulation
+
+Module containing a generator of synthetic model inputs (countries, trade,
+distances, and climate similarities) for any number of locations and time
+steps, used by the benchmarks and the golden output harness.
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import numpy as np
+import pandas as pd
+
+# Koppen-Geiger climate classes used by create_climate_similarities_matrix
+KG_CODES = [
+    "Af",
+    "Am",
+    "Aw",
+    "BWh",
+    "BWk",
+    "BSh",
+    "BSk",
+    "Csa",
+    "Csb",
+    "Csc",
+    "Cwa",
+    "Cwb",
+    "Cwc",
+    "Cfa",
+    "Cfb",
+    "Cfc",
+    "Dsa",
+    "Dsb",
+    "Dsc",
+    "Dsd",
+    "Dwa",
+    "Dwb",
+    "Dwc",
+    "Dwd",
+    "Dfa",
+    "Dfb",
+    "Dfc",
+    "Dfd",
+    "ET",
+    "EF",
+]
+
+SEASON_DICT = {
+    "NH_season": ["09", "10", "11", "12", "01", "02", "03", "04"],
+    "SH_season": ["04", "05", "06", "07", "08", "09", "10"],
+}
+
+
+def synthetic_date_list(n_steps, start_year=2000, monthly=True):
+    """
+    Returns a list of consecutive time step names.
+
+    Parameters
+    ----------
+    n_steps : int
+        Number of time steps (t)
+    start_year : int
+        Year of the first time step. Default is 2000.
+    monthly : bool
+        True for monthly (YYYYMM) and False for annual (YYYY) time steps.
+        Default is True.
+
+    Returns
+    -------
+    date_list : list
+        List of t time step names
+
+    """
+    if monthly:
+        return [f"{start_year + t // 12}{t % 12 + 1:02d}" for t in range(int(n_steps))]
+
+    return [str(start_year + t) for t in range(int(n_steps))]
+
+
+def synthetic_world(
+    n_locations,
+    n_steps,
+    monthly=True,
+    trade_density=0.3,
+    host_coverage=0.8,
+    n_native=1,
+    start_year=2000,
+    seed=0,
+):
+    """
+    Returns synthetic model inputs for n locations and t time steps.
+
+    Parameters
+    ----------
+    n_locations : int
+        Number of locations (n)
+    n_steps : int
+        Number of time steps (t)
+    monthly : bool
+        True for monthly (YYYYMM) and False for annual (YYYY) time steps.
+        Default is True.
+    trade_density : float
+        Proportion of origin-destination pairs with trade in each time step.
+        Default is 0.3.
+    host_coverage : float
+        Proportion of locations with host percent area greater than 0.
+        Default is 0.8.
+    n_native : int
+        Number of locations where the pest is present and infective at the
+        start of the simulation. Default is 1.
+    start_year : int
+        Year of the first time step. Default is 2000.
+    seed : int
+        Seed used to generate the inputs. Default is 0.
+
+    Returns
+    -------
+    world : dict
+        Dictionary with the locations data frame (countries with names, ISO3
+        codes, latitudes, host percent areas, phytosanitary capacities,
+        Koppen-Geiger class percent areas, presence, infective time steps,
+        and an empty geometry column), the t x n x n trades cube, the n x n
+        distance and climate similarity matrices, the date list, and the
+        season dictionary
+
+    """
+    rs = np.random.RandomState(seed)
+    n = int(n_locations)
+    date_list = synthetic_date_list(n_steps, start_year, monthly)
+
+    trades = rs.gamma(0.5, 1000, size=(len(date_list), n, n))
+    trades[rs.random_sample(trades.shape) >= trade_density] = 0
+    trades[:, np.arange(n), np.arange(n)] = 0
+
+    coordinates = rs.uniform(-1, 1, size=(n, 3))
+    coordinates /= np.linalg.norm(coordinates, axis=1)[:, None]
+    distances = 6371 * np.arccos(np.clip(coordinates @ coordinates.T, -1, 1))
+    latitudes = np.degrees(np.arcsin(coordinates[:, 2]))
+
+    koppen = rs.dirichlet(np.full(len(KG_CODES), 0.2), size=n)
+    koppen[koppen < 0.01] = 0
+    koppen /= koppen.sum(axis=1)[:, None]
+    # share of the destination (j) area in classes also found in the origin
+    # (i), as in create_climate_similarities_matrix
+    climate_similarities = koppen @ (koppen > 0).T
+
+    host = np.where(rs.random_sample(n) < host_coverage, rs.uniform(0.05, 1, n), 0)
+    native = rs.choice(n, size=min(int(n_native), n), replace=False)
+    host[native] = np.maximum(host[native], 0.5)
+    presence = np.zeros(n, dtype=bool)
+    presence[native] = True
+    infective = np.empty(n, dtype=object)
+    infective[native] = date_list[0]
+
+    locations = pd.DataFrame(
+        {
+            "NAME": [f"Country {k}" for k in range(n)],
+            "ISO3": [f"C{k:04d}" for k in range(n)],
+            "LAT": latitudes,
+            "Host Percent Area": host,
+            "Phytosanitary Capacity": rs.choice([0.0, 0.1, 0.2, 0.3], n),
+        }
+    )
+    locations = pd.concat([locations, pd.DataFrame(koppen, columns=KG_CODES)], axis=1)
+    locations["Presence"] = presence
+    locations["Infective"] = infective
+    locations["geometry"] = None
+
+    return {
+        "locations": locations,
+        "trades": trades,
+        "distances": distances,
+        "climate_similarities": climate_similarities,
+        "date_list": date_list,
+        "season_dict": SEASON_DICT,
+    }
+
+
+def model_parameters(world):
+    """
+    Returns model parameters for a synthetic world, with the normalizing
+    constants calculated as in model.py.
+
+    Parameters
+    ----------
+    world : dict
+        Synthetic model inputs (see synthetic_world)
+
+    Returns
+    -------
+    parameters : dict
+        Dictionary of alpha, beta, mu, lamda_c, phi, w_phi, sigma_h, and
+        sigma_kappa
+
+    """
+    climate_similarities = world["climate_similarities"]
+    iu1 = np.triu_indices(climate_similarities.shape[0], 1)
+
+    # phi * w_phi * alpha <= 1 keeps establishment a probability
+    return {
+        "alpha": 0.3,
+        "beta": 0.5,
+        "mu": 0.0001,
+        "lamda_c": 1,
+        "phi": 3,
+        "w_phi": 1,
+        "sigma_h": (1 - world["locations"]["Host Percent Area"]).std(),
+        "sigma_kappa": np.std(1 - climate_similarities[iu1]),
+    }
@@ -0,0 +1,307 @@
+"""
+PoPS Pandemic - Simulation
+
+Module containing functions to compile the model inputs of a configuration
+into a single versioned bundle and to read it back. A bundle is a directory
+of NumPy (.npy) arrays that are memory-mapped when read and a JSON manifest:
+country attributes, time-varying host and phytosanitary capacity tables,
+distances, climate similarities, the trade cube of each commodity, and the
+derived normalizing constants. Inputs are compiled once with, e.g.:
+
+    python -m pandemic.bundle config.json bundle_dir
+
+and a run started from the bundle skips reading the GeoPackage and trade
+CSV files (python -m pandemic config.json ... --bundle bundle_dir).
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from pandemic.instrumentation import create_report, timed
+
+BUNDLE_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+
+HOST_COLUMN = re.compile(r"^Host Percent Area T(\d+)$")
+
+PHYTO_COLUMN = re.compile(r"^Phytosanitary Capacity (\d{4})$")
+
+
+def derived_constants(countries, climate_similarities):
+    """
+    Returns the host and climate dissimilarity normalizing constants.
+
+    Parameters
+    ----------
+    countries : data_frame
+        data frame of countries with a Host Percent Area column
+    climate_similarities : numpy.array
+        n x n matrix of climate similarities between locations
+
+    Returns
+    -------
+    constants : dict
+        Dictionary of sigma_h, the standard deviation of the percent of
+        area without host, and sigma_kappa, the standard deviation of the
+        climate dissimilarity of all pairs of locations
+
+    """
+    iu1 = np.triu_indices(climate_similarities.shape[0], 1)
+
+    return {
+        "sigma_h": float((1 - countries["Host Percent Area"]).std()),
+        "sigma_kappa": float(np.std(1 - climate_similarities[iu1])),
+    }
+
+
+def time_varying_table(countries, pattern):
+    """
+    Returns the columns of countries matching a pattern with a time label
+    (e.g., Host Percent Area T3) as a table with one row per label.
+
+    Parameters
+    ----------
+    countries : data_frame
+        data frame of countries
+    pattern : re.Pattern
+        Column name pattern with one group capturing the time label
+
+    Returns
+    -------
+    labels : list
+        Sorted list of time labels (int)
+    columns : list
+        Column names in the order of labels
+    table : numpy.array
+        k x n matrix of column values, one row per label
+
+    """
+    matches = [
+        (int(pattern.match(c).group(1)), c)
+        for c in countries.columns
+        if pattern.match(c)
+    ]
+    matches.sort()
+    labels = [label for label, _ in matches]
+    columns = [column for _, column in matches]
+    table = countries[columns].values.astype(float).T
+
+    return labels, columns, table
+
+
+def write_bundle(bundle_dir, inputs, source=None):
+    """
+    Writes model inputs (see load_inputs) to a bundle directory.
+
+    Parameters
+    ----------
+    bundle_dir : str
+        Directory path of the bundle (created if needed)
+    inputs : dict
+        Model inputs (see load_inputs)
+    source : dict
+        Description of the source of the inputs (e.g., configuration paths)
+        saved in the manifest. Default is None.
+
+    Returns
+    -------
+    manifest : dict
+        Bundle manifest
+
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    countries = inputs["countries"]
+    arrays = {
+        "distances": np.asarray(inputs["distances"], dtype=float),
+        "climate_similarities": np.asarray(inputs["climate_similarities"], dtype=float),
+    }
+
+    # time-varying host and phytosanitary capacity tables
+    host_steps, host_columns, arrays["host_table"] = time_varying_table(
+        countries, HOST_COLUMN
+    )
+    phyto_years, phyto_columns, arrays["phyto_table"] = time_varying_table(
+        countries, PHYTO_COLUMN
+    )
+
+    # static country attributes, one array per column
+    columns = []
+    static = [
+        c
+        for c in countries.columns
+        if c not in host_columns + phyto_columns and c != "geometry"
+    ]
+    for k, column in enumerate(static):
+        values = countries[column].values
+        if values.dtype == object:
+            values = np.array(["" if pd.isna(v) else str(v) for v in values])
+            kind = "str"
+        else:
+            kind = "value"
+        arrays[f"column_{k}"] = values
+        columns.append({"name": column, "array": f"column_{k}", "kind": kind})
+
+    for code, trades in zip(inputs["code_list"], inputs["trades_list"]):
+        arrays[f"trades_{code}"] = np.asarray(trades, dtype=float)
+
+    for name, values in arrays.items():
+        np.save(os.path.join(bundle_dir, f"{name}.npy"), values)
+
+    example = inputs["example_trade_matrix"]
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": source or {},
+        "n_locations": int(len(countries)),
+        "date_list": [str(ts) for ts in inputs["date_list"]],
+        "code_list": [str(code) for code in inputs["code_list"]],
+        "commodities_available": list(inputs["commodities_available"]),
+        "columns": columns,
+        "host_steps": host_steps,
+        "phyto_years": phyto_years,
+        "trade_index": [str(v) for v in example.index],
+        "trade_columns": [str(v) for v in example.columns],
+        "trade_index_name": example.index.name,
+        "constants": derived_constants(countries, arrays["climate_similarities"]),
+        "arrays": {
+            name: {"shape": list(values.shape), "dtype": str(values.dtype)}
+            for name, values in arrays.items()
+        },
+    }
+    with open(os.path.join(bundle_dir, MANIFEST_FILE), "w") as file:
+        json.dump(manifest, file, indent=4)
+
+    return manifest
+
+
+def read_bundle(bundle_dir, mmap_mode="r"):
+    """
+    Returns the model inputs saved in a bundle directory.
+
+    Parameters
+    ----------
+    bundle_dir : str
+        Directory path of the bundle (see write_bundle)
+    mmap_mode : str
+        Memory-map mode of the arrays (see numpy.load). If None, arrays are
+        read into memory. Default is "r".
+
+    Returns
+    -------
+    inputs : dict
+        Model inputs (see load_inputs) with the derived constants
+
+    """
+    load_report = create_report()
+    with open(os.path.join(bundle_dir, MANIFEST_FILE)) as file:
+        manifest = json.load(file)
+    if manifest["version"] != BUNDLE_VERSION:
+        raise ValueError(
+            f"Bundle {bundle_dir} has version {manifest['version']}, "
+            f"expected {BUNDLE_VERSION}"
+        )
+
+    def load(name):
+        return np.load(os.path.join(bundle_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    with timed(load_report, "load_bundle"):
+        countries = {}
+        for column in manifest["columns"]:
+            values = np.asarray(load(column["array"]))
+            if column["kind"] == "str":
+                values = np.array([None if v == "" else str(v) for v in values], object)
+            countries[column["name"]] = values
+        host_table = np.asarray(load("host_table"))
+        for k, step in enumerate(manifest["host_steps"]):
+            countries[f"Host Percent Area T{step}"] = host_table[k]
+        phyto_table = np.asarray(load("phyto_table"))
+        for k, year in enumerate(manifest["phyto_years"]):
+            countries[f"Phytosanitary Capacity {year}"] = phyto_table[k]
+        countries = pd.DataFrame(countries)
+
+        trades_list = [load(f"trades_{code}") for code in manifest["code_list"]]
+        example_trade_matrix = pd.DataFrame(
+            np.asarray(trades_list[0][0]),
+            index=pd.Index(manifest["trade_index"], name=manifest["trade_index_name"]),
+            columns=manifest["trade_columns"],
+        )
+
+    return {
+        "countries": countries,
+        "distances": load("distances"),
+        "climate_similarities": load("climate_similarities"),
+        "trades_list": trades_list,
+        "code_list": manifest["code_list"],
+        "commodities_available": manifest["commodities_available"],
+        "date_list": manifest["date_list"],
+        "example_trade_matrix": example_trade_matrix,
+        "constants": manifest["constants"],
+        "load_report": load_report,
+    }
+
+
+def compile_inputs(config, input_dir, countries_path, bundle_dir):
+    """
+    Loads the model inputs of a configuration from their source files and
+    writes them to a bundle directory.
+
+    Parameters
+    ----------
+    config : dict
+        Model configuration
+    input_dir : str
+        Directory path of the distance and climate similarity matrices
+    countries_path : str
+        Path of the countries file
+    bundle_dir : str
+        Directory path of the bundle
+
+    Returns
+    -------
+    manifest : dict
+        Bundle manifest
+
+    """
+    from pandemic.model import load_inputs
+
+    inputs = load_inputs(config, input_dir, countries_path)
+    source = {
+        "input_dir": input_dir,
+        "countries_path": countries_path,
+        "commodity_path": config["commodity_path"],
+        "commodity_forecast_path": config["commodity_forecast_path"],
+        "start_year": config["start_year"],
+    }
+
+    return write_bundle(bundle_dir, inputs, source=source)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile Pandemic model inputs")
+    parser.add_argument("config", help="path to the configuration json file")
+    parser.add_argument("bundle_dir", help="directory to write the bundle to")
+    parser.add_argument("--input-dir", default=os.getenv("INPUT_PATH"))
+    parser.add_argument("--countries", default=os.getenv("COUNTRIES_PATH"))
+    args = parser.parse_args()
+
+    with open(args.config) as json_file:
+        config = json.load(json_file)
+    compile_inputs(config, args.input_dir, args.countries, args.bundle_dir)
@@ -0,0 +1,426 @@
+"""
+PoPS Pandemic - Simulation
+
+Module containing functions to calibrate model parameters (e.g., alpha, mu,
+lamda_c, w_phi, and the transmission lag gamma parameters) against observed
+first report years. Parameter sets from a grid or a sampler (random, Latin
+hypercube, or Sobol) are evaluated in parallel processes that receive the
+model inputs once, scored with a pluggable objective, and collected in a
+results table.
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import inspect
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pandemic.expected_value import expected_presence
+from pandemic.helpers import (
+    joint_trade_normalization_bounds,
+    trade_normalization_bounds,
+)
+from pandemic.model_equations import (
+    pandemic_multiple_time_steps,
+    static_pair_factors,
+)
+from pandemic.random_streams import create_generator, draw_seed
+
+logger = logging.getLogger(__name__)
+
+# model inputs shared by the evaluations of a worker process (see run_sweep)
+_shared = {}
+
+# inputs of the entry factors of static_pair_factors and parameters of its
+# climate factor, which are only cached if they are not swept
+ENTRY_INPUTS = {
+    "trades",
+    "locations",
+    "date_list",
+    "season_dict",
+    "trade_normalization",
+    "trade_bounds",
+}
+CLIMATE_PARAMETERS = {"climate_similarities", "beta", "sigma_kappa"}
+
+
+def parameter_grid(values):
+    """
+    Returns every combination of parameter values.
+
+    Parameters
+    ----------
+    values : dict
+        Dictionary of parameter names and lists of values
+
+    Returns
+    -------
+    parameter_sets : list
+        List of dictionaries of parameter names and values
+
+    """
+    names = list(values)
+
+    return [
+        dict(zip(names, combination))
+        for combination in itertools.product(*(values[name] for name in names))
+    ]
+
+
+def sample_parameters(bounds, n_samples, method="lhs", seed=None):
+    """
+    Returns parameter sets sampled within bounds.
+
+    Parameters
+    ----------
+    bounds : dict
+        Dictionary of parameter names and (lower, upper) bounds
+    n_samples : int
+        Number of parameter sets
+    method : str
+        Sampling method: "random" for independent uniform samples, "lhs"
+        for a Latin hypercube (one sample in each of n_samples equal
+        intervals of every parameter), or "sobol" for a scrambled Sobol
+        sequence (requires scipy >= 1.7). Default is lhs.
+    seed : int
+        Random seed of the sampler (and scrambling of the Sobol sequence).
+        If None, a seed drawn from operating system entropy is used for
+        every method, so samples differ between calls. Default is None.
+
+    Returns
+    -------
+    parameter_sets : list
+        List of dictionaries of parameter names and values
+
+    """
+    names = list(bounds)
+    if seed is None:
+        seed = draw_seed()
+    rng = create_generator(seed)
+    if method == "random":
+        unit = rng.random((n_samples, len(names)))
+    elif method == "lhs":
+        strata = np.argsort(rng.random((n_samples, len(names))), axis=0)
+        unit = (strata + rng.random((n_samples, len(names)))) / n_samples
+    elif method == "sobol":
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            raise ImportError("Sobol sampling requires scipy >= 1.7")
+        unit = qmc.Sobol(len(names), seed=seed).random(n_samples)
+    else:
+        raise ValueError(f"Unknown sampling method: {method}")
+
+    lower = np.array([bounds[name][0] for name in names], dtype=float)
+    upper = np.array([bounds[name][1] for name in names], dtype=float)
+    samples = lower + unit * (upper - lower)
+
+    return [
+        {name: float(value) for name, value in zip(names, sample)} for sample in samples
+    ]
+
+
+def arrival_years(presence, date_list, names, threshold=0.5):
+    """
+    Returns the first year in which each location is present.
+
+    Parameters
+    ----------
+    presence : numpy.array
+        t x n matrix of presence (0 or 1) or probabilities of presence
+        (e.g., the mean of realizations or expected_presence) at the end of
+        each time step
+    date_list : list
+        List of unique time step values (YYYY or YYYYMM)
+    names : list
+        List of n location names
+    threshold : float
+        Probability of presence from which a location is considered present.
+        Default is 0.5.
+
+    Returns
+    -------
+    arrival_years : pandas.Series
+        First year of presence of each location (NaN if never present),
+        indexed by location name
+
+    """
+    years = np.array([int(str(ts)[:4]) for ts in date_list], dtype=float)
+    reached = np.asarray(presence) >= threshold
+    first = np.argmax(reached, axis=0)
+    arrivals = np.where(reached.any(axis=0), years[first], np.nan)
+
+    return pd.Series(arrivals, index=list(names))
+
+
+def arrival_year_error(simulated, observed):
+    """
+    Returns the mean absolute error in years between simulated and observed
+    first report years.
+
+    Parameters
+    ----------
+    simulated : pandas.Series
+        Simulated arrival years indexed by location name, the year after
+        the last time step for locations not reached (see
+        evaluate_parameters)
+    observed : dict
+        Dictionary of location names and observed first report years
+
+    Returns
+    -------
+    error : float
+        Mean absolute error in years
+
+    """
+    names = list(observed)
+    predicted = simulated.reindex(names).values
+    observed_years = np.array([observed[name] for name in names], dtype=float)
+
+    return float(np.mean(np.abs(predicted - observed_years)))
+
+
+def evaluate_parameters(
+    parameters,
+    model_kwargs,
+    observed,
+    objective=arrival_year_error,
+    n_runs=1,
+    expected_value=False,
+    threshold=0.5,
+):
+    """
+    Returns the score of a parameter set against observed first report years.
+    The arrival years are those of the mean presence of n_runs realizations,
+    which use the random number streams of runs 0 to n_runs - 1 of the
+    random_seed of model_kwargs, or of the expected probability of presence.
+    Parameter sets are only scored on the same draws if model_kwargs has a
+    random_seed (run_sweep draws one if not); otherwise each evaluation
+    draws a new seed.
+
+    Parameters
+    ----------
+    parameters : dict
+        Dictionary of parameter names and values overriding model_kwargs
+    model_kwargs : dict
+        Arguments of pandemic_multiple_time_steps (trades, locations, etc.)
+    observed : dict
+        Dictionary of location names and observed first report years
+    objective : callable
+        Function of the simulated arrival years (see arrival_years, with the
+        year after the last time step for locations not reached) and the
+        observed years returning a score to minimize. Default is
+        arrival_year_error.
+    n_runs : int
+        Number of realizations. Default is 1.
+    expected_value : bool
+        If True, the probabilities of presence of expected_presence are used
+        instead of realizations. Default is False.
+    threshold : float
+        Probability of presence from which a location is considered present
+        (see arrival_years). Default is 0.5.
+
+    Returns
+    -------
+    result : dict
+        Dictionary of the parameters, score, and number of locations
+        reached
+
+    """
+    kwargs = dict(model_kwargs, **parameters)
+    kwargs.pop("run", None)
+    locations = kwargs.pop("locations")
+    date_list = kwargs["date_list"]
+    if expected_value:
+        accepted = inspect.signature(expected_presence).parameters
+        presence, _ = expected_presence(
+            locations=locations,
+            **{key: value for key, value in kwargs.items() if key in accepted},
+        )
+    else:
+        columns = [f"Presence {ts}" for ts in date_list]
+        presence = np.zeros((len(date_list), len(locations)))
+        for run in range(n_runs):
+            outputs = pandemic_multiple_time_steps(
+                locations=locations.copy(), run=run, **kwargs
+            )
+            presence += outputs[0][columns].values.astype(float).T / n_runs
+
+    simulated = arrival_years(
+        presence, date_list, locations["NAME"].values, threshold=threshold
+    )
+
+    last_year = int(str(date_list[-1])[:4])
+
+    return dict(
+        parameters,
+        score=objective(simulated.fillna(last_year + 1), observed),
+        locations_reached=int(simulated.notna().sum()),
+    )
+
+
+def cache_pair_factors(model_kwargs, swept):
+    """
+    Returns model arguments with the factors of the pair probabilities that
+    do not depend on the swept parameters (see static_pair_factors): the
+    entry factors, which only depend on the trades, locations, and time
+    steps, and the climate factor if beta and sigma_kappa are not swept.
+
+    Parameters
+    ----------
+    model_kwargs : dict
+        Arguments of pandemic_multiple_time_steps
+    swept : set
+        Names of the parameters that vary across parameter sets
+
+    Returns
+    -------
+    model_kwargs : dict
+        Arguments of pandemic_multiple_time_steps with pair_factors, or the
+        same arguments if the entry factors depend on swept parameters
+
+    """
+    if swept & ENTRY_INPUTS:
+        return model_kwargs
+    cache_climate = not swept & CLIMATE_PARAMETERS
+    pair_factors = static_pair_factors(
+        model_kwargs["trades"],
+        model_kwargs["climate_similarities"],
+        model_kwargs["locations"],
+        model_kwargs["date_list"],
+        model_kwargs["season_dict"],
+        trade_normalization=model_kwargs.get("trade_normalization", "year"),
+        trade_bounds=model_kwargs.get("trade_bounds"),
+        beta=model_kwargs["beta"] if cache_climate else None,
+        sigma_kappa=model_kwargs["sigma_kappa"] if cache_climate else None,
+    )
+
+    return dict(model_kwargs, pair_factors=pair_factors)
+
+
+def _init_worker(shared, swept):
+    _shared.clear()
+    _shared.update(shared)
+    _shared["model_kwargs"] = cache_pair_factors(shared["model_kwargs"], swept)
+
+
+def _evaluate(parameters):
+    return evaluate_parameters(parameters, **_shared)
+
+
+def run_sweep(
+    parameter_sets,
+    model_kwargs,
+    observed,
+    objective=arrival_year_error,
+    n_runs=1,
+    expected_value=False,
+    threshold=0.5,
+    processes=None,
+    outpath=None,
+):
+    """
+    Evaluates parameter sets in parallel processes and returns the results
+    sorted by score. The model inputs are sent once to each worker process,
+    the trade normalization bounds are computed once for all evaluations,
+    and the factors of the pair probabilities that do not depend on the
+    swept parameters are computed once in each worker (see
+    cache_pair_factors), so each evaluation only applies the swept
+    parameters.
+
+    Parameters
+    ----------
+    parameter_sets : list
+        List of dictionaries of parameter names and values (see
+        parameter_grid and sample_parameters)
+    model_kwargs : dict
+        Arguments of pandemic_multiple_time_steps shared by all evaluations.
+        If random_seed is missing or None, one seed is drawn from operating
+        system entropy and shared by all evaluations, so every parameter set
+        is scored on the same random number streams.
+    observed : dict
+        Dictionary of location names and observed first report years
+    objective : callable
+        Score to minimize (see evaluate_parameters). It must be defined at
+        module level to be sent to worker processes. Default is
+        arrival_year_error.
+    n_runs : int
+        Number of realizations of each parameter set. Default is 1.
+    expected_value : bool
+        If True, parameter sets are scored with expected_presence instead
+        of realizations. Default is False.
+    threshold : float
+        Probability of presence from which a location is considered present
+        (see arrival_years). Default is 0.5.
+    processes : int
+        Number of worker processes. If 1, parameter sets are evaluated one
+        after the other in this process. If None, the number of CPUs is
+        used. Default is None.
+    outpath : str
+        Path of a CSV file to write the results table to. Default is None.
+
+    Returns
+    -------
+    results : data_frame
+        data frame with one row per parameter set of the parameter values,
+        score, and number of locations reached, sorted by score
+
+    """
+    model_kwargs = dict(model_kwargs)
+    if model_kwargs.get("random_seed") is None:
+        model_kwargs["random_seed"] = draw_seed()
+        logger.info("Random seed of the sweep: %d", model_kwargs["random_seed"])
+    if model_kwargs.get("trade_bounds") is None:
+        trades = model_kwargs["trades"]
+        bounds = (
+            joint_trade_normalization_bounds
+            if trades.ndim == 4
+            else trade_normalization_bounds
+        )
+        model_kwargs["trade_bounds"] = bounds(
+            trades,
+            model_kwargs["date_list"],
+            method=model_kwargs.get("trade_normalization", "year"),
+        )
+    shared = {
+        "model_kwargs": model_kwargs,
+        "observed": observed,
+        "objective": objective,
+        "n_runs": n_runs,
+        "expected_value": expected_value,
+        "threshold": threshold,
+    }
+
+    swept = set().union(*parameter_sets)
+
+    logger.info("Evaluating %d parameter sets", len(parameter_sets))
+    if processes == 1:
+        shared["model_kwargs"] = cache_pair_factors(model_kwargs, swept)
+        results = [evaluate_parameters(p, **shared) for p in parameter_sets]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_worker,
+            initargs=(shared, swept),
+        ) as executor:
+            results = list(executor.map(_evaluate, parameter_sets))
+
+    results = pd.DataFrame(results).sort_values("score", kind="stable")
+    results = results.reset_index(drop=True)
+    if outpath is not None:
+        results.to_csv(outpath, index=False)
+
+    return results
@@ -0,0 +1,258 @@
+"""
+PoPS Pandemic - Simulation
+
+Module containing functions to checkpoint the state of a simulation at the
+end of a time step and to resume a simulation from its last checkpoint.
+
+A checkpoint directory holds a small state file (state.npz) with the compact
+model state and compressed blocks of the probability and introduction
+matrices of the time steps run since the previous checkpoint
+(steps_{start}_{stop}.npz). Each file is written to a temporary file and
+moved into place, so a killed job leaves either the previous or the new
+checkpoint, never a partial one.
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+STATE_FILE = "state.npz"
+
+CUBES = ["entry", "establishment", "introduction", "country_introduction"]
+
+
+def write_atomic(path, arrays, compressed=False):
+    """
+    Saves arrays to a .npz file through a temporary file in the same
+    directory that is then renamed, so the file is either complete or
+    absent.
+
+    Parameters
+    ----------
+    path : str
+        Path of the .npz file
+    arrays : dict
+        Dictionary of array names and arrays
+    compressed : bool
+        If True, compress the arrays. Default is False.
+
+    Returns
+    -------
+    None
+
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as file:
+            if compressed:
+                np.savez_compressed(file, **arrays)
+            else:
+                np.savez(file, **arrays)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def block_path(directory, start, stop):
+    """
+    Returns the path of the matrices of time steps start to stop - 1.
+    """
+    return os.path.join(directory, f"steps_{start:05d}_{stop:05d}.npz")
+
+
+def write_checkpoint(directory, state, cubes, blocks=None):
+    """
+    Writes a checkpoint at the end of a time step: the matrices of the time
+    steps run since the previous checkpoint and then the model state.
+
+    Parameters
+    ----------
+    directory : str
+        Checkpoint directory path (created if needed)
+    state : dict
+        Model state (see simulation_state) where step is the index of the
+        next time step to run
+    cubes : dict
+        Dictionary of the entry, establishment, and introduction probability
+        and country introduction t x n x n matrices of the simulation
+    blocks : numpy.array
+        k x 2 array of the first and last (exclusive) time step of each block
+        of matrices already written. Default is None.
+
+    Returns
+    -------
+    blocks : numpy.array
+        Blocks of matrices written, including the new block
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    blocks = np.zeros((0, 2), dtype=int) if blocks is None else blocks
+    start = int(blocks[-1, 1]) if len(blocks) else 0
+    stop = int(state["step"])
+    if stop > start:
+        write_atomic(
+            block_path(directory, start, stop),
+            {key: cubes[key][start:stop] for key in CUBES},
+            compressed=True,
+        )
+        blocks = np.vstack([blocks, [start, stop]]).astype(int)
+    write_atomic(os.path.join(directory, STATE_FILE), dict(state, blocks=blocks))
+
+    return blocks
+
+
+def has_checkpoint(directory):
+    """
+    Returns True if a directory holds a complete checkpoint.
+    """
+    return os.path.exists(os.path.join(directory, STATE_FILE))
+
+
+def read_checkpoint(directory, cubes=None):
+    """
+    Returns the model state of the last checkpoint in a directory and
+    fills the matrices of the time steps run before it.
+
+    Parameters
+    ----------
+    directory : str
+        Checkpoint directory path
+    cubes : dict
+        Dictionary of the entry, establishment, and introduction probability
+        and country introduction t x n x n matrices to fill. Default is None.
+
+    Returns
+    -------
+    state : dict
+        Model state (see simulation_state)
+
+    """
+    path = os.path.join(directory, STATE_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No checkpoint found in {directory}")
+    with np.load(path) as file:
+        state = {key: file[key] for key in file.files}
+
+    if cubes is not None:
+        for start, stop in state["blocks"]:
+            with np.load(block_path(directory, start, stop)) as block:
+                for key in CUBES:
+                    cubes[key][start:stop] = block[key]
+
+    return state
+
+
+def simulation_state(
+    step, date_list, locations, infective, origin_destination, stream_key
+):
+    """
+    Returns the compact model state at the end of a time step.
+
+    Parameters
+    ----------
+    step : int
+        Index of the next time step to run
+    date_list : list
+        List of unique time step values (YYYY or YYYYMM) of the simulation
+    locations : data_frame
+        data frame of countries, species presence, infective time steps, and
+        presence and probability of introduction of each time step run
+    infective : numpy.array
+        Array of n months from which each location is infective
+    origin_destination : data_frame
+        Origin, destination, and time step (TS) of each introduction
+    stream_key : tuple
+        Random seed, run, and commodity keying the random number streams of
+        the simulation (see create_generator)
+
+    Returns
+    -------
+    state : dict
+        Dictionary of arrays: the step index, date list, presence, infective
+        months and time step labels, combined probability of introduction,
+        host percent area, phytosanitary capacity, presence and probability
+        of introduction of each time step run, introductions, and the random
+        number stream key
+
+    """
+    steps_run = date_list[:step]
+    state = {
+        "step": np.array(step),
+        "date_list": np.array(date_list, dtype=str),
+        "presence": locations["Presence"].values.astype(bool),
+        "infective": np.asarray(infective, dtype=np.int64),
+        "infective_label": np.array(
+            ["" if v is None else str(v) for v in locations["Infective"]], dtype=str
+        ),
+        "probability": locations["Probability of introduction"].values.astype(float),
+        "host": locations["Host Percent Area"].values.astype(float),
+        "presence_history": locations[[f"Presence {ts}" for ts in steps_run]]
+        .values.astype(bool)
+        .T.reshape(len(steps_run), len(locations)),
+        "probability_history": locations[
+            [f"Probability of introduction {ts}" for ts in steps_run]
+        ]
+        .values.astype(float)
+        .T.reshape(len(steps_run), len(locations)),
+        "origin": origin_destination["Origin"].values.astype(str),
+        "destination": origin_destination["Destination"].values.astype(str),
+        "time_step": origin_destination["TS"].values.astype(str),
+        "stream_key": np.array(stream_key, dtype=np.int64),
+    }
+    if "Phytosanitary Capacity" in locations.columns:
+        state["phyto"] = locations["Phytosanitary Capacity"].values.astype(float)
+
+    return state
+
+
+def restore_locations(state, locations):
+    """
+    Restores the presence, infective time steps, host percent area,
+    phytosanitary capacity, and the presence and probability of
+    introduction columns of each time step run from a checkpointed model
+    state.
+
+    Parameters
+    ----------
+    state : dict
+        Model state (see simulation_state)
+    locations : data_frame
+        data frame of countries at the start of the simulation
+
+    Returns
+    -------
+    locations : data_frame
+        data frame of countries at the end of the checkpointed time step
+
+    """
+    step = int(state["step"])
+    for t, ts in enumerate(state["date_list"][:step]):
+        locations[f"Presence {ts}"] = state["presence_history"][t]
+        locations[f"Probability of introduction {ts}"] = state["probability_history"][t]
+    locations["Presence"] = state["presence"]
+    locations["Infective"] = np.array(
+        [None if v == "" else v for v in state["infective_label"]], dtype=object
+    )
+    locations["Probability of introduction"] = state["probability"]
+    locations["Host Percent Area"] = state["host"]
+    if "phyto" in state:
+        locations["Phytosanitary Capacity"] = state["phyto"]
+
+    return locations
@@ -0,0 +1,314 @@
+"""
+PoPS Pandemic - Simulation
+
+Module containing the expected-value (mean-field) mode of the model. Instead
+of drawing introductions, the probability that each location is infective is
+propagated through the same entry, establishment, and introduction equations
+under the approximation that locations are independent, which gives the
+approximate probability of presence of each location over time in a single
+deterministic run (i.e., the mean of many stochastic realizations of
+pandemic_multiple_time_steps).
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import numpy as np
+import pandas as pd
+
+from pandemic.helpers import (
+    active_location_pairs,
+    covariate_table,
+    create_season_mask,
+    joint_trade_normalization_bounds,
+    trade_normalization_bounds,
+)
+from pandemic.kernels import (
+    pair_probabilities_factors,
+    pair_probabilities_numpy,
+    parameter_factors,
+)
+from pandemic.probability_calculations import combined_probability_of_introduction
+from pandemic.time_steps import (
+    NEVER_INFECTIVE,
+    create_calendar,
+    infective_months,
+    lag_to_months,
+)
+
+
+def lag_cdf(
+    months,
+    transmission_lag_type,
+    time_infect_units,
+    time_infect,
+    gamma_shape,
+    gamma_scale,
+):
+    """
+    Returns the probability that the transmission lag of an introduction is
+    at most a number of months, matching the lags of introduce_pests: a set
+    number of time units (static), a gamma draw rounded to time units
+    (stochastic), or no lag.
+
+    Parameters
+    ----------
+    months : numpy.array
+        Array of numbers of months since the introduction
+    transmission_lag_type : str
+        Type of transmission lag used in the simulation (i.e., None,
+        static, or stochastic)
+    time_infect_units : str
+        Units associated with the transmission lag value (i.e., years, months)
+    time_infect : int
+        Time until a country is infectious, set for static transmission lag
+    gamma_shape : float
+        Shape parameter for gamma distribution used in stochastic transmission
+    gamma_scale: float
+        Scale parameter for gamma distribution used in stochastic transmission
+
+    Returns
+    -------
+    cdf : numpy.array
+        Array of probabilities that the location is infective after each
+        number of months
+
+    """
+    months = np.asarray(months)
+    if transmission_lag_type == "static":
+        return (months >= lag_to_months(time_infect, time_infect_units)).astype(float)
+    if transmission_lag_type != "stochastic":
+        return (months >= 0).astype(float)
+
+    # imported here as scipy.stats is slow to import and only needed for
+    # stochastic lags
+    from scipy import stats
+
+    # a gamma draw rounded to k time units is a lag of k * unit_months
+    unit_months = lag_to_months(1, time_infect_units)
+    units = np.floor_divide(months, unit_months)
+    cdf = stats.gamma.cdf(units + 0.5, gamma_shape, scale=gamma_scale)
+
+    return np.where(months >= 0, cdf, 0.0)
+
+
+def expected_presence(
+    trades,
+    distances,
+    climate_similarities,
+    locations,
+    alpha,
+    beta,
+    mu,
+    lamda_c,
+    phi,
+    sigma_h,
+    sigma_kappa,
+    w_phi,
+    date_list,
+    season_dict,
+    transmission_lag_type,
+    time_infect_units,
+    time_infect,
+    gamma_shape,
+    gamma_scale,
+    trade_normalization="year",
+    trade_bounds=None,
+    pair_factors=None,
+):
+    """
+    Returns the approximate probability of presence of each location at each
+    time step without Monte Carlo simulation. At each time step, the
+    probability that destination (j) is introduced is the probability that
+    it is not yet present times 1 minus the product over origins (i) of
+    1 - q_i * P_ij, where P_ij is the probability of introduction of the
+    pair when the origin is infective and q_i is the probability that the
+    origin is infective: the probability it was introduced at an earlier
+    time step times the probability the transmission lag has passed.
+    Introductions of different locations are assumed to be independent and
+    reintroductions are not modeled, so presence can be underestimated when
+    introductions are frequent.
+
+    Parameters
+    ----------
+    trades : numpy.array
+        t x n x n matrix of trade values, or t x c x n x n matrices of
+        commodities simulated jointly (see pandemic_multiple_time_steps)
+    locations : data_frame
+        data frame of countries with species presence and infective time
+        steps at the start of the simulation (not modified)
+    date_list : list
+        List of unique time step values (YYYY or YYYYMM)
+    trade_normalization : str
+        Scheme used to compute the trade normalization bounds (see
+        trade_normalization_bounds). Default is year.
+    trade_bounds : tuple
+        Precomputed (min_Tc, max_Tc) trade normalization bounds. If None,
+        they are computed from trades. Default is None.
+    pair_factors : dict
+        Precomputed factors of the probabilities of entry and establishment
+        (see static_pair_factors). If given, the pair probabilities are
+        computed from these factors. Default is None.
+    distances, climate_similarities, alpha, beta, mu, lamda_c, phi, sigma_h,
+    sigma_kappa, w_phi, season_dict, transmission_lag_type, time_infect_units,
+    time_infect, gamma_shape, gamma_scale
+        Model inputs and parameters (see pandemic_multiple_time_steps)
+
+    Returns
+    -------
+    presence_probabilities : numpy.array
+        t x n matrix of probabilities that each location is present at the
+        end of each time step
+    introduction_probabilities : numpy.array
+        t x n matrix of probabilities that each location is first
+        introduced at each time step
+
+    """
+    n_steps = trades.shape[0]
+    n_locations = len(locations)
+    season_mask = create_season_mask(locations, season_dict)
+    if trade_bounds is None and trades.ndim == 4:
+        trade_bounds = joint_trade_normalization_bounds(
+            trades, date_list, method=trade_normalization
+        )
+    elif trade_bounds is None:
+        trade_bounds = trade_normalization_bounds(
+            trades, date_list, method=trade_normalization
+        )
+    min_Tc_table, max_Tc_table = trade_bounds
+    host_table = covariate_table(
+        locations, "Host Percent Area", [f"T{t}" for t in range(n_steps)]
+    )
+    years = sorted({str(ts)[:4] for ts in date_list})
+    phyto_table = covariate_table(locations, "Phytosanitary Capacity", years)
+    phyto_rows = np.searchsorted(years, [str(ts)[:4] for ts in date_list])
+    step_months = create_calendar(date_list)
+
+    # locations present at the start are infective from their infective month
+    native_infective = infective_months(locations["Infective"])
+    present = locations["Presence"].values.astype(bool)
+    native_infective[~present] = NEVER_INFECTIVE
+
+    introduction_probabilities = np.zeros((n_steps, n_locations))
+    presence_probabilities = np.zeros((n_steps, n_locations))
+    absent = 1 - present.astype(float)
+    all_origins = np.arange(n_locations)
+    if pair_factors is not None:
+        distance_factor, climate, host_factors = parameter_factors(
+            pair_factors,
+            distances,
+            climate_similarities,
+            host_table,
+            beta,
+            mu,
+            sigma_h,
+            sigma_kappa,
+        )
+    for t in range(n_steps):
+        ts = date_list[t]
+        host = host_table[t]
+        if len(str(ts)) > 4:
+            chi_t = season_mask[int(str(ts)[4:]) - 1]
+        else:
+            chi_t = np.ones(n_locations, dtype=bool)
+
+        # probability that each origin is infective in this time step
+        lag_passed = lag_cdf(
+            step_months[t] - step_months[:t],
+            transmission_lag_type,
+            time_infect_units,
+            time_infect,
+            gamma_shape,
+            gamma_scale,
+        )
+        infective = lag_passed @ introduction_probabilities[:t]
+        infective[native_infective <= step_months[t]] = 1
+
+        # probability of introduction of each pair if the origin is infective
+        origins, destinations = active_location_pairs(all_origins, host > 0)
+        if pair_factors is not None:
+            _, _, pair_introduction = pair_probabilities_factors(
+                origins,
+                destinations,
+                np.zeros(n_locations, dtype=np.int64),
+                step_months[t],
+                pair_factors["entry"][t],
+                distance_factor,
+                climate,
+                host_factors[t],
+                lamda_c,
+                phi * w_phi * alpha,
+            )
+        else:
+            shape = trades.shape[1:-2] + (n_locations,)
+            _, _, pair_introduction = pair_probabilities_numpy(
+                origins,
+                destinations,
+                np.zeros(n_locations, dtype=np.int64),
+                step_months[t],
+                phyto_table[phyto_rows[t]],
+                host,
+                chi_t.astype(float),
+                np.asarray(trades[t], dtype=float),
+                np.asarray(distances, dtype=float),
+                np.asarray(climate_similarities, dtype=float),
+                np.broadcast_to(min_Tc_table[t], shape),
+                np.broadcast_to(max_Tc_table[t], shape),
+                alpha,
+                beta,
+                mu,
+                lamda_c,
+                phi,
+                w_phi,
+                sigma_h,
+                sigma_kappa,
+            )
+        introduction = np.zeros((n_locations, n_locations))
+        introduction[destinations, origins] = pair_introduction * infective[origins]
+
+        introduction_probabilities[t] = absent * combined_probability_of_introduction(
+            introduction
+        )
+        absent = absent - introduction_probabilities[t]
+        presence_probabilities[t] = 1 - absent
+
+    return presence_probabilities, introduction_probabilities
+
+
+def expected_presence_table(locations, presence_probabilities, date_list):
+    """
+    Returns the probabilities of presence as a table with one row per
+    location and one Probability of presence column per time step.
+
+    Parameters
+    ----------
+    locations : data_frame
+        data frame of countries with NAME and ISO3 columns
+    presence_probabilities : numpy.array
+        t x n matrix of probabilities of presence (see expected_presence)
+    date_list : list
+        List of unique time step values (YYYY or YYYYMM)
+
+    Returns
+    -------
+    table : data_frame
+        data frame of the NAME, ISO3, and probabilities of presence of
+        each location
+
+    """
+    table = pd.DataFrame(
+        presence_probabilities.T,
+        columns=[f"Probability of presence {ts}" for ts in date_list],
+    )
+    table.insert(0, "ISO3", locations["ISO3"].values)
+    table.insert(0, "NAME", locations["NAME"].values)
+
+    return table
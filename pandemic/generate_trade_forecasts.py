@@ -2,9 +2,9 @@ import os
 import glob
 import fnmatch
 import shutil
-import random
 import numpy as np
 import pandas as pd
+from pandemic.random_streams import create_generator
 
 
 def create_date_lists(
@@ -88,7 +88,7 @@ def create_trade_arrays(list_of_csvs, number_forecast_years, random_seed):
         Number of years to forecast trade into the future
         (e.g., 10)
     random_seed : int
-        Seed used to initialize the random number generator
+        Seed of the random number stream (see create_generator)
 
     Returns:
     --------
@@ -124,11 +124,9 @@ def create_trade_arrays(list_of_csvs, number_forecast_years, random_seed):
     # Randomly choose a value from the historical trade matrices
     # to populate the trade forecast for each destination (j) -
     # origin (i) pair and forecasted time step (k)
-    random.seed(random_seed)
-    for k in range(0, forecast_arr.shape[0]):
-        for j in range(0, hist_arr.shape[1]):
-            for i in range(0, hist_arr.shape[2]):
-                forecast_arr[k, j, i] = random.choice(hist_arr[:, j, i])
+    rng = create_generator(random_seed)
+    choices = rng.integers(0, hist_arr.shape[0], size=forecast_arr.shape)
+    forecast_arr[:] = np.take_along_axis(hist_arr, choices, axis=0)
     return hist_arr, forecast_arr
 
 
@@ -245,7 +243,7 @@ def simple_trade_forecast(
     # For annual forecasts
     elif len(str(start_forecast_date)) == 4:
         hist_arr, forecast_arr = create_trade_arrays(
-            hist_trade_to_use, num_yrs_forecast
+            hist_trade_to_use, num_yrs_forecast, random_seed
         )
         write_forecast_arrays(
             hist_trade_to_use, forecast_arr, forecast_ts_list, output_dir
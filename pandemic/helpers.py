@@ -16,9 +16,13 @@ http://www.gnu.org/copyleft/gpl.html
 """
 import os
 import glob
+import logging
 import pandas as pd
 import numpy as np
 from scipy.spatial import distance
+from pandemic.time_steps import time_step_from_path
+
+logger = logging.getLogger(__name__)
 
 # from shapely.geometry.polygon import Polygon
 # from shapely.geometry.multipolygon import MultiPolygon
@@ -87,6 +91,237 @@ def location_pairs_with_host(locations):
     return location_tuples
 
 
+def active_location_pairs(frontier, host_mask):
+    """
+    Returns the position indices of the origin and destination location
+    pairs between infective origins with host and all other locations with
+    host, in the same order as location_pairs_with_host.
+
+    Parameters
+    ----------
+    frontier : numpy.array
+        Sorted position indices of the infective origins
+    host_mask : numpy.array
+        Boolean array of n locations with host percent area greater than 0
+
+    Returns
+    --------
+    origins : numpy.array
+        Position indices of the origin (i) of each pair
+    destinations : numpy.array
+        Position indices of the destination (j) of each pair
+    """
+
+    frontier = np.asarray(frontier, dtype=int)
+    origins = frontier[host_mask[frontier]]
+    destinations = np.flatnonzero(host_mask)
+    origins_list = np.repeat(origins, len(destinations))
+    destinations_list = np.tile(destinations, len(origins))
+    # remove pairs where origin and destination are the same location
+    keep = origins_list != destinations_list
+
+    return origins_list[keep], destinations_list[keep]
+
+
+def create_season_mask(locations, season_dict):
+    """
+    Returns a 12 x n boolean matrix indicating for each month (rows) whether
+    a pest can be transported in a commodity from each location (columns),
+    i.e., the seasonality term chi. Locations use the Northern Hemisphere
+    season if their latitude is >= 0 and the Southern Hemisphere season
+    otherwise, unless a latitude band or location specific season is given.
+
+    Parameters
+    ----------
+    locations : data_frame
+        data frame of countries with ISO3 codes and latitude (LAT)
+    season_dict : dict
+        Dictionary of months (i.e., MM) when a pest can be transported in
+        a commodity, denoted by hemisphere key (i.e.,
+        {NH_season: [05, 06'], SH_season: [11, 12]}). Optional keys are
+        "lat_bands", a list of {"min_lat": float, "max_lat": float,
+        "season": [MM, ...]} applied in order to locations with
+        min_lat <= LAT < max_lat, and "country_seasons", a dictionary of
+        ISO3 codes and season months that overrides all other seasons.
+
+    Returns
+    -------
+    season_mask : numpy.array
+        12 x n boolean matrix where n is the number of locations
+
+    """
+
+    def month_mask(months):
+        mask = np.zeros(12, dtype=bool)
+        mask[[int(month) - 1 for month in months]] = True
+        return mask
+
+    lat = locations["LAT"].values
+    season_mask = np.where(
+        lat >= 0,
+        month_mask(season_dict["NH_season"])[:, np.newaxis],
+        month_mask(season_dict["SH_season"])[:, np.newaxis],
+    )
+    for band in season_dict.get("lat_bands", []):
+        in_band = (lat >= band["min_lat"]) & (lat < band["max_lat"])
+        season_mask[:, in_band] = month_mask(band["season"])[:, np.newaxis]
+    country_seasons = season_dict.get("country_seasons", {})
+    for i, iso3 in enumerate(locations["ISO3"]):
+        if iso3 in country_seasons:
+            season_mask[:, i] = month_mask(country_seasons[iso3])
+
+    return season_mask
+
+
+def covariate_table(locations, column, labels):
+    """
+    Returns the values of a time-varying location attribute (e.g., host
+    percent area or phytosanitary capacity) for each time label as a table.
+    The values of a label are read from the column "{column} {label}" if
+    present and are otherwise carried forward from the previous label,
+    starting from the column itself (or 0 if it is not available).
+
+    Parameters
+    ----------
+    locations : data_frame
+        data frame of countries
+    column : str
+        Name of the attribute column (e.g., Host Percent Area)
+    labels : list
+        List of time labels (e.g., T0, T1, ... or YYYY)
+
+    Returns
+    -------
+    table : numpy.array
+        k x n matrix of attribute values where k is the number of labels
+        and n is the number of locations
+
+    """
+    if column in locations.columns:
+        values = locations[column].values.astype(float)
+    else:
+        values = np.zeros(len(locations))
+    table = np.empty((len(labels), len(locations)))
+    for k, label in enumerate(labels):
+        if f"{column} {label}" in locations.columns:
+            values = locations[f"{column} {label}"].values.astype(float)
+        table[k] = values
+
+    return table
+
+
+def trade_normalization_bounds(
+    trades, date_list, method="year", quantiles=(0.05, 0.95)
+):
+    """
+    Returns the minimum nonzero and maximum trade values used to normalize
+    trade in the probability of entry, computed once for every time step
+    from the trade values of all time steps in the same year.
+
+    Parameters
+    ----------
+    trades : numpy.array
+        t x n x n matrix of trade values for a commodity where t is the # of
+        time steps and n is the # of locations. Rows are destinations (j) and
+        columns are origins (i).
+    date_list : list
+        List of unique time step values (YYYY or YYYYMM)
+    method : str
+        Normalization scheme: "year" for the minimum nonzero and maximum
+        trade of all origin-destination pairs in the year, "origin" for the
+        minimum nonzero and maximum trade of each origin (i) in the year, or
+        "quantile" for quantiles of the nonzero trade of all pairs in the
+        year. Default is "year".
+    quantiles : tuple
+        Lower and upper quantiles [0, 1] used as the minimum and maximum
+        when method is "quantile". Default is (0.05, 0.95).
+
+    Returns
+    -------
+    min_Tc : numpy.array
+        Array of minimum trade values with shape t (year, quantile) or
+        t x n (origin)
+    max_Tc : numpy.array
+        Array of maximum trade values with the same shape as min_Tc
+
+    """
+    years = np.array([str(ts)[:4] for ts in date_list])
+    unique_years, year_idx = np.unique(years, return_inverse=True)
+    year_idx = year_idx.reshape(-1)
+
+    if method == "year":
+        step_min = np.array(
+            [np.min(np.where(trade != 0, trade, np.inf)) for trade in trades]
+        )
+        step_max = np.array([np.nanmax(trade) for trade in trades])
+        year_min = np.full(len(unique_years), np.inf)
+        year_max = np.full(len(unique_years), -np.inf)
+    elif method == "origin":
+        step_min = np.min(np.where(trades != 0, trades, np.inf), axis=1)
+        step_max = np.nanmax(trades, axis=1)
+        year_min = np.full((len(unique_years), trades.shape[2]), np.inf)
+        year_max = np.full((len(unique_years), trades.shape[2]), -np.inf)
+    elif method == "quantile":
+        year_min = np.zeros(len(unique_years))
+        year_max = np.zeros(len(unique_years))
+        for y in range(len(unique_years)):
+            year_trade = trades[year_idx == y]
+            nonzero = year_trade[year_trade != 0]
+            if len(nonzero) > 0:
+                year_min[y], year_max[y] = np.quantile(nonzero, quantiles)
+        return year_min[year_idx], year_max[year_idx]
+    else:
+        raise ValueError(f"Unknown trade normalization method: {method}")
+
+    # Grouped reduction of the time step bounds to annual bounds
+    np.minimum.at(year_min, year_idx, step_min)
+    np.maximum.at(year_max, year_idx, step_max)
+
+    return year_min[year_idx], year_max[year_idx]
+
+
+def joint_trade_normalization_bounds(
+    trades, date_list, method="year", quantiles=(0.05, 0.95)
+):
+    """
+    Returns the trade normalization bounds of each commodity of a joint
+    simulation of commodities (see trade_normalization_bounds).
+
+    Parameters
+    ----------
+    trades : numpy.array
+        t x c x n x n matrix of trade values of c commodities
+    date_list : list
+        List of unique time step values (YYYY or YYYYMM)
+    method : str
+        Normalization scheme (see trade_normalization_bounds). Default is
+        "year".
+    quantiles : tuple
+        Lower and upper quantiles [0, 1] used when method is "quantile".
+        Default is (0.05, 0.95).
+
+    Returns
+    -------
+    min_Tc : numpy.array
+        t x c x n matrix of minimum trade values, one for each time step,
+        commodity, and origin (i)
+    max_Tc : numpy.array
+        t x c x n matrix of maximum trade values
+
+    """
+    n_steps, n_commodities, n_locations = trades.shape[:3]
+    min_Tc = np.empty((n_steps, n_commodities, n_locations))
+    max_Tc = np.empty((n_steps, n_commodities, n_locations))
+    for c in range(n_commodities):
+        bounds = trade_normalization_bounds(
+            trades[:, c], date_list, method=method, quantiles=quantiles
+        )
+        min_Tc[:, c] = np.reshape(bounds[0], (n_steps, -1))
+        max_Tc[:, c] = np.reshape(bounds[1], (n_steps, -1))
+
+    return min_Tc, max_Tc
+
+
 def filter_trades_list(file_list, start_year):
     """
     Returns filtered list of trade data based on start
@@ -108,7 +343,7 @@ def filter_trades_list(file_list, start_year):
 
     """
     for i, f in enumerate(file_list):
-        date_tag = str.split(os.path.splitext(os.path.split(f)[1])[0], "_")[-1][:4]
+        date_tag = time_step_from_path(f)[:4]
         if int(date_tag) < int(start_year):
             file_list[i] = None
     file_list_filtered = [f for f in file_list if f is not None]
@@ -151,12 +386,12 @@ def create_trades_list(commodity_path, commodity_forecast_path, start_year, dist
     commodities_available = glob.glob(commodity_path + "*")
     commodities_available.sort()
     trades_list = []
-    print("Loading and formatting trade data...")
+    logger.info("Loading and formatting trade data...")
     # If trade data are aggregated (i.e., summed across
     # multiple commodity codes)
     if len(commodities_available) == 1:
         code_list = [os.path.split(f)[1] for f in commodities_available]
-        print("\t", commodities_available)
+        logger.info("\t%s", commodities_available)
         file_list_historical = glob.glob(commodity_path + "/*.csv")
         file_list_historical.sort()
         if commodity_forecast_path is not None:
@@ -182,7 +417,7 @@ def create_trades_list(commodity_path, commodity_forecast_path, start_year, dist
         for i in range(len(commodities_available)):
             code_list = [os.path.split(f)[1] for f in commodities_available]
             code = code_list[i]
-            print("\t", commodities_available[i])
+            logger.info("\t%s", commodities_available[i])
             file_list_historical = glob.glob(commodity_path + f"/{code}/*.csv")
             file_list_historical.sort()
 
@@ -212,3 +447,129 @@ def create_trades_list(commodity_path, commodity_forecast_path, start_year, dist
             trades_list.append(trades)
 
     return trades_list, file_list_filtered, code_list, commodities_available
+
+
+def save_trade_cube(path, trades, date_list, iso3_codes):
+    """
+    Saves a t x n x n matrix of trade data, with the time step and ISO3
+    code labels of its axes, as a single binary (.npz) trade cube file.
+
+    Parameters:
+    -----------
+    path : str
+        File path of the trade cube (.npz)
+    trades : numpy.array
+        t x n x n matrix of trade values where t is the # of time steps
+        and n is the # of locations. Rows are destinations (j) and columns
+        are origins (i).
+    date_list : list
+        List of time step values (YYYY or YYYYMM) for the first axis
+    iso3_codes : list
+        List of ISO3 codes for the second and third axes
+
+    Returns:
+    --------
+    none
+
+    """
+    np.savez(
+        path,
+        trades=trades,
+        dates=np.array([str(d) for d in date_list]),
+        iso3=np.array(iso3_codes, dtype=str),
+    )
+
+
+def load_trade_cube(path):
+    """
+    Reads a trade cube file written by save_trade_cube.
+
+    Parameters:
+    -----------
+    path : str
+        File path of the trade cube (.npz)
+
+    Returns:
+    --------
+    trades : numpy.array
+        t x n x n matrix of trade values
+    date_list : list
+        List of time step values (YYYY or YYYYMM) as strings
+    iso3_codes : list
+        List of ISO3 codes for the rows and columns
+
+    """
+    with np.load(path) as cube:
+        trades = cube["trades"]
+        date_list = [str(d) for d in cube["dates"]]
+        iso3_codes = [str(c) for c in cube["iso3"]]
+
+    return trades, date_list, iso3_codes
+
+
+def deflate_and_aggregate_trade(
+    cube_paths, output_path, cpi=None, base_ts=None, csv_dir=None, file_prefix=None
+):
+    """
+    Returns a t x n x n matrix of trade data summed across multiple commodity
+    trade cubes and, optionally, converted from current (nominal) to real
+    values of a base time step using a consumer price index (CPI). The result
+    is saved as a single trade cube.
+
+    Parameters:
+    -----------
+    cube_paths : list
+        List of trade cube file paths (see save_trade_cube), one per
+        commodity code, with matching time steps and ISO3 codes
+    output_path : str
+        File path of the aggregated trade cube (.npz)
+    cpi : pandas.Series or dict
+        CPI values indexed by time step (YYYY or YYYYMM). If None, trade
+        values are not adjusted for inflation. Default is None.
+    base_ts : str
+        Time step (YYYY or YYYYMM) of the CPI value to convert trade values to
+    csv_dir : str
+        Optional directory where an n x n CSV of the aggregated trade data is
+        also saved for each time step. Default is None.
+    file_prefix : str
+        Prefix of CSV file names, saved as {file_prefix}_trades_{ts}.csv
+
+    Returns:
+    --------
+    trades : numpy.array
+        t x n x n matrix of aggregated (and deflated) trade values
+    date_list : list
+        List of time step values (YYYY or YYYYMM)
+    iso3_codes : list
+        List of ISO3 codes for the rows and columns
+
+    """
+    trades, date_list, iso3_codes = load_trade_cube(cube_paths[0])
+    trades = trades.astype(float)
+    # Sum over the commodity axis one cube at a time
+    for path in cube_paths[1:]:
+        commodity_trades, commodity_dates, commodity_codes = load_trade_cube(path)
+        if commodity_dates != date_list or commodity_codes != iso3_codes:
+            raise ValueError(
+                f"Time steps or ISO3 codes of {path} do not match {cube_paths[0]}"
+            )
+        trades += commodity_trades
+
+    # Deflation is linear, so the summed cube is adjusted once with a
+    # broadcast multiply by the t-length vector of CPI ratios
+    if cpi is not None:
+        cpi = pd.Series(cpi).astype(float)
+        cpi.index = cpi.index.astype(str)
+        cpi_ratio = cpi[str(base_ts)] / cpi.loc[date_list].values
+        trades *= cpi_ratio[:, np.newaxis, np.newaxis]
+
+    save_trade_cube(output_path, trades, date_list, iso3_codes)
+
+    if csv_dir is not None:
+        os.makedirs(csv_dir, exist_ok=True)
+        for i, ts in enumerate(date_list):
+            pd.DataFrame(trades[i], index=iso3_codes, columns=iso3_codes).to_csv(
+                csv_dir + f"/{file_prefix}_trades_{ts}.csv"
+            )
+
+    return trades, date_list, iso3_codes
@@ -0,0 +1,211 @@
+"""
+PoPS Pandemic - Simulation
+
+Module containing phase timers, counters, and optional profiling used to
+report where the time of a model run goes.
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def create_report():
+    """
+    Returns an empty timing report.
+
+    Returns
+    -------
+    report : dict
+        Dictionary of phase durations (seconds), counters, and time step
+        durations (seconds)
+
+    """
+    return {"phases": {}, "counters": {}, "steps": []}
+
+
+@contextmanager
+def timed(report, phase):
+    """
+    Adds the wall time of the enclosed block to a named phase of a timing
+    report. Does nothing if the report is None.
+
+    Parameters
+    ----------
+    report : dict
+        Timing report (see create_report) or None
+    phase : str
+        Name of the phase (e.g., load_trades, simulation, save_output)
+
+    """
+    if report is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        report["phases"][phase] = report["phases"].get(phase, 0.0) + elapsed
+
+
+def add_count(report, counter, value):
+    """
+    Adds a value to a named counter of a timing report. Does nothing if the
+    report is None.
+
+    Parameters
+    ----------
+    report : dict
+        Timing report (see create_report) or None
+    counter : str
+        Name of the counter (e.g., pairs_evaluated, introductions)
+    value : int
+        Value to add
+
+    """
+    if report is not None:
+        report["counters"][counter] = report["counters"].get(counter, 0) + int(value)
+
+
+def directory_size(path):
+    """
+    Returns the total size of the files in a directory and its
+    subdirectories.
+
+    Parameters
+    ----------
+    path : str
+        Directory path
+
+    Returns
+    -------
+    size : int
+        Size in bytes
+
+    """
+    size = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            size += os.path.getsize(os.path.join(root, f))
+
+    return size
+
+
+def step_histogram(step_seconds, bins=10):
+    """
+    Returns summary statistics and a histogram of time step durations.
+
+    Parameters
+    ----------
+    step_seconds : list
+        Duration (seconds) of each time step
+    bins : int
+        Number of histogram bins. Default is 10.
+
+    Returns
+    -------
+    histogram : dict
+        Dictionary of the number of steps, total, mean, median, and maximum
+        durations, and histogram counts and bin edges (seconds)
+
+    """
+    step_seconds = np.asarray(step_seconds, dtype=float)
+    if len(step_seconds) == 0:
+        return {"steps": 0}
+    counts, edges = np.histogram(step_seconds, bins=bins)
+
+    return {
+        "steps": len(step_seconds),
+        "total": float(step_seconds.sum()),
+        "mean": float(step_seconds.mean()),
+        "median": float(np.median(step_seconds)),
+        "max": float(step_seconds.max()),
+        "counts": counts.tolist(),
+        "bin_edges": edges.tolist(),
+    }
+
+
+@contextmanager
+def profiling(report, outpath, run_num, profile=False, trace_memory=False):
+    """
+    Optionally profiles the enclosed block with cProfile and traces its
+    peak memory use with tracemalloc. The cProfile statistics are saved to
+    run_{run_num}_profile.prof in the output directory and the peak memory
+    is added to the timing report.
+
+    Parameters
+    ----------
+    report : dict
+        Timing report (see create_report) or None
+    outpath : str
+        Directory path to save the profile
+    run_num : int
+        Run number used to name the profile
+    profile : bool
+        If True, capture cProfile statistics. Default is False.
+    trace_memory : bool
+        If True, trace peak memory use with tracemalloc. Default is False.
+
+    """
+    profiler = cProfile.Profile() if profile else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(f"{outpath}/run_{run_num}_profile.prof")
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if report is not None:
+                report["counters"]["peak_memory_bytes"] = peak
+
+
+def write_timing_report(report, outpath, run_num):
+    """
+    Writes a timing report to run_{run_num}_timing.json in the output
+    directory, next to the model metadata, with a histogram of time step
+    durations in place of the list of durations.
+
+    Parameters
+    ----------
+    report : dict
+        Timing report (see create_report)
+    outpath : str
+        Directory path to save json file
+    run_num : int
+        Run number used to name the json file
+
+    Returns
+    -------
+    None
+
+    """
+    timing = {
+        "phases": report["phases"],
+        "counters": report["counters"],
+        "steps": step_histogram(report["steps"]),
+    }
+    with open(f"{outpath}/run_{run_num}_timing.json", "w") as file:
+        json.dump(timing, file, indent=4)
@@ -0,0 +1,517 @@
+"""
+PoPS Pandemic - Simulation
+
+Module containing the pair kernels used to calculate the probabilities of
+entry, establishment, and introduction for all origin-destination pairs of a
+time step from flat arrays, with a NumPy backend and an optional Numba
+compiled backend.
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import functools
+import math
+import warnings
+import numpy as np
+
+from pandemic.probability_calculations import combined_probability_of_entry
+
+
+def pair_probabilities_loop(
+    origins,
+    destinations,
+    infective,
+    time_step,
+    rho,
+    host,
+    chi,
+    trade,
+    distances,
+    climate_similarities,
+    min_Tc,
+    max_Tc,
+    alpha,
+    beta,
+    mu,
+    lamda_c,
+    phi,
+    w_phi,
+    sigma_h,
+    sigma_kappa,
+):
+    """
+    Returns the probability of entry, establishment, and introduction for
+    each origin-destination pair, evaluating one pair at a time. Uses the same
+    equations as probability_of_entry, probability_of_establishment, and
+    probability_of_introduction, written with scalar operations so the loop
+    can be compiled with Numba.
+
+    Parameters
+    ----------
+    origins : numpy.array
+        Array of k origin (i) location indices
+    destinations : numpy.array
+        Array of k destination (j) location indices
+    infective : numpy.array
+        Array of n months from which each location is infective
+        (NEVER_INFECTIVE where the pest is not present)
+    time_step : int
+        Month of the current time step (see time_step_to_month)
+    rho : numpy.array
+        Array of n phytosanitary capacities
+    host : numpy.array
+        Array of n host percent areas
+    chi : numpy.array
+        Array of n seasonality values for the current time step
+    trade : numpy.array
+        n x n matrix of trade for the current time step
+    distances : numpy.array
+        n x n matrix of distances
+    climate_similarities : numpy.array
+        n x n matrix of climate similarities
+    min_Tc : numpy.array
+        Array of n minimum trade values, one for each origin (i)
+    max_Tc : numpy.array
+        Array of n maximum trade values, one for each origin (i)
+    alpha, beta, mu, lamda_c, phi, w_phi, sigma_h, sigma_kappa : float
+        Model parameters (see pandemic_single_time_step)
+
+    Returns
+    -------
+    probability_of_entry : numpy.array
+        Array of k probabilities of entry
+    probability_of_establishment : numpy.array
+        Array of k probabilities of establishment
+    probability_of_introduction : numpy.array
+        Array of k probabilities of introduction
+
+    """
+    n_pairs = len(origins)
+    entry = np.zeros(n_pairs)
+    establishment = np.zeros(n_pairs)
+    for k in range(n_pairs):
+        i = origins[k]
+        j = destinations[k]
+        # skip origins that are not yet infective
+        if infective[i] > time_step:
+            continue
+        T_ijct = trade[j, i]
+        if T_ijct != 0:
+            T_ijct = min(max(T_ijct, min_Tc[i]), max_Tc[i])
+            entry[k] = (
+                (1 - rho[i])
+                * (1 - rho[j])
+                * lamda_c
+                * ((T_ijct - min_Tc[i]) / (max_Tc[i] - min_Tc[i]))
+                * math.exp((-1) * mu * distances[j, i])
+                * chi[i]
+            )
+        delta_kappa_ijt = 1 - climate_similarities[j, i]
+        h_jt = 1 - host[j]
+        establishment[k] = (
+            phi
+            * w_phi
+            * alpha
+            * math.exp(
+                (-1)
+                * beta
+                * (((delta_kappa_ijt / sigma_kappa) ** 2) + ((h_jt / sigma_h) ** 2))
+            )
+        )
+
+    return entry, establishment, entry * establishment
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_pair_probabilities():
+    """
+    Returns pair_probabilities_loop compiled with Numba, or None if Numba is
+    not installed. Numba is only imported on the first call, so runs with the
+    python and numpy backends do not pay for its import.
+    """
+    try:
+        import numba
+    except ImportError:
+        return None
+
+    return numba.njit(cache=True)(pair_probabilities_loop)
+
+
+def pair_probabilities_numpy(
+    origins,
+    destinations,
+    infective,
+    time_step,
+    rho,
+    host,
+    chi,
+    trade,
+    distances,
+    climate_similarities,
+    min_Tc,
+    max_Tc,
+    alpha,
+    beta,
+    mu,
+    lamda_c,
+    phi,
+    w_phi,
+    sigma_h,
+    sigma_kappa,
+):
+    """
+    Returns the probability of entry, establishment, and introduction for
+    each origin-destination pair with array operations over all pairs. See
+    pair_probabilities_loop for parameters and returns. If trade is a
+    c x n x n stack of commodities simulated jointly, with c x n trade
+    bounds and c commodity importances, the probabilities of entry are
+    computed for all commodities at once and combined (see
+    combined_probability_of_entry).
+    """
+    i = origins
+    j = destinations
+    joint = np.ndim(trade) == 3
+    if joint:
+        lamda_c = np.asarray(lamda_c, dtype=float)[:, np.newaxis]
+    active = infective[i] <= time_step
+    T_ijct = trade[..., j, i]
+    traded = active & (T_ijct != 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        T_ijct = np.minimum(np.maximum(T_ijct, min_Tc[..., i]), max_Tc[..., i])
+        entry = (
+            (1 - rho[i])
+            * (1 - rho[j])
+            * lamda_c
+            * ((T_ijct - min_Tc[..., i]) / (max_Tc[..., i] - min_Tc[..., i]))
+            * np.exp((-1) * mu * distances[j, i])
+            * chi[i]
+        )
+    entry = np.where(traded, entry, 0.0)
+    if joint:
+        entry = combined_probability_of_entry(entry)
+
+    delta_kappa_ijt = 1 - climate_similarities[j, i]
+    h_jt = 1 - host[j]
+    establishment = (
+        phi
+        * w_phi
+        * alpha
+        * np.exp(
+            (-1)
+            * beta
+            * (((delta_kappa_ijt / sigma_kappa) ** 2) + ((h_jt / sigma_h) ** 2))
+        )
+    )
+    establishment = np.where(active, establishment, 0.0)
+
+    return entry, establishment, entry * establishment
+
+
+def joint_pair_probabilities(pair_function, *args):
+    """
+    Returns the probability of entry, establishment, and introduction for
+    each origin-destination pair of commodities simulated jointly,
+    evaluating each commodity with a pair function and combining the
+    probabilities of entry (see combined_probability_of_entry). The trade
+    argument is a c x n x n stack of commodities, the trade bounds are c x n
+    matrices, and lamda_c is an array of c commodity importances. See
+    pair_probabilities_loop for the other parameters and returns.
+    """
+    args = list(args)
+    trade, min_Tc, max_Tc, lamda_c = args[7], args[10], args[11], args[15]
+    entries = []
+    for c in range(len(lamda_c)):
+        args[7] = np.ascontiguousarray(trade[c])
+        args[10] = np.ascontiguousarray(min_Tc[c])
+        args[11] = np.ascontiguousarray(max_Tc[c])
+        args[15] = float(lamda_c[c])
+        entry, establishment, _ = pair_function(*args)
+        entries.append(entry)
+    entry = combined_probability_of_entry(entries)
+
+    return entry, establishment, entry * establishment
+
+
+def pair_probabilities_factors(
+    origins,
+    destinations,
+    infective,
+    time_step,
+    entry_factor,
+    distance_factor,
+    climate_factor,
+    host_factor,
+    lamda_c,
+    establishment_scale,
+):
+    """
+    Returns the probability of entry, establishment, and introduction for
+    each origin-destination pair from precomputed factors of the equations
+    (see static_pair_factors), so factors that do not depend on the
+    parameters being varied are not computed again for each parameter set.
+
+    Parameters
+    ----------
+    origins : numpy.array
+        Array of k origin (i) location indices
+    destinations : numpy.array
+        Array of k destination (j) location indices
+    infective : numpy.array
+        Array of n months from which each location is infective
+        (NEVER_INFECTIVE where the pest is not present)
+    time_step : int
+        Month of the current time step (see time_step_to_month)
+    entry_factor : numpy.array
+        n x n matrix (or c x n x n matrices of commodities simulated
+        jointly) of (1 - rho_i) * (1 - rho_j) * normalized trade * chi_i for
+        the current time step, 0 where there is no trade
+    distance_factor : numpy.array
+        n x n matrix of exp(-mu * d_ij)
+    climate_factor : numpy.array
+        n x n matrix of exp(-beta * (delta_kappa_ij / sigma_kappa) ** 2)
+    host_factor : numpy.array
+        Array of n exp(-beta * (h_j / sigma_h) ** 2) for the current time
+        step
+    lamda_c : float or numpy.array
+        Commodity importance, or array of c importances of commodities
+        simulated jointly
+    establishment_scale : float
+        phi * w_phi * alpha
+
+    Returns
+    -------
+    probability_of_entry : numpy.array
+        Array of k probabilities of entry
+    probability_of_establishment : numpy.array
+        Array of k probabilities of establishment
+    probability_of_introduction : numpy.array
+        Array of k probabilities of introduction
+
+    """
+    i = origins
+    j = destinations
+    joint = np.ndim(entry_factor) == 3
+    if joint:
+        lamda_c = np.asarray(lamda_c, dtype=float)[:, np.newaxis]
+    active = infective[i] <= time_step
+
+    entry = entry_factor[..., j, i] * lamda_c * distance_factor[j, i]
+    if joint:
+        entry = combined_probability_of_entry(entry)
+    entry = np.where(active, entry, 0.0)
+    establishment = establishment_scale * climate_factor[j, i] * host_factor[j]
+    establishment = np.where(active, establishment, 0.0)
+
+    return entry, establishment, entry * establishment
+
+
+def climate_factor(climate_similarities, beta, sigma_kappa):
+    """
+    Returns the n x n matrix of climate factors of the probability of
+    establishment, exp(-beta * (delta_kappa_ij / sigma_kappa) ** 2).
+
+    Parameters
+    ----------
+    climate_similarities : numpy.array
+        n x n matrix of climate similarities
+    beta, sigma_kappa : float
+        Model parameters (see pandemic_single_time_step)
+
+    Returns
+    -------
+    climate_factor : numpy.array
+        n x n matrix of climate factors
+
+    """
+    delta_kappa = 1 - np.asarray(climate_similarities, dtype=float)
+
+    return np.exp((-1) * beta * (delta_kappa / sigma_kappa) ** 2)
+
+
+def parameter_factors(
+    pair_factors,
+    distances,
+    climate_similarities,
+    host_table,
+    beta,
+    mu,
+    sigma_h,
+    sigma_kappa,
+):
+    """
+    Returns the factors of the pair probabilities that depend on the
+    parameters of a simulation (see pair_probabilities_factors), reusing the
+    climate factor of pair_factors if it was computed with the same beta and
+    sigma_kappa.
+
+    Parameters
+    ----------
+    pair_factors : dict
+        Precomputed factors (see static_pair_factors)
+    distances : numpy.array
+        n x n matrix of distances
+    climate_similarities : numpy.array
+        n x n matrix of climate similarities
+    host_table : numpy.array
+        t x n matrix of host percent areas of each time step
+    beta, mu, sigma_h, sigma_kappa : float
+        Model parameters (see pandemic_single_time_step)
+
+    Returns
+    -------
+    distance_factor : numpy.array
+        n x n matrix of exp(-mu * d_ij)
+    climate_factor : numpy.array
+        n x n matrix of climate factors (see climate_factor)
+    host_factors : numpy.array
+        t x n matrix of exp(-beta * (h_jt / sigma_h) ** 2)
+
+    """
+    climate = pair_factors["climate"]
+    if climate is None or (pair_factors["beta"], pair_factors["sigma_kappa"]) != (
+        beta,
+        sigma_kappa,
+    ):
+        climate = climate_factor(climate_similarities, beta, sigma_kappa)
+
+    return (
+        np.exp((-1) * mu * np.asarray(distances, dtype=float)),
+        climate,
+        np.exp((-1) * beta * ((1 - host_table) / sigma_h) ** 2),
+    )
+
+
+def pair_probabilities(*args, backend="numpy"):
+    """
+    Returns the probability of entry, establishment, and introduction for
+    each origin-destination pair using the selected backend. See
+    pair_probabilities_loop for parameters and returns.
+
+    Parameters
+    ----------
+    backend : str
+        "numpy" for array operations or "numba" for the compiled pair loop.
+        Falls back to "numpy" with a warning if Numba is not installed.
+        Default is "numpy".
+    """
+    if backend == "numba":
+        pair_probabilities_numba = compiled_pair_probabilities()
+        if pair_probabilities_numba is not None:
+            if np.ndim(args[7]) == 3:
+                return joint_pair_probabilities(pair_probabilities_numba, *args)
+            return pair_probabilities_numba(*args)
+        warnings.warn("Numba is not installed, using the NumPy backend")
+    elif backend != "numpy":
+        raise ValueError(f"Unknown backend: {backend}")
+
+    return pair_probabilities_numpy(*args)
+
+
+def evaluate_pairs(
+    n_locations, origins, destinations, *args, backend="numpy", rng=None
+):
+    """
+    Returns n x n matrices of the probabilities of entry, establishment, and
+    introduction and of introductions for a time step, and the origin and
+    destination indices of the introductions. An introduction happens when
+    a uniform draw, one per pair in pair order, is below its probability of
+    introduction, so all backends draw the same introductions from the same
+    random number stream.
+
+    Parameters
+    ----------
+    n_locations : int
+        Number of locations (n)
+    origins : numpy.array
+        Array of k origin (i) location indices
+    destinations : numpy.array
+        Array of k destination (j) location indices
+    args
+        Remaining arrays and parameters of pair_probabilities_loop
+    backend : str
+        "numpy" or "numba" (see pair_probabilities). Default is "numpy".
+    rng : numpy.random.Generator
+        Random number generator of the time step (see create_generator). If
+        None, a generator seeded from operating system entropy is used.
+        Default is None.
+
+    Returns
+    -------
+    entry_probabilities : numpy.array
+        n x n matrix of probabilities of entry
+    establishment_probabilities : numpy.array
+        n x n matrix of probabilities of establishment
+    introduction_probabilities : numpy.array
+        n x n matrix of probabilities of introduction
+    introduction_country : numpy.array
+        n x n matrix of introductions (1) by destination (j) and origin (i)
+    introduced_origins : numpy.array
+        Origin (i) indices of introductions, in pair order
+    introduced_destinations : numpy.array
+        Destination (j) indices of introductions, in pair order
+
+    """
+    origins = np.asarray(origins, dtype=np.int64)
+    destinations = np.asarray(destinations, dtype=np.int64)
+    probabilities = pair_probabilities(origins, destinations, *args, backend=backend)
+
+    return draw_introductions(n_locations, origins, destinations, *probabilities, rng)
+
+
+def draw_introductions(
+    n_locations, origins, destinations, entry, establishment, introduction, rng=None
+):
+    """
+    Returns n x n matrices of the probabilities of entry, establishment, and
+    introduction and of introductions for a time step from the
+    probabilities of each pair, and the origin and destination indices of
+    the introductions. See evaluate_pairs for returns.
+
+    Parameters
+    ----------
+    n_locations : int
+        Number of locations (n)
+    origins : numpy.array
+        Array of k origin (i) location indices
+    destinations : numpy.array
+        Array of k destination (j) location indices
+    entry : numpy.array
+        Array of k probabilities of entry
+    establishment : numpy.array
+        Array of k probabilities of establishment
+    introduction : numpy.array
+        Array of k probabilities of introduction
+    rng : numpy.random.Generator
+        Random number generator of the time step (see create_generator). If
+        None, a generator seeded from operating system entropy is used.
+        Default is None.
+
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    introduced = rng.random(len(introduction)) < introduction
+
+    matrices = np.zeros((4, n_locations, n_locations))
+    matrices[0, destinations, origins] = entry
+    matrices[1, destinations, origins] = establishment
+    matrices[2, destinations, origins] = introduction
+    matrices[3, destinations, origins] = introduced
+
+    return (
+        matrices[0],
+        matrices[1],
+        matrices[2],
+        matrices[3],
+        origins[introduced],
+        destinations[introduced],
+    )
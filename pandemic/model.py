@@ -1,12 +1,50 @@
+"""
+PoPS Pandemic - Simulation
+
+Runs the Pandemic model for each commodity of a configuration and saves the
+model outputs. The inputs are loaded once with load_inputs and can be reused
+for many runs of run_simulation, e.g., by a long-lived worker. From the
+command line:
+
+    python -m pandemic config.json sim_name add_descript run_num
+
+Inputs compiled into a bundle (see pandemic.bundle) are read with --bundle.
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import argparse
 import json
+import logging
 import os
-import sys
-import geopandas
+
 import numpy as np
 import pandas as pd
-from dotenv import load_dotenv
+
+from pandemic.bundle import derived_constants, read_bundle
+from pandemic.checkpoints import has_checkpoint
+from pandemic.expected_value import expected_presence, expected_presence_table
 from pandemic.helpers import create_trades_list
+from pandemic.instrumentation import (
+    add_count,
+    create_report,
+    directory_size,
+    profiling,
+    timed,
+    write_timing_report,
+)
 from pandemic.model_equations import pandemic_multiple_time_steps
+from pandemic.scenarios import prefix_hash, simulate_prefix, snapshot_matches
+from pandemic.time_steps import date_list_from_files
 from pandemic.output_files import (
     aggregate_monthly_output_to_annual,
     create_model_dirs,
@@ -14,142 +52,257 @@ from pandemic.output_files import (
     write_model_metadata,
 )
 
-# Read environmental variables
-load_dotenv(os.path.join(".env"))
-data_dir = os.getenv("DATA_PATH")
-input_dir = os.getenv("INPUT_PATH")
-out_dir = os.getenv("OUTPUT_PATH")
-countries_path = os.getenv("COUNTRIES_PATH")
-
-# Read model arguments from configuration file
-path_to_config_json = sys.argv[1]
-with open(path_to_config_json) as json_file:
-    config = json.load(json_file)
-
-commodity_path = config["commodity_path"]
-commodity_forecast_path = config["commodity_forecast_path"]
-native_countries_list = config["native_countries_list"]
-season_dict = config["season_dict"]
-alpha = config["alpha"]
-beta = 0.5
-mu = config["mu"]
-lamda_c_list = config["lamda_c_list"]
-phi = config["phi"]
-w_phi = config["w_phi"]
-start_year = config["start_year"]
-random_seed = config["random_seed"]
-cols_to_drop = config["columns_to_drop"]
-time_infect_units = config["transmission_lag_unit"]
-transmission_lag_type = config["transmission_lag_type"]
-time_infect = config["time_to_infectivity"]
-gamma_shape = config["transmission_lag_shape"]
-gamma_scale = config["transmission_lag_scale"]
-save_main_output = config["save_main_output"]
-save_metadata = config["save_metadata"]
-save_entry = config["save_entry"]
-save_estab = config["save_estab"]
-save_intro = config["save_intro"]
-save_country_intros = config["save_country_intros"]
-
-countries = geopandas.read_file(countries_path, driver="GPKG")
-distances = np.load(input_dir + "/distance_matrix_wTWN.npy")
-# climate_similarities = np.load(input_dir + '/climate_similarities.npy')
-climate_similarities = np.load(input_dir + "/climate_similarities_hiiMask_wTWN.npy")
-
-# Read & format trade data
-trades_list, file_list_filtered, code_list, commodities_available = create_trades_list(
-    commodity_path=commodity_path,
-    commodity_forecast_path=commodity_forecast_path,
-    start_year=start_year,
-    distances=distances,
-)
+logger = logging.getLogger("pandemic")
 
-# Create list of unique dates from trade data
-date_list = []
-for f in file_list_filtered:
-    fn = os.path.split(f)[1]
-    ts = str.split(os.path.splitext(fn)[0], "_")[-1]
-    date_list.append(ts)
-date_list.sort()
-stop_year = date_list[-1][:4]
-
-# Example trade array for formatting outputs
-traded = pd.read_csv(
-    file_list_filtered[0], sep=",", header=0, index_col=0, encoding="latin1"
-)
+# arguments of pandemic_multiple_time_steps also used by expected_presence
+EXPECTED_VALUE_ARGS = [
+    "distances",
+    "climate_similarities",
+    "alpha",
+    "beta",
+    "mu",
+    "lamda_c",
+    "phi",
+    "sigma_h",
+    "sigma_kappa",
+    "w_phi",
+    "season_dict",
+    "transmission_lag_type",
+    "time_infect_units",
+    "time_infect",
+    "gamma_shape",
+    "gamma_scale",
+    "trade_normalization",
+]
 
-# Checking trade array shapes
-print("Length of trades list: ", len(trades_list))
-for i in range(len(trades_list)):
-    print("\tcommodity array shape: ", trades_list[i].shape)
+# configuration parameters that can be changed for the forecast period only
+# (forecast_parameters) and the arguments of pandemic_multiple_time_steps
+# they set. lamda_c_list sets lamda_c.
+FORECAST_PARAMETERS = {
+    "alpha": "alpha",
+    "mu": "mu",
+    "phi": "phi",
+    "w_phi": "w_phi",
+    "lamda_c_list": "lamda_c",
+    "transmission_lag_type": "transmission_lag_type",
+    "transmission_lag_unit": "time_infect_units",
+    "time_to_infectivity": "time_infect",
+    "transmission_lag_shape": "gamma_shape",
+    "transmission_lag_scale": "gamma_scale",
+}
 
 
-# Run Model for Selected Time Steps and Commodities
-print("Number of commodities: ", len([c for c in lamda_c_list if c > 0]))
-print("Number of time steps: ", trades_list[0].shape[0])
-for i in range(len(trades_list)):
-    if len(trades_list) > 1:
-        code = code_list[i]
-        print("\nRunning model for commodity: ", code)
-    else:
-        code = code_list[0]
-        print(
-            "\nRunning model for commodity: ",
-            os.path.basename(commodities_available[0]),
-        )
-    trades = trades_list[i]
-    distances = distances
-    locations = countries
-    prob = np.zeros(len(countries.index))
-    pres_ts0 = [False] * len(prob)
-    infect_ts0 = np.empty(locations.shape[0], dtype="object")
-    for country in native_countries_list:
-        country_index = countries.index[countries["NAME"] == country][0]
-        pres_ts0[country_index] = True
-        # if time steps are monthly and time to infectivity is in years
-        if len(date_list[0]) > 4:
-            infect_ts0[country_index] = str(start_year) + "01"
-        # else if time steps are annual and time to infectivity is in years
-        else:
-            infect_ts0[country_index] = str(start_year)
+def load_countries(countries_path):
+    """
+    Returns the table of countries and their attributes. Tables (.csv) are
+    read with pandas and other formats (e.g., GeoPackage) with geopandas,
+    which is only imported when geometry is read.
+
+    Parameters
+    ----------
+    countries_path : str
+        Path of the countries file
+
+    Returns
+    -------
+    countries : data_frame
+        data frame (or geodataframe) of countries
+
+    """
+    if countries_path.endswith(".csv"):
+        return pd.read_csv(countries_path, keep_default_na=False, na_values=[""])
 
-    locations["Presence"] = pres_ts0
-    locations["Infective"] = infect_ts0
-    iu1 = np.triu_indices(climate_similarities.shape[0], 1)
+    import geopandas
 
-    sigma_h = (1 - countries["Host Percent Area"]).std()
-    sigma_kappa = np.std(1 - climate_similarities[iu1])
+    return geopandas.read_file(countries_path, driver="GPKG")
 
-    np.random.seed(random_seed)
-    lamda_c = lamda_c_list[i]
 
-    if lamda_c > 0:
-        e = pandemic_multiple_time_steps(
-            trades=trades,
+def load_inputs(config, input_dir, countries_path):
+    """
+    Returns the model inputs of a configuration: countries, distances,
+    climate similarities, and trades of each commodity.
+
+    Parameters
+    ----------
+    config : dict
+        Model configuration
+    input_dir : str
+        Directory path of the distance and climate similarity matrices
+    countries_path : str
+        Path of the countries file (see load_countries)
+
+    Returns
+    -------
+    inputs : dict
+        Dictionary of the countries, distances, climate similarities,
+        trades list, commodity codes, commodity paths, date list, example
+        trade matrix used to format outputs, and timing report of loading
+
+    """
+    load_report = create_report()
+    with timed(load_report, "load_inputs"):
+        countries = load_countries(countries_path)
+        distances = np.load(input_dir + "/distance_matrix_wTWN.npy")
+        climate_similarities = np.load(
+            input_dir + "/climate_similarities_hiiMask_wTWN.npy"
+        )
+
+    # Read & format trade data
+    with timed(load_report, "load_trades"):
+        (
+            trades_list,
+            file_list_filtered,
+            code_list,
+            commodities_available,
+        ) = create_trades_list(
+            commodity_path=config["commodity_path"],
+            commodity_forecast_path=config["commodity_forecast_path"],
+            start_year=config["start_year"],
             distances=distances,
-            locations=locations,
-            climate_similarities=climate_similarities,
-            alpha=alpha,
-            beta=beta,
-            mu=mu,
-            lamda_c=lamda_c,
-            phi=phi,
-            sigma_h=sigma_h,
-            sigma_kappa=sigma_kappa,
-            w_phi=w_phi,
-            start_year=start_year,
-            date_list=date_list,
-            season_dict=season_dict,
-            transmission_lag_type=transmission_lag_type,
-            time_infect_units=time_infect_units,
-            time_infect=time_infect,
-            gamma_shape=gamma_shape,
-            gamma_scale=gamma_scale,
         )
 
-        sim_name = sys.argv[2]
-        add_descript = sys.argv[3]
-        run_num = sys.argv[4]
+    # Example trade array for formatting outputs
+    example_trade_matrix = pd.read_csv(
+        file_list_filtered[0], sep=",", header=0, index_col=0, encoding="latin1"
+    )
+
+    # Checking trade array shapes
+    logger.info("Length of trades list: %d", len(trades_list))
+    for trades in trades_list:
+        logger.info("\tcommodity array shape: %s", trades.shape)
+
+    return {
+        "countries": countries,
+        "distances": distances,
+        "climate_similarities": climate_similarities,
+        "trades_list": trades_list,
+        "code_list": code_list,
+        "commodities_available": commodities_available,
+        # Create list of unique dates from trade data
+        "date_list": date_list_from_files(file_list_filtered),
+        "example_trade_matrix": example_trade_matrix,
+        "load_report": load_report,
+    }
+
+
+def run_simulation(config, inputs, out_dir, sim_name, add_descript, run_num):
+    """
+    Runs the model for each commodity transporting the pest (lamda_c > 0)
+    and saves the outputs of each to
+    {out_dir}/{sim_name}/{sim_name}_{add_descript}_{code}/run_{run_num}/.
+    The inputs are not modified, so they can be reused for other runs.
+
+    Parameters
+    ----------
+    config : dict
+        Model configuration
+    inputs : dict
+        Model inputs (see load_inputs)
+    out_dir : str
+        Directory path of the model outputs
+    sim_name : str
+        Simulation name
+    add_descript : str
+        Additional description of the simulation
+    run_num : int
+        Run (realization) number
+
+    Returns
+    -------
+    outpaths : dict
+        Dictionary of commodity codes and output directory paths
+
+    """
+    countries = inputs["countries"]
+    distances = inputs["distances"]
+    climate_similarities = inputs["climate_similarities"]
+    trades_list = inputs["trades_list"]
+    code_list = inputs["code_list"]
+    commodities_available = inputs["commodities_available"]
+    date_list = inputs["date_list"]
+    stop_year = date_list[-1][:4]
+
+    native_countries_list = config["native_countries_list"]
+    lamda_c_list = config["lamda_c_list"]
+    start_year = config["start_year"]
+    beta = 0.5
+    checkpoint_every = config.get("checkpoint_every", 0)
+    fork_date = config.get("fork_date", None)
+    snapshot_path = config.get("snapshot_path", f"{out_dir}/snapshots")
+
+    # parameters of the forecast period only change the time steps after the
+    # fork date, so scenarios with other forecast parameters share the
+    # snapshot of the historical period
+    forecast_parameters = config.get("forecast_parameters", {})
+    unknown = sorted(set(forecast_parameters) - set(FORECAST_PARAMETERS))
+    if unknown:
+        raise ValueError(f"Unknown forecast parameters: {', '.join(unknown)}")
+    if forecast_parameters and fork_date is None:
+        raise ValueError("forecast_parameters require a fork_date")
+    forecast_lamda_c_list = forecast_parameters.get("lamda_c_list", lamda_c_list)
+
+    # commodities transporting the pest can be simulated jointly in a single
+    # pass with t x c x n x n trades, combining their probabilities of entry
+    joint_commodities = config.get("joint_commodities", False)
+    lamda_c_values = list(lamda_c_list)
+    forecast_lamda_c_values = list(forecast_lamda_c_list)
+    if joint_commodities:
+        joint = [
+            i
+            for i, lamda_c in enumerate(zip(lamda_c_list, forecast_lamda_c_list))
+            if max(lamda_c) > 0
+        ]
+        joint = joint or list(range(len(trades_list)))
+        logger.info("Simulating %d commodities jointly", len(joint))
+        trades_list = [np.stack([trades_list[i] for i in joint], axis=1)]
+        code_list = ["joint"]
+        lamda_c_values = [np.array([lamda_c_list[i] for i in joint])]
+        forecast_lamda_c_values = [np.array([forecast_lamda_c_list[i] for i in joint])]
+        commodities_available = [[commodities_available[i] for i in joint]]
+
+    # Run Model for Selected Time Steps and Commodities
+    logger.info("Number of commodities: %d", len([c for c in lamda_c_list if c > 0]))
+    logger.info("Number of time steps: %d", trades_list[0].shape[0])
+    outpaths = {}
+    for i in range(len(trades_list)):
+        if len(trades_list) > 1 or joint_commodities:
+            code = code_list[i]
+            logger.info("Running model for commodity: %s", code)
+        else:
+            code = code_list[0]
+            logger.info(
+                "Running model for commodity: %s",
+                os.path.basename(commodities_available[0]),
+            )
+        trades = trades_list[i]
+        locations = countries.copy()
+        pres_ts0 = [False] * len(locations)
+        infect_ts0 = np.empty(locations.shape[0], dtype="object")
+        for country in native_countries_list:
+            country_index = countries.index[countries["NAME"] == country][0]
+            pres_ts0[country_index] = True
+            # if time steps are monthly and time to infectivity is in years
+            if len(date_list[0]) > 4:
+                infect_ts0[country_index] = str(start_year) + "01"
+            # else if time steps are annual and time to infectivity is in years
+            else:
+                infect_ts0[country_index] = str(start_year)
+
+        locations["Presence"] = pres_ts0
+        locations["Infective"] = infect_ts0
+        # normalizing constants are precomputed in an input bundle
+        constants = inputs.get("constants") or derived_constants(
+            countries, climate_similarities
+        )
+        sigma_h = constants["sigma_h"]
+        sigma_kappa = constants["sigma_kappa"]
+
+        lamda_c = lamda_c_values[i]
+        forecast_lamda_c = forecast_lamda_c_values[i]
+
+        if max(np.max(lamda_c), np.max(forecast_lamda_c)) <= 0:
+            logger.info("\tskipping as pest is not transported with this commodity")
+            continue
 
         run_prefix = f"{sim_name}_{add_descript}_{code}"
 
@@ -161,53 +314,225 @@ for i in range(len(trades_list)):
         }
 
         outpath = out_dir + f"/{sim_name}/{run_prefix}/run_{run_num}/"
-        create_model_dirs(outpath=outpath, output_dict=arr_dict)
-        print("saving model outputs: ", outpath)
-        full_out_df = save_model_output(
-            model_output_object=e,
-            example_trade_matrix=traded,
+        create_model_dirs(
             outpath=outpath,
-            date_list=date_list,
-            write_entry_probs=save_entry,
-            write_estab_probs=save_estab,
-            write_intro_probs=save_intro,
-            write_country_intros=save_country_intros,
+            output_dict=arr_dict,
+            write_entry_probs=config["save_entry"],
+            write_estab_probs=config["save_estab"],
+            write_intro_probs=config["save_intro"],
+            write_country_intros=config["save_country_intros"],
         )
 
-        # If time steps are monthly, aggregate predictions to
-        # annual for dashboard display
-        if len(date_list[i]) > 4:
-            print("aggregating monthly predictions to annual time steps...")
-            aggregate_monthly_output_to_annual(
-                formatted_geojson=full_out_df, outpath=outpath
-            )
-
-        # Save model metadata to text file
-        print("writing model metadata...")
-        write_model_metadata(
-            main_model_output=e[0],
-            alpha=alpha,
+        model_kwargs = dict(
+            distances=distances,
+            climate_similarities=climate_similarities,
+            alpha=config["alpha"],
             beta=beta,
-            mu=mu,
-            lamda_c_list=lamda_c_list,
-            phi=phi,
+            mu=config["mu"],
+            lamda_c=lamda_c,
+            phi=config["phi"],
             sigma_h=sigma_h,
-            w_phi=w_phi,
             sigma_kappa=sigma_kappa,
+            w_phi=config["w_phi"],
             start_year=start_year,
-            stop_year=stop_year,
-            transmission_lag_type=transmission_lag_type,
-            time_infect_units=time_infect_units,
-            gamma_shape=gamma_shape,
-            gamma_scale=gamma_scale,
-            random_seed=random_seed,
-            time_infect=time_infect,
-            native_countries_list=native_countries_list,
-            commodities_available=commodities_available[i],
-            commodity_forecast_path=commodity_forecast_path,
-            phyto_weights=list(locations["Phytosanitary Capacity"].unique()),
-            outpath=outpath,
-            run_num=run_num,
+            season_dict=config["season_dict"],
+            transmission_lag_type=config["transmission_lag_type"],
+            time_infect_units=config["transmission_lag_unit"],
+            time_infect=config["time_to_infectivity"],
+            gamma_shape=config["transmission_lag_shape"],
+            gamma_scale=config["transmission_lag_scale"],
+            trade_normalization=config.get("trade_normalization", "year"),
+            backend=config.get("backend", "python"),
+            precision=config.get("precision", "double"),
+            random_seed=config["random_seed"],
+            run=int(run_num),
+            commodity=i,
         )
+        forecast_kwargs = dict(
+            model_kwargs,
+            **{
+                FORECAST_PARAMETERS[key]: value
+                for key, value in forecast_parameters.items()
+                if key != "lamda_c_list"
+            },
+            lamda_c=forecast_lamda_c,
+        )
+
+        # approximate probabilities of presence from a single deterministic
+        # run instead of a stochastic realization
+        if config.get("expected_value", False):
+            presence_probabilities, _ = expected_presence(
+                trades=trades,
+                locations=locations,
+                date_list=date_list,
+                **{key: model_kwargs[key] for key in EXPECTED_VALUE_ARGS},
+            )
+            logger.info("saving expected probabilities of presence: %s", outpath)
+            expected_presence_table(
+                locations, presence_probabilities, date_list
+            ).to_csv(outpath + "expected_presence.csv", index=False)
+            outpaths[code] = outpath
+            continue
+
+        # checkpoint the model state every checkpoint_every time steps and
+        # resume from the last checkpoint of an interrupted run
+        checkpoint_dir = outpath + "checkpoint"
+
+        run_report = create_report()
+        run_report["phases"].update(inputs["load_report"]["phases"])
+        with profiling(
+            run_report,
+            outpath,
+            run_num,
+            profile=config.get("profile", False),
+            trace_memory=config.get("trace_memory", False),
+        ):
+            # scenarios sharing the historical period resume from a snapshot
+            # of the model state at the fork date, simulated once for each
+            # commodity and realization with the parameters of the historical
+            # period (forecast_parameters apply after the fork date only)
+            resume_from = None
+            if fork_date is not None:
+                snapshot_dir = f"{snapshot_path}/{code}/run_{run_num}"
+                inputs_hash = prefix_hash(
+                    trades, date_list, locations, fork_date, **model_kwargs
+                )
+                if not snapshot_matches(snapshot_dir, inputs_hash):
+                    if has_checkpoint(snapshot_dir):
+                        logger.warning(
+                            "snapshot %s was simulated from other inputs, "
+                            "simulating the historical period again",
+                            snapshot_dir,
+                        )
+                    with timed(run_report, "historical_period"):
+                        simulate_prefix(
+                            snapshot_dir,
+                            trades,
+                            date_list,
+                            locations,
+                            fork_date,
+                            **model_kwargs,
+                        )
+                resume_from = snapshot_dir
+            if config.get("resume", False) and has_checkpoint(checkpoint_dir):
+                resume_from = checkpoint_dir
+
+            with timed(run_report, "simulation"):
+                e = pandemic_multiple_time_steps(
+                    trades=trades,
+                    locations=locations,
+                    date_list=date_list,
+                    report=run_report,
+                    checkpoint_dir=checkpoint_dir if checkpoint_every > 0 else None,
+                    checkpoint_every=checkpoint_every,
+                    resume_from=resume_from,
+                    **forecast_kwargs,
+                )
+
+            with timed(run_report, "save_output"):
+                logger.info("saving model outputs: %s", outpath)
+                full_out_df = save_model_output(
+                    model_output_object=e,
+                    example_trade_matrix=inputs["example_trade_matrix"],
+                    outpath=outpath,
+                    date_list=date_list,
+                    write_entry_probs=config["save_entry"],
+                    write_estab_probs=config["save_estab"],
+                    write_intro_probs=config["save_intro"],
+                    write_country_intros=config["save_country_intros"],
+                )
+
+            # If time steps are monthly, aggregate predictions to
+            # annual for dashboard display
+            if len(date_list[0]) > 4:
+                logger.info("aggregating monthly predictions to annual time steps...")
+                with timed(run_report, "aggregate_annual"):
+                    aggregate_monthly_output_to_annual(
+                        formatted_geojson=full_out_df, outpath=outpath
+                    )
+
+            # Save model metadata to text file
+            logger.info("writing model metadata...")
+            write_model_metadata(
+                main_model_output=e[0],
+                alpha=config["alpha"],
+                beta=beta,
+                mu=config["mu"],
+                lamda_c_list=lamda_c_list,
+                phi=config["phi"],
+                sigma_h=sigma_h,
+                w_phi=config["w_phi"],
+                sigma_kappa=sigma_kappa,
+                start_year=start_year,
+                stop_year=stop_year,
+                transmission_lag_type=config["transmission_lag_type"],
+                time_infect_units=config["transmission_lag_unit"],
+                gamma_shape=config["transmission_lag_shape"],
+                gamma_scale=config["transmission_lag_scale"],
+                random_seed=config["random_seed"],
+                time_infect=config["time_to_infectivity"],
+                native_countries_list=native_countries_list,
+                commodities_available=commodities_available[i],
+                commodity_forecast_path=config["commodity_forecast_path"],
+                phyto_weights=list(locations["Phytosanitary Capacity"].unique()),
+                outpath=outpath,
+                run_num=run_num,
+                forecast_parameters=forecast_parameters,
+            )
+        add_count(run_report, "bytes_written", directory_size(outpath))
+        write_timing_report(run_report, outpath, run_num)
+        outpaths[code] = outpath
+
+    return outpaths
+
+
+def main(argv=None):
+    """
+    Runs the model from the command line. Paths default to the INPUT_PATH,
+    OUTPUT_PATH, and COUNTRIES_PATH environmental variables, which are read
+    from a .env file if python-dotenv is installed.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m pandemic", description="Run the Pandemic model"
+    )
+    parser.add_argument("config", help="path to the configuration json file")
+    parser.add_argument("sim_name", help="simulation name")
+    parser.add_argument("add_descript", help="additional simulation description")
+    parser.add_argument("run_num", type=int, help="run (realization) number")
+    parser.add_argument("--input-dir", default=None)
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--countries", default=None)
+    parser.add_argument(
+        "--bundle", default=None, help="directory of compiled model inputs"
+    )
+    args = parser.parse_args(argv)
+
+    # Read environmental variables
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv(os.path.join(".env"))
+    except ImportError:
+        pass
+    input_dir = args.input_dir or os.getenv("INPUT_PATH")
+    out_dir = args.output_dir or os.getenv("OUTPUT_PATH")
+    countries_path = args.countries or os.getenv("COUNTRIES_PATH")
+
+    # Read model arguments from configuration file
+    with open(args.config) as json_file:
+        config = json.load(json_file)
+
+    # Progress messages are logged at INFO and introduction events at DEBUG
+    logging.basicConfig(level=config.get("log_level", "INFO"), format="%(message)s")
+
+    if args.bundle is not None:
+        inputs = read_bundle(args.bundle)
     else:
-        print("\tskipping as pest is not transported with this commodity")
+        inputs = load_inputs(config, input_dir, countries_path)
+    run_simulation(
+        config, inputs, out_dir, args.sim_name, args.add_descript, args.run_num
+    )
+
+
+if __name__ == "__main__":
+    main()
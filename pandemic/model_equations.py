@@ -15,16 +15,158 @@ http://www.opensource.org/licenses/gpl-license.html
 http://www.gnu.org/copyleft/gpl.html
 """
 
+import logging
+import os
+import time
 import numpy as np
 import pandas as pd
 
 from pandemic.probability_calculations import (
+    combined_probability_of_entry,
+    combined_probability_of_introduction,
     probability_of_entry,
     probability_of_establishment,
     probability_of_introduction,
 )
 
-from pandemic.helpers import location_pairs_with_host
+from pandemic.helpers import (
+    active_location_pairs,
+    covariate_table,
+    create_season_mask,
+    joint_trade_normalization_bounds,
+    trade_normalization_bounds,
+)
+
+from pandemic.checkpoints import (
+    read_checkpoint,
+    restore_locations,
+    simulation_state,
+    write_checkpoint,
+)
+
+from pandemic.instrumentation import add_count, timed
+
+from pandemic.kernels import (
+    climate_factor,
+    draw_introductions,
+    evaluate_pairs,
+    pair_probabilities_factors,
+    parameter_factors,
+)
+
+from pandemic.random_streams import create_generator, draw_seed
+
+from pandemic.time_steps import (
+    NEVER_INFECTIVE,
+    create_calendar,
+    infective_months,
+    lag_to_months,
+    month_to_time_step,
+    time_step_to_month,
+)
+
+logger = logging.getLogger(__name__)
+
+# dtypes of the probability and country introduction matrices of each output
+# precision of pandemic_multiple_time_steps
+OUTPUT_DTYPES = {
+    "double": (np.float64, np.float64),
+    "single": (np.float32, np.uint8),
+}
+
+
+def introduce_pests(
+    locations,
+    infective,
+    destinations,
+    time_step,
+    transmission_lag_type,
+    time_infect_units,
+    time_infect,
+    gamma_shape,
+    gamma_scale,
+    rng=None,
+):
+    """
+    Updates the presence and the month from which destinations (j) are
+    infective after the introductions of a time step, given the transmission
+    lag. Stochastic lags are drawn as one vector for all introductions and
+    reintroductions only move the infective month earlier.
+
+    Parameters
+    ----------
+    locations : data_frame
+        data frame of countries, species presence, and infective time steps
+    infective : numpy.array
+        Array of n months from which each location is infective (see
+        infective_months), updated in place
+    destinations : numpy.array
+        Position indices of the destination (j) of each introduction
+    time_step : str
+        String representing the name of the discrete time step (i.e., YYYYMM
+        for monthly or YYYY for annual)
+    transmission_lag_type : str
+        Type of transmission lag used in the simulation (i.e., None,
+        static, or stochastic)
+    time_infect_units : str
+        Units associated with the transmission lag value (i.e., years, months)
+    time_infect : int
+        Time until a country is infectious, set for static transmission lag
+    gamma_shape : float
+        Shape parameter for gamma distribution used in stochastic transmission
+    gamma_scale: float
+        Scale parameter for gamma distribution used in stochastic transmission
+    rng : numpy.random.Generator
+        Random number generator of the time step (see create_generator). If
+        None, a generator seeded from operating system entropy is used.
+        Default is None.
+
+    Returns
+    -------
+    locations : data_frame
+        data frame with updated presence and infective time steps
+
+    """
+    destinations = np.asarray(destinations, dtype=int)
+    if len(destinations) == 0:
+        return locations
+
+    # Static lag is a tranmission lag of a set number of time units and
+    # stochastic lag draws from a gamma distribution to determine the number
+    # of time units until infectivity for each introduction
+    # units are only converted when a lag is applied
+    if transmission_lag_type == "static":
+        lag_months = np.full(
+            len(destinations), lag_to_months(time_infect, time_infect_units)
+        )
+    elif transmission_lag_type == "stochastic":
+        if rng is None:
+            rng = np.random.default_rng()
+        draws = rng.gamma(gamma_shape, gamma_scale, len(destinations))
+        lag_months = np.round(draws).astype(int) * lag_to_months(1, time_infect_units)
+    else:
+        lag_months = np.zeros(len(destinations), dtype=int)
+    new = time_step_to_month(time_step) + lag_months
+
+    # keep the earliest infective month of each destination
+    previous = infective.copy()
+    np.minimum.at(infective, destinations, new)
+    changed = np.flatnonzero(infective != previous)
+
+    locations.iloc[destinations, locations.columns.get_loc("Presence")] = True
+    monthly = len(time_step) > 4
+    infective_loc = locations.columns.get_loc("Infective")
+    for j in changed:
+        locations.iloc[j, infective_loc] = month_to_time_step(infective[j], monthly)
+    if logger.isEnabledFor(logging.DEBUG):
+        for j in changed:
+            logger.debug(
+                "%s infective: %s",
+                locations["NAME"].iloc[j],
+                locations.iloc[j, infective_loc],
+            )
+
+    return locations
 
 
 def pandemic_single_time_step(
@@ -50,6 +192,14 @@ def pandemic_single_time_step(
     time_infect,
     gamma_shape,
     gamma_scale,
+    season_mask=None,
+    backend="python",
+    pairs=None,
+    infective=None,
+    rng=None,
+    host=None,
+    rho=None,
+    pair_factors=None,
 ):
     """
     Returns the probability of establishment, probability of entry, and
@@ -71,8 +221,8 @@ def pandemic_single_time_step(
         species propagule and the destination host species presence is greater
         than 0%
     trade : numpy.array
-        list (c) of n x n x t matrices where c is the # of commoditites,
-        n is the number of locations, and t is # of time steps
+        n x n matrix of trade for the time step, or c x n x n matrices of
+        the c commodities simulated jointly
     distances : numpy.array
         n x n matrix of distances from one location to another where n is
         number of locations.
@@ -87,9 +237,11 @@ def pandemic_single_time_step(
         time steps
     mu : float
         The mortality rate of the pest or pathogen during transport
-    lamda_c : float
+    lamda_c : float or numpy.array
         The commodity importance [0,1] of commodity (c) in transporting the
-        pest or pathogen
+        pest or pathogen, or an array of c importances of the commodities
+        simulated jointly, whose probabilities of entry are combined (see
+        combined_probability_of_entry)
     phi : int
         The degree of polyphagy of the pest of interest described as the number
         of host families
@@ -102,12 +254,16 @@ def pandemic_single_time_step(
         of host families
     w_phi : int
         The degree of polyphagy weight
-    min_Tc : float
+    min_Tc : float or numpy.array
         The minimum value/volume of trade for the year of timestep (t) for all
-        origin and desitnation pairs for commodity (c) in dollar value or metric tons.
-    max_Tc : float
+        origin and desitnation pairs for commodity (c) in dollar value or metric tons,
+        or an array of n values, one for each origin (i), or a c x n matrix
+        if commodities are simulated jointly.
+    max_Tc : float or numpy.array
         The maximum value/volume of trade for the year of timestep (t) for all
-        origin and desitnation pairs for commodity (c) in dollar value or metric tons.
+        origin and desitnation pairs for commodity (c) in dollar value or metric tons,
+        or an array of n values, one for each origin (i), or a c x n matrix
+        if commodities are simulated jointly.
     time_step : str
         String representing the name of the discrete time step (i.e., YYYYMM
         for monthly or YYYY for annual)
@@ -126,6 +282,41 @@ def pandemic_single_time_step(
         Shape parameter for gamma distribution used in stochastic transmission
     gamma_scale: float
         Scale parameter for gamma distribution used in stochastic transmission
+    season_mask : numpy.array
+        12 x n boolean matrix of months when a pest can be transported from
+        each location (see create_season_mask). If None, it is created from
+        season_dict. Default is None.
+    backend : str
+        Pair evaluation backend: "python" to evaluate one location pair at a
+        time, "numpy" to evaluate all pairs with array operations, or "numba"
+        to run the compiled pair loop (falls back to "numpy" if Numba is not
+        installed). Default is python.
+    pairs : tuple
+        Origin (i) and destination (j) position index arrays of the location
+        pairs to evaluate (see active_location_pairs). If given, it is used
+        instead of locations_list. Default is None.
+    infective : numpy.array
+        Array of n months from which each location is infective (see
+        infective_months), updated in place with introductions. If None, it
+        is created from the Infective column. Default is None.
+    rng : numpy.random.Generator
+        Random number generator of the time step (see create_generator),
+        used to draw introductions and stochastic transmission lags. If None,
+        a generator seeded from operating system entropy is used. Default is
+        None.
+    host : numpy.array
+        Array of n host percent areas of the time step (see
+        covariate_table). If None, it is read from the Host Percent Area
+        column. Default is None.
+    rho : numpy.array
+        Array of n phytosanitary capacities of the time step (see
+        covariate_table). If None, it is read from the Phytosanitary
+        Capacity column. Default is None.
+    pair_factors : tuple
+        Entry factors of the time step and distance, climate, and host
+        factors (see pair_probabilities_factors). If given, pairs are
+        evaluated from these factors with array operations whatever the
+        backend. Default is None.
 
     Returns
     -------
@@ -139,192 +330,232 @@ def pandemic_single_time_step(
 
     """
 
-    establishment_probabilities = np.zeros_like(trade, dtype=float)
-    entry_probabilities = np.zeros_like(trade, dtype=float)
-    introduction_probabilities = np.zeros_like(trade, dtype=float)
+    establishment_probabilities = np.zeros(trade.shape[-2:])
+    entry_probabilities = np.zeros(trade.shape[-2:])
+    introduction_probabilities = np.zeros(trade.shape[-2:])
 
-    introduction_country = np.zeros_like(trade, dtype=float)
+    introduction_country = np.zeros(trade.shape[-2:])
     locations["Probability of introduction"] = np.zeros(len(locations))
-    origin_destination = pd.DataFrame(columns=["Origin", "Destination"])
-
-    for k in range(len(locations_list)):
-        # get position index of location k with known host presence
-        # in data frame with all locations for selecting attributes
-        # and populating output matrices
-        loc_pair = locations_list[k]
-        j = locations.index[locations["ISO3"] == loc_pair[1]][0]
-        destination = locations.iloc[j, :]
-
-        # check that Phytosanitary capacity data is available if not set
-        # the value to 0 to remove this aspect of the equation
-        if "Phytosanitary Capacity" in destination:
-            rho_j = destination["Phytosanitary Capacity"]
-        else:
-            rho_j = 0
-
-        # get position index of location l with known host presence
-        # in data frame with all locations for selecting attributes
-        # and populating output matrices
-        i = locations.index[locations["ISO3"] == loc_pair[0]][0]
-        origin = locations.iloc[i, :]
-        # check that Phytosanitary capacity data is available if not
-        # set value to 0 to remove this aspect of the equation
-        if "Phytosanitary Capacity" in origin:
-            rho_i = origin["Phytosanitary Capacity"]
-        else:
-            rho_i = 0
-
-        T_ijct = trade[j, i]
-        d_ij = distances[j, i]
-
-        # check if time steps are annual (YYYY) or monthly (YYYYMM)
-        # if monthly, parse dates to determine if species is in the
-        # correct life cycle to be transported (set value to 1),
-        # based on the geographic location of the origin
-        # country (i.e., Northern or Southern Hemisphere)
-        if len(time_step) > 4:
-            if origin["LAT"] >= 0 and time_step[-2:] not in season_dict["NH_season"]:
-                chi_it = 0
-            elif origin["LAT"] < 0 and time_step[-2:] not in season_dict["SH_season"]:
-                chi_it = 0
-            else:
-                chi_it = 1
-        else:
-            chi_it = 1
 
-        h_jt = 1 - destination["Host Percent Area"]
+    # check if time steps are annual (YYYY) or monthly (YYYYMM)
+    # if monthly, look up whether species is in the correct life
+    # cycle to be transported from each origin in this month
+    if len(time_step) > 4:
+        if season_mask is None:
+            season_mask = create_season_mask(locations, season_dict)
+        chi_t = season_mask[int(time_step[4:]) - 1]
+    else:
+        chi_t = np.ones(len(locations), dtype=bool)
 
-        # check if species is present in origin country
-        # and sufficient time has passed to faciliate transmission
-        if (origin["Infective"] is not None) and (
-            int(time_step) >= int(origin["Infective"])
-        ):
-            zeta_it = 1
-            delta_kappa_ijt = 1 - climate_similarities[j, i]
+    # month from which each location is infective
+    step_month = time_step_to_month(time_step)
+    if infective is None:
+        infective = infective_months(locations["Infective"])
 
-            if T_ijct == 0:
-                probability_of_entry_ijct = 0
-            else:
-                probability_of_entry_ijct = probability_of_entry(
-                    rho_i,
-                    rho_j,
-                    zeta_it,
-                    lamda_c,
-                    T_ijct,
-                    min_Tc,
-                    max_Tc,
-                    mu,
-                    d_ij,
-                    chi_it,
-                )
-            probability_of_establishment_ijt = probability_of_establishment(
-                alpha,
-                beta,
-                delta_kappa_ijt,
-                sigma_kappa,
-                h_jt,
-                sigma_h,
-                phi,
-                w_phi,
-            )
+    # trade normalization bounds for each origin (and commodity if
+    # commodities are simulated jointly)
+    min_Tc = np.broadcast_to(min_Tc, trade.shape[:-2] + (len(locations),))
+    max_Tc = np.broadcast_to(max_Tc, trade.shape[:-2] + (len(locations),))
+
+    # position index of each location pair for selecting attributes
+    # and populating output matrices
+    if pairs is None:
+        iso_index = {iso3: k for k, iso3 in enumerate(locations["ISO3"])}
+        origins = np.array([iso_index[pair[0]] for pair in locations_list], dtype=int)
+        destinations = np.array(
+            [iso_index[pair[1]] for pair in locations_list], dtype=int
+        )
+    else:
+        origins, destinations = pairs
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    # host percent area and phytosanitary capacity of each location (if
+    # phytosanitary capacity data is not available, it is set to 0 to
+    # remove this aspect of the equation)
+    if host is None:
+        host = locations["Host Percent Area"].values.astype(float)
+    if rho is None:
+        if "Phytosanitary Capacity" in locations.columns:
+            rho = locations["Phytosanitary Capacity"].values.astype(float)
         else:
-            zeta_it = 0
-            probability_of_entry_ijct = 0.0
-            probability_of_establishment_ijt = 0.0
+            rho = np.zeros(len(locations))
 
-        probability_of_introduction_ijtc = probability_of_introduction(
-            probability_of_entry_ijct, probability_of_establishment_ijt
+    if pair_factors is not None:
+        origins = np.asarray(origins, dtype=np.int64)
+        destinations = np.asarray(destinations, dtype=np.int64)
+        probabilities = pair_probabilities_factors(
+            origins,
+            destinations,
+            infective,
+            step_month,
+            *pair_factors,
+            lamda_c,
+            phi * w_phi * alpha,
         )
-        entry_probabilities[j, i] = probability_of_entry_ijct
-        establishment_probabilities[j, i] = probability_of_establishment_ijt
-        introduction_probabilities[j, i] = probability_of_introduction_ijtc
-
-        # decide if an introduction happens
-        introduced = np.random.binomial(1, probability_of_introduction_ijtc)
-        if bool(introduced):
-            print("\t\t", origin["NAME"], "-->", destination["NAME"])
-            introduction_country[j, i] = bool(introduced)
-            locations.iloc[j, locations.columns.get_loc("Presence")] = bool(introduced)
-
-            # if no previous introductions, set infective column to current time
-            # step plus period to infectivity; currently assumes period to infectivity
-            # is given in number of years
-            if transmission_lag_type is None:
-                time_infect = 0
-                if locations.iloc[j, locations.columns.get_loc("Infective")] is None:
-                    locations.iloc[j, locations.columns.get_loc("Infective")] = str(
-                        int(time_step[:4]) + time_infect
-                    ) + str(time_step[4:])
-                    print(
-                        f'\t\t\t{destination["NAME"]} infective: ',
-                        locations.iloc[j, locations.columns.get_loc("Infective")],
-                    )
-            # Static lag is a tranmission lag of a set number of time units
-            if transmission_lag_type == "static":
-                if locations.iloc[j, locations.columns.get_loc("Infective")] is None:
-                    locations.iloc[j, locations.columns.get_loc("Infective")] = str(
-                        int(time_step[:4]) + time_infect
-                    ) + str(time_step[4:])
-                    print(
-                        f'\t\t\t{destination["NAME"]} infective: ',
-                        locations.iloc[j, locations.columns.get_loc("Infective")],
+        (
+            entry_probabilities,
+            establishment_probabilities,
+            introduction_probabilities,
+            introduction_country,
+            introduced_origins,
+            introduced_destinations,
+        ) = draw_introductions(
+            len(locations), origins, destinations, *probabilities, rng=rng
+        )
+
+    elif backend == "python":
+        # one uniform draw per pair, in pair order (see evaluate_pairs)
+        draws = rng.random(len(origins))
+        # trade, bounds, and importance of each commodity (c)
+        trade_c = trade.reshape((-1,) + trade.shape[-2:])
+        lamda_c_values = np.atleast_1d(lamda_c)
+        min_Tc_c = min_Tc.reshape(len(trade_c), -1)
+        max_Tc_c = max_Tc.reshape(len(trade_c), -1)
+        introduced_origins = []
+        introduced_destinations = []
+        for k, (i, j) in enumerate(zip(origins, destinations)):
+            rho_i = rho[i]
+            rho_j = rho[j]
+
+            d_ij = distances[j, i]
+
+            chi_it = int(chi_t[i])
+
+            h_jt = 1 - host[j]
+
+            # check if species is present in origin country
+            # and sufficient time has passed to faciliate transmission
+            if infective[i] <= step_month:
+                zeta_it = 1
+                delta_kappa_ijt = 1 - climate_similarities[j, i]
+
+                probability_of_entry_ijc = []
+                for c in range(len(trade_c)):
+                    T_ijct = trade_c[c, j, i]
+                    if T_ijct == 0:
+                        probability_of_entry_ijc.append(0)
+                        continue
+                    # keep trade within the normalization bounds (only
+                    # needed for quantile bounds)
+                    T_ijct = min(max(T_ijct, min_Tc_c[c, i]), max_Tc_c[c, i])
+                    probability_of_entry_ijc.append(
+                        probability_of_entry(
+                            rho_i,
+                            rho_j,
+                            zeta_it,
+                            lamda_c_values[c],
+                            T_ijct,
+                            min_Tc_c[c, i],
+                            max_Tc_c[c, i],
+                            mu,
+                            d_ij,
+                            chi_it,
+                        )
                     )
-            # Stochastic lag draws from a gamma distribution to determine
-            # the number of time units until infectivity for each introduction
-            if transmission_lag_type == "stochastic":
-                time_infect = int(
-                    round(np.random.gamma(gamma_shape, gamma_scale, 1)[0])
-                )
-                if locations.iloc[j, locations.columns.get_loc("Infective")] is None:
-                    print("\t\t\tfirst intro...")
-                    print("\t\t\ttime to infectious: ", time_infect)
-                    locations.iloc[j, locations.columns.get_loc("Infective")] = str(
-                        int(time_step[:4]) + time_infect
-                    ) + str(time_step[4:])
-                    print(
-                        f'\t\t\t\t{destination["NAME"]} infective: ',
-                        locations.iloc[j, locations.columns.get_loc("Infective")],
+                if trade.ndim == 3:
+                    probability_of_entry_ijct = combined_probability_of_entry(
+                        probability_of_entry_ijc
                     )
                 else:
-                    print("\t\t\treintroduction....")
-                    current = int(
-                        locations.iloc[j, locations.columns.get_loc("Infective")]
-                    )
-                    new = str(int(time_step[:4]) + time_infect) + str(time_step[4:])
-                    print("\t\t\tlatest time to infectious: ", time_infect)
-                    print(f"\t\t\t\torig: {current} \t new: {new}")
-                    if int(new) < int(current):
-                        print("\t\t\t\trevising to: ", new)
-                        locations.iloc[j, locations.columns.get_loc("Infective")] = str(
-                            new
-                        )
-                    else:
-                        print("\t\t\t\tkeeping: ", current)
-
-            if origin_destination.empty:
-                origin_destination = pd.DataFrame(
-                    [[origin["NAME"], destination["NAME"]]],
-                    columns=["Origin", "Destination"],
+                    probability_of_entry_ijct = probability_of_entry_ijc[0]
+                probability_of_establishment_ijt = probability_of_establishment(
+                    alpha,
+                    beta,
+                    delta_kappa_ijt,
+                    sigma_kappa,
+                    h_jt,
+                    sigma_h,
+                    phi,
+                    w_phi,
                 )
             else:
-                origin_destination = origin_destination.append(
-                    pd.DataFrame(
-                        [[origin["NAME"], destination["NAME"]]],
-                        columns=["Origin", "Destination"],
-                    ),
-                    ignore_index=True,
-                )
-        else:
-            introduction_country[j, i] = bool(introduced)
+                zeta_it = 0
+                probability_of_entry_ijct = 0.0
+                probability_of_establishment_ijt = 0.0
+
+            probability_of_introduction_ijtc = probability_of_introduction(
+                probability_of_entry_ijct, probability_of_establishment_ijt
+            )
+            entry_probabilities[j, i] = probability_of_entry_ijct
+            establishment_probabilities[j, i] = probability_of_establishment_ijt
+            introduction_probabilities[j, i] = probability_of_introduction_ijtc
+
+            # decide if an introduction happens
+            introduced = draws[k] < probability_of_introduction_ijtc
+            introduction_country[j, i] = introduced
+            if introduced:
+                introduced_origins.append(i)
+                introduced_destinations.append(j)
+
+    else:
+        (
+            entry_probabilities,
+            establishment_probabilities,
+            introduction_probabilities,
+            introduction_country,
+            introduced_origins,
+            introduced_destinations,
+        ) = evaluate_pairs(
+            len(locations),
+            origins,
+            destinations,
+            infective,
+            step_month,
+            rho,
+            host,
+            chi_t.astype(float),
+            np.asarray(trade, dtype=float),
+            np.asarray(distances, dtype=float),
+            np.asarray(climate_similarities, dtype=float),
+            np.asarray(min_Tc, dtype=float),
+            np.asarray(max_Tc, dtype=float),
+            alpha,
+            beta,
+            mu,
+            lamda_c,
+            phi,
+            w_phi,
+            sigma_h,
+            sigma_kappa,
+            backend=backend,
+            rng=rng,
+        )
+
+    # record introductions and update presence and infectivity of their
+    # destinations
+    introduced_origins = np.asarray(introduced_origins, dtype=int)
+    introduced_destinations = np.asarray(introduced_destinations, dtype=int)
+    names = locations["NAME"].values
+    origin_destination = pd.DataFrame(
+        {
+            "Origin": names[introduced_origins],
+            "Destination": names[introduced_destinations],
+        },
+        columns=["Origin", "Destination"],
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, j in zip(introduced_origins, introduced_destinations):
+            logger.debug("%s --> %s", names[i], names[j])
+    locations = introduce_pests(
+        locations,
+        infective,
+        introduced_destinations,
+        time_step,
+        transmission_lag_type,
+        time_infect_units,
+        time_infect,
+        gamma_shape,
+        gamma_scale,
+        rng=rng,
+    )
 
     # calculate combined probability of introduction for a destination
     # in a given time step
-    for r in range(0, introduction_probabilities.shape[0]):
-        dst = introduction_probabilities[r, :]
-        combined_probability_no_introduction = np.prod(list(map(lambda x: 1 - x, dst)))
-        locations.iloc[r, locations.columns.get_loc("Probability of introduction")] = (
-            1 - combined_probability_no_introduction
-        )
+    locations["Probability of introduction"] = combined_probability_of_introduction(
+        introduction_probabilities
+    )
 
     return (
         entry_probabilities,
@@ -336,6 +567,115 @@ def pandemic_single_time_step(
     )
 
 
+def static_pair_factors(
+    trades,
+    climate_similarities,
+    locations,
+    date_list,
+    season_dict,
+    trade_normalization="year",
+    trade_bounds=None,
+    beta=None,
+    sigma_kappa=None,
+):
+    """
+    Returns the factors of the probabilities of entry and establishment of
+    every location pair that do not depend on the parameters alpha, mu,
+    lamda_c, phi, w_phi, and sigma_h, to compute once and reuse across
+    simulations of different values of these parameters (see
+    pandemic_multiple_time_steps). The probability of entry is the entry
+    factor times lamda_c * exp(-mu * d_ij) and the probability of
+    establishment is phi * w_phi * alpha times the climate factor times
+    exp(-beta * (h_jt / sigma_h) ** 2).
+
+    Parameters
+    ----------
+    trades : numpy.array
+        t x n x n matrix of trade values, or t x c x n x n matrices of
+        commodities simulated jointly
+    climate_similarities : numpy.array
+        n x n matrix of climate similarities between locations
+    locations : data_frame
+        data frame of countries with phytosanitary capacity and hemisphere
+        columns (not modified)
+    date_list : list
+        List of unique time step values (YYYY or YYYYMM)
+    season_dict : dict
+        Dictionary of months when a pest can be transported in a commodity
+        (see create_season_mask)
+    trade_normalization : str
+        Scheme used to compute the trade normalization bounds (see
+        trade_normalization_bounds). Default is year.
+    trade_bounds : tuple
+        Precomputed (min_Tc, max_Tc) trade normalization bounds. If None,
+        they are computed from trades. Default is None.
+    beta : float
+        Parameter of the climate factor. If None, the climate factor is not
+        computed. Default is None.
+    sigma_kappa : float
+        The climate dissimilarity normalizing constant of the climate
+        factor. Default is None.
+
+    Returns
+    -------
+    pair_factors : dict
+        Dictionary of the entry factors, a matrix shaped like trades of
+        (1 - rho_i) * (1 - rho_j) * normalized trade * chi_it (0 where there
+        is no trade), and of the climate factor, an n x n matrix of
+        exp(-beta * (delta_kappa_ij / sigma_kappa) ** 2) (None if beta is
+        None), with the beta and sigma_kappa it was computed with
+
+    """
+    if trade_bounds is None and trades.ndim == 4:
+        trade_bounds = joint_trade_normalization_bounds(
+            trades, date_list, method=trade_normalization
+        )
+    elif trade_bounds is None:
+        trade_bounds = trade_normalization_bounds(
+            trades, date_list, method=trade_normalization
+        )
+    min_Tc_table, max_Tc_table = trade_bounds
+    n_locations = len(locations)
+    season_mask = create_season_mask(locations, season_dict)
+    years = sorted({str(ts)[:4] for ts in date_list})
+    phyto_table = covariate_table(locations, "Phytosanitary Capacity", years)
+    phyto_rows = np.searchsorted(years, [str(ts)[:4] for ts in date_list])
+
+    # matrices are indexed by destination (j) rows and origin (i) columns
+    entry = np.zeros(trades.shape)
+    for t, ts in enumerate(date_list):
+        trade = np.asarray(trades[t], dtype=float)
+        # trade normalization bounds of each origin (i) as a row
+        bounds_shape = trade.shape[:-2] + (n_locations,)
+        min_Tc = np.broadcast_to(min_Tc_table[t], bounds_shape)[..., np.newaxis, :]
+        max_Tc = np.broadcast_to(max_Tc_table[t], bounds_shape)[..., np.newaxis, :]
+        if len(str(ts)) > 4:
+            chi_t = season_mask[int(str(ts)[4:]) - 1].astype(float)
+        else:
+            chi_t = np.ones(n_locations)
+        no_rho = 1 - phyto_table[phyto_rows[t]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normalized = (np.minimum(np.maximum(trade, min_Tc), max_Tc) - min_Tc) / (
+                max_Tc - min_Tc
+            )
+            entry[t] = np.where(
+                trade != 0,
+                no_rho[np.newaxis, :] * no_rho[:, np.newaxis] * normalized * chi_t,
+                0.0,
+            )
+
+    climate = None
+    if beta is not None:
+        climate = climate_factor(climate_similarities, beta, sigma_kappa)
+
+    return {
+        "entry": entry,
+        "climate": climate,
+        "beta": beta,
+        "sigma_kappa": sigma_kappa,
+    }
+
+
 def pandemic_multiple_time_steps(
     trades,
     distances,
@@ -357,6 +697,18 @@ def pandemic_multiple_time_steps(
     time_infect,
     gamma_shape,
     gamma_scale,
+    trade_normalization="year",
+    trade_bounds=None,
+    backend="python",
+    report=None,
+    checkpoint_dir=None,
+    checkpoint_every=12,
+    resume_from=None,
+    random_seed=None,
+    run=0,
+    commodity=0,
+    precision="double",
+    pair_factors=None,
 ):
 
     """
@@ -374,8 +726,9 @@ def pandemic_multiple_time_steps(
         data frame of countries, species presence, phytosanitry capacity,
         koppen climate classifications % of total area for each class.
     trades : numpy.array
-        list (c) of n x n x t matrices where c is the # of commoditites,
-        n is the number of locations, and t is # of time steps
+        t x n x n matrix of trade values where t is the # of time steps and
+        n is the number of locations, or t x c x n x n matrices of c
+        commodities simulated jointly in a single pass
     distances : numpy.array
         n x n matrix of distances from one location to another where n is
         number of locations.
@@ -390,9 +743,10 @@ def pandemic_multiple_time_steps(
         time steps
     mu : float
         The mortality rate of the pest or pathogen during transport
-    lamda_c : float
+    lamda_c : float or numpy.array
         The commodity importance [0,1] of commodity (c) in transporting the
-        pest or pathogen
+        pest or pathogen, or an array of c importances if commodities are
+        simulated jointly
     phi : int
         The degree of polyphagy of the pest of interest described as the number
         of host families
@@ -409,7 +763,8 @@ def pandemic_multiple_time_steps(
     season_dict : dict
         Dictionary of months (i.e., MM) when a pest can be transported in
         a commodity, separated by hemisphere (i.e.,
-        {NH_season: [05, 06', SH_season: [11, 12]})
+        {NH_season: [05, 06', SH_season: [11, 12]}), with optional latitude
+        band and country specific seasons (see create_season_mask)
     transmission_lag_type : str
         Type of transmission lag used in the simulation (i.e., None,
         static, or stochastic)
@@ -421,6 +776,59 @@ def pandemic_multiple_time_steps(
         Shape parameter for gamma distribution used in stochastic transmission
     gamma_scale: float
         Scale parameter for gamma distribution used in stochastic transmission
+    trade_normalization : str
+        Scheme used to compute the trade normalization bounds (i.e., year,
+        origin, or quantile; see trade_normalization_bounds). Default is year.
+    trade_bounds : tuple
+        Precomputed (min_Tc, max_Tc) arrays from trade_normalization_bounds
+        to reuse across commodity passes and stochastic runs (or from
+        joint_trade_normalization_bounds if commodities are simulated
+        jointly). If None, they are computed from trades. Default is None.
+    backend : str
+        Pair evaluation backend (i.e., python, numpy, or numba; see
+        pandemic_single_time_step). Default is python.
+    report : dict
+        Timing report (see create_report) to add time step durations and
+        counts of pairs evaluated and introductions to. Default is None.
+    checkpoint_dir : str
+        Directory path to write checkpoints of the model state to (see
+        write_checkpoint). If None, no checkpoints are written. Default is
+        None.
+    checkpoint_every : int
+        Number of time steps between checkpoints. A checkpoint is also
+        written after the last time step. Default is 12.
+    resume_from : str
+        Checkpoint directory path to resume the simulation from. The time
+        steps run before the last checkpoint are restored instead of run
+        again, so the outputs match those of an uninterrupted run. Only
+        these time steps must match date_list, so a checkpoint of a shared
+        historical period can be resumed with different forecast trades
+        (see pandemic.scenarios). If None, the simulation starts from the
+        first time step. Default is None.
+    random_seed : int
+        Random seed of the random number streams. The draws of time step (t)
+        come from the stream keyed by random_seed, run, commodity, and t
+        (see create_generator). If None, the seed of the checkpoint resumed
+        from or a seed drawn from operating system entropy is used. Default
+        is None.
+    run : int
+        Run (realization) number keying the random number streams. Default
+        is 0.
+    commodity : int
+        Commodity index keying the random number streams. Default is 0.
+    precision : str
+        Precision of the t x n x n output matrices: "double" for float64
+        matrices, or "single" for float32 probabilities and uint8 country
+        introductions, which need 2 and 8 times less memory. Each time step
+        is computed in double precision either way. Default is double.
+    pair_factors : dict
+        Precomputed factors of the probabilities of entry and establishment
+        from static_pair_factors, computed with the same trades, locations,
+        and time steps, to reuse across simulations of different parameter
+        values (e.g., calibration). If given, pairs are evaluated from these
+        factors with array operations whatever the backend and the
+        probabilities match those of the backends up to rounding. Default
+        is None.
 
     Returns
     -------
@@ -433,56 +841,152 @@ def pandemic_multiple_time_steps(
         from the probability_of_establishment and probability_of_entry
     """
 
-    entry_probabilities = np.zeros_like(trades, dtype=float)
-    establishment_probabilities = np.zeros_like(trades, dtype=float)
-    introduction_probabilities = np.zeros_like(trades, dtype=float)
+    # outputs are t x n x n matrices, also when t x c x n x n trades of
+    # commodities simulated jointly are given
+    cube_shape = trades.shape[:1] + trades.shape[-2:]
+    if precision not in OUTPUT_DTYPES:
+        raise ValueError(f"Unknown precision: {precision}")
+    probability_dtype, introduction_dtype = OUTPUT_DTYPES[precision]
+    entry_probabilities = np.zeros(cube_shape, dtype=probability_dtype)
+    establishment_probabilities = np.zeros(cube_shape, dtype=probability_dtype)
+    introduction_probabilities = np.zeros(cube_shape, dtype=probability_dtype)
 
-    introduction_countries = np.zeros_like(trades, dtype=float)
+    introduction_countries = np.zeros(cube_shape, dtype=introduction_dtype)
     locations["Probability of introduction"] = np.zeros(shape=len(locations))
-    origin_destination = pd.DataFrame(columns=["Origin", "Destination", "Year"])
+    origin_destination = []
 
-    for t in range(trades.shape[0]):
-        ts = date_list[t]
-        print("TIME STEP: ", ts)
+    # months when the pest can be transported from each location
+    season_mask = create_season_mask(locations, season_dict)
 
-        # Get index for time steps in date list that match the year of the current ts
-        same_year_idx = [
-            idx for idx, element in enumerate(date_list) if element[:4] == ts[:4]
-        ]
-        # Extract relevant trade arrays based on index position
-        year_trade_data = [trades[i] for i in same_year_idx]
-        # Get annual standard deviation of nonzero trade value
-        min_Tc = np.min(np.ma.masked_equal(year_trade_data, 0))
-        max_Tc = np.nanmax(year_trade_data)
+    # annual trade normalization bounds for every time step
+    if trade_bounds is None and trades.ndim == 4:
+        trade_bounds = joint_trade_normalization_bounds(
+            trades, date_list, method=trade_normalization
+        )
+    elif trade_bounds is None:
+        trade_bounds = trade_normalization_bounds(
+            trades, date_list, method=trade_normalization
+        )
+    min_Tc_table, max_Tc_table = trade_bounds
 
-        trade = trades[t]
+    # month of each time step and month from which each location is
+    # infective, updated in place with introductions
+    step_months = create_calendar(date_list)
+    infective_steps = infective_months(locations["Infective"])
+    infective_steps[~locations["Presence"].values.astype(bool)] = NEVER_INFECTIVE
 
-        if f"Host Percent Area T{t}" in locations.columns:
-            locations["Host Percent Area"] = locations[f"Host Percent Area T{t}"]
-        else:
-            locations["Host Percent Area"] = locations["Host Percent Area"]
+    # host percent area of each time step (Host Percent Area T{t} columns)
+    # and phytosanitary capacity of each year (Phytosanitary Capacity YYYY
+    # columns), carried forward when not given
+    host_table = covariate_table(
+        locations, "Host Percent Area", [f"T{t}" for t in range(len(date_list))]
+    )
+    years = sorted({str(ts)[:4] for ts in date_list})
+    phyto_table = covariate_table(locations, "Phytosanitary Capacity", years)
+    phyto_rows = np.searchsorted(years, [str(ts)[:4] for ts in date_list])
+
+    # factors of the pair probabilities that depend on mu, beta, and
+    # sigma_h, computed once for all time steps
+    if pair_factors is not None:
+        distance_factor, climate, host_factors = parameter_factors(
+            pair_factors,
+            distances,
+            climate_similarities,
+            host_table,
+            beta,
+            mu,
+            sigma_h,
+            sigma_kappa,
+        )
+
+    cubes = {
+        "entry": entry_probabilities,
+        "establishment": establishment_probabilities,
+        "introduction": introduction_probabilities,
+        "country_introduction": introduction_countries,
+    }
+    first_step = 0
+    blocks = None
+    if resume_from is not None:
+        state = read_checkpoint(resume_from, cubes)
+        first_step = int(state["step"])
+        steps_run = list(state["date_list"][:first_step])
+        same_steps = steps_run == list(date_list[:first_step])
+        if not same_steps or len(state["presence"]) != len(locations):
+            raise ValueError(
+                f"Checkpoint in {resume_from} does not match the time steps "
+                "and locations of the simulation"
+            )
+        locations = restore_locations(state, locations)
+        infective_steps = state["infective"].copy()
+        origin_destination.append(
+            pd.DataFrame(
+                {
+                    "Origin": state["origin"].astype(object),
+                    "Destination": state["destination"].astype(object),
+                    "TS": state["time_step"].astype(object),
+                },
+                columns=["Origin", "Destination", "TS"],
+            )
+        )
+        if random_seed is None:
+            random_seed = int(state["stream_key"][0])
+        if tuple(state["stream_key"]) != (random_seed, run, commodity):
+            raise ValueError(
+                f"Checkpoint in {resume_from} was run with the random seed, "
+                f"run, and commodity {tuple(state['stream_key'])}"
+            )
+        # keep appending blocks of matrices to the same checkpoint
+        if checkpoint_dir is not None and os.path.abspath(
+            checkpoint_dir
+        ) == os.path.abspath(resume_from):
+            blocks = state["blocks"]
+        logger.info("Resuming from %s after %d time steps", resume_from, first_step)
+
+    if random_seed is None:
+        random_seed = draw_seed()
+    stream_key = (int(random_seed), int(run), int(commodity))
+
+    for t in range(first_step, trades.shape[0]):
+        ts = date_list[t]
+        logger.info("Time step %s", ts)
+        step_start = time.perf_counter()
+
+        trade = trades[t]
+        host = host_table[t]
+        rho = phyto_table[phyto_rows[t]]
 
         locations[f"Presence {ts}"] = locations["Presence"]
         locations[f"Probability of introduction {ts}"] = locations[
             "Probability of introduction"
         ]
 
-        if f"Phytosanitary Capacity {ts[:4]}" in locations.columns:
-            locations["Phytosanitary Capacity"] = locations[
-                f"Phytosanitary Capacity {ts[:4]}"
-            ]
-        else:
-            locations["Phytosanitary Capacity"] = locations["Phytosanitary Capacity"]
+        # evaluate only pairs from the active frontier of infective origins
+        # to locations where host percent area is greater than 0 and
+        # therefore has potential for pest spread. The frontier is recomputed
+        # from the infective months on purpose: a single O(n) comparison per
+        # time step, small next to the n x n matrices of the time step, picks
+        # up introductions and expired transmission lags alike, including
+        # after resuming from a checkpoint.
+        with timed(report, "location_pairs"):
+            frontier = np.flatnonzero(infective_steps <= step_months[t])
+            pairs = active_location_pairs(frontier, host > 0)
+        add_count(report, "pairs_evaluated", len(pairs[0]))
 
-        # filter locations to those where host percent area is greater
-        # than 0 and therefore has potential for pest spread
-        locations_list = location_pairs_with_host(locations)
+        step_factors = None
+        if pair_factors is not None:
+            step_factors = (
+                pair_factors["entry"][t],
+                distance_factor,
+                climate,
+                host_factors[t],
+            )
 
         ts_out = pandemic_single_time_step(
             trade=trade,
             distances=distances,
             locations=locations,
-            locations_list=locations_list,
+            locations_list=None,
             climate_similarities=climate_similarities,
             alpha=alpha,
             beta=beta,
@@ -492,8 +996,8 @@ def pandemic_multiple_time_steps(
             sigma_h=sigma_h,
             sigma_kappa=sigma_kappa,
             w_phi=w_phi,
-            min_Tc=min_Tc,
-            max_Tc=max_Tc,
+            min_Tc=min_Tc_table[t],
+            max_Tc=max_Tc_table[t],
             time_step=ts,
             season_dict=season_dict,
             transmission_lag_type=transmission_lag_type,
@@ -501,6 +1005,14 @@ def pandemic_multiple_time_steps(
             time_infect=time_infect,
             gamma_shape=gamma_shape,
             gamma_scale=gamma_scale,
+            season_mask=season_mask,
+            backend=backend,
+            pairs=pairs,
+            infective=infective_steps,
+            rng=create_generator(*stream_key, step=t),
+            host=host,
+            rho=rho,
+            pair_factors=step_factors,
         )
 
         establishment_probabilities[t] = ts_out[1]
@@ -510,17 +1022,40 @@ def pandemic_multiple_time_steps(
         locations = ts_out[4]
         origin_destination_ts = ts_out[5]
         origin_destination_ts["TS"] = ts
-        if origin_destination.empty:
-            origin_destination = origin_destination_ts
-        else:
-            origin_destination = origin_destination.append(
-                origin_destination_ts, ignore_index=True
-            )
+        origin_destination.append(origin_destination_ts)
+        logger.info("%d introductions", len(origin_destination_ts))
         locations["Presence " + str(ts)] = locations["Presence"]
         locations["Probability of introduction " + str(ts)] = locations[
             "Probability of introduction"
         ]
 
+        add_count(report, "introductions", len(origin_destination_ts))
+        if report is not None:
+            report["steps"].append(time.perf_counter() - step_start)
+
+        if checkpoint_dir is not None and (
+            (t + 1) % checkpoint_every == 0 or t + 1 == trades.shape[0]
+        ):
+            with timed(report, "checkpoint"):
+                locations["Host Percent Area"] = host
+                locations["Phytosanitary Capacity"] = rho
+                state = simulation_state(
+                    t + 1,
+                    date_list,
+                    locations,
+                    infective_steps,
+                    pd.concat(origin_destination, ignore_index=True),
+                    stream_key,
+                )
+                blocks = write_checkpoint(checkpoint_dir, state, cubes, blocks)
+
+    origin_destination = pd.concat(origin_destination, ignore_index=True)
+
+    # host percent area and phytosanitary capacity of the last time step
+    if first_step < trades.shape[0]:
+        locations["Host Percent Area"] = host_table[-1]
+        locations["Phytosanitary Capacity"] = phyto_table[phyto_rows[-1]]
+
     return (
         locations,
         entry_probabilities,
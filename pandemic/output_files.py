@@ -1,7 +1,7 @@
 import os
-import numpy as np
 import pandas as pd
 import json
+from pandemic.probability_calculations import combined_probability_of_introduction
 
 
 def create_model_dirs(
@@ -127,7 +127,7 @@ def save_model_output(
         model_output_gdf = model_output_gdf.drop(
             columns=["Probability of introduction", "Presence"]
         )
-    out_pdf = pd.DataFrame(model_output_gdf.drop(columns="geometry", axis=1))
+    out_pdf = pd.DataFrame(model_output_gdf.drop(columns="geometry", errors="ignore"))
     out_pdf.to_csv(outpath + "/pandemic_output.csv")
 
     origin_dst.to_csv(outpath + "/origin_destination.csv")
@@ -140,7 +140,7 @@ def save_model_output(
         ts = date_list[i]
 
         if write_country_intros is True:
-            country_int_pd = pd.DataFrame(country_intro[i])
+            country_int_pd = pd.DataFrame(country_intro[i], dtype=float)
             country_int_pd.columns = example_trade_matrix.columns
             country_int_pd.index = example_trade_matrix.index
             country_int_pd.to_csv(
@@ -182,40 +182,6 @@ def save_model_output(
     return model_output_gdf
 
 
-def agg_prob(row, column_list):
-    """
-    Calculates the probability of introduction for a year
-    based on the non-zero monthly probabilities of
-    introduction.
-
-    Parameters
-    -----------
-    row
-        Row of a data frame to use for calculations
-
-    column_list : list
-        List of columns containing the probabilities
-        to aggregate
-
-    Returns
-    --------
-    final_prob : float
-        Probablity of introduction for a given year
-        based on the monthly probabilities of
-        introduction
-
-    """
-
-    non_zero = []
-    for i in range(0, len(column_list)):
-        if row[column_list[i]] > 0.0:
-            non_zero.append(row[column_list[i]])
-    prod_out = np.prod(list(map(lambda x: 1 - x, non_zero)))
-    final_prob = 1 - prod_out
-
-    return final_prob
-
-
 def get_feature_cols(geojson_obj, feature_chars):
     """
     Get list of columns that start with the identified
@@ -343,13 +309,13 @@ def aggregate_monthly_output_to_annual(formatted_geojson, outpath):
     annual_ts_list = sorted(set([y.split(" ")[-1][:4] for y in prob_intro_cols]))
     for year in annual_ts_list:
         prob_cols = [c for c in prob_intro_cols if str(year) in c]
-        formatted_geojson[f"Agg Prob Intro {year}"] = formatted_geojson.apply(
-            lambda row: agg_prob(row=row, column_list=prob_cols), axis=1
+        formatted_geojson[f"Agg Prob Intro {year}"] = (
+            combined_probability_of_introduction(formatted_geojson[prob_cols].values)
         )
         formatted_geojson[f"Presence {year}"] = formatted_geojson[f"Presence {year}12"]
 
     out_csv = pd.DataFrame(formatted_geojson)
-    out_csv.drop(["geometry"], axis=1, inplace=True)
+    out_csv.drop(["geometry"], axis=1, inplace=True, errors="ignore")
     out_csv.to_csv(
         outpath + "/pandemic_output_aggregated.csv", float_format="%.2f", na_rep="NAN!"
     )
@@ -379,6 +345,7 @@ def write_model_metadata(
     phyto_weights,
     outpath,
     run_num,
+    forecast_parameters=None,
 ):
     """
     Write model parameters and configuration to metadata file
@@ -440,6 +407,8 @@ def write_model_metadata(
         Directory path to save json file
     run_num : int
         Stochastic run number
+    forecast_parameters : dict
+        Parameters changed for the forecast period only. Default is None.
 
     Returns
     -------
@@ -476,6 +445,10 @@ def write_model_metadata(
         meta["PARAMETERS"][0].update({"infectivity_lag": time_infect})
     if transmission_lag_type == "stochastic":
         meta["PARAMETERS"][0].update({"infectivity_lag": None})
+    if forecast_parameters:
+        meta["FORECAST_PARAMETERS"] = {
+            key: str(value) for key, value in forecast_parameters.items()
+        }
     meta["NATIVE_COUNTRIES_T0"] = native_countries_list
     meta["COMMODITY"] = commodities_available
     meta["FORECASTED"] = commodity_forecast_path
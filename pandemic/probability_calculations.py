@@ -17,6 +17,7 @@ http://www.gnu.org/copyleft/gpl.html
 """
 
 import math
+import numpy as np
 
 
 def probability_of_entry(
@@ -168,3 +169,60 @@ def probability_of_introduction(
     """
 
     return probability_of_entry_ijct * probability_of_establishment_ijt
+
+
+def combined_probability_of_entry(probability_of_entry_c):
+    """
+    Returns the probability of a pest entering on any of the commodities (c)
+    simulated jointly, i.e., 1 minus the product of the probabilities of no
+    entry on each commodity.
+
+    Parameters
+    ----------
+    probability_of_entry_c : numpy.array
+        Array of c probabilities of entry (or c x k probabilities for k
+        origin and destination pairs), one per commodity
+
+    Returns
+    -------
+    combined_probability_of_entry : float or numpy.array
+        The probability of entry on any commodity (or array of k
+        probabilities)
+
+    See Also
+    probability_of_entry : Calculates the probability of entry
+    """
+
+    return 1 - np.prod(1 - np.asarray(probability_of_entry_c, dtype=float), axis=0)
+
+
+def combined_probability_of_introduction(probability_of_introduction_ij):
+    """
+    Returns the combined probability of introduction for each destination (j)
+    from all origins (i), i.e., 1 minus the product of the probabilities of no
+    introduction, computed in log space to avoid underflow when many small
+    probabilities are combined.
+
+    Parameters
+    ----------
+    probability_of_introduction_ij : numpy.array
+        n x n matrix (or t x n x n matrices) of probabilities of introduction
+        with destinations (j) as rows and origins (i) as columns
+
+    Returns
+    -------
+    combined_probability_of_introduction : numpy.array
+        Array of n (or t x n) combined probabilities of introduction
+
+    See Also
+    probability_of_introduction : Calculates the probability of introduction
+        from the probability_of_establishment and probability_of_entry
+    """
+
+    with np.errstate(divide="ignore"):
+        log_no_introduction = np.sum(
+            np.log1p(-np.asarray(probability_of_introduction_ij, dtype=float)),
+            axis=-1,
+        )
+
+    return -np.expm1(log_no_introduction)
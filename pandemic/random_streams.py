@@ -0,0 +1,59 @@
+"""
+PoPS Pandemic - Simulation
+
+Module containing the random number streams of the model. Every stochastic
+draw comes from a counter-based (Philox) NumPy Generator keyed by the random
+seed, run (realization), commodity, and time step, so any time step of any
+realization can be replayed on its own and parallel and serial executions
+draw the same numbers.
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import numpy as np
+
+
+def create_generator(seed, run=0, commodity=0, step=0):
+    """
+    Returns the random number generator of a stream keyed by seed, run,
+    commodity, and time step.
+
+    Parameters
+    ----------
+    seed : int
+        Random seed of the simulation
+    run : int
+        Run (realization) number. Default is 0.
+    commodity : int
+        Commodity index. Default is 0.
+    step : int
+        Time step index. Default is 0.
+
+    Returns
+    -------
+    rng : numpy.random.Generator
+        Philox generator of the stream
+
+    """
+    seed_sequence = np.random.SeedSequence(
+        int(seed), spawn_key=(int(run), int(commodity), int(step))
+    )
+
+    return np.random.Generator(np.random.Philox(seed_sequence))
+
+
+def draw_seed():
+    """
+    Returns a random seed drawn from operating system entropy, used when a
+    simulation is not given a seed so its streams can still be replayed.
+    """
+    return int(np.random.default_rng().integers(2**63 - 1))
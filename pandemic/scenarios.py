@@ -0,0 +1,324 @@
+"""
+PoPS Pandemic - Simulation
+
+Module containing functions to run forecast scenarios that share a
+historical period. The time steps before the fork date are simulated once
+and the model state of each realization is saved as a checkpoint (snapshot,
+see pandemic.checkpoints). Each scenario then resumes from the snapshot with
+its own forecast trades and parameters, and reuses the outputs of the
+historical time steps.
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pandemic.checkpoints import has_checkpoint, read_checkpoint, write_checkpoint
+from pandemic.model_equations import pandemic_multiple_time_steps
+from pandemic.time_steps import create_calendar, time_step_to_month
+
+logger = logging.getLogger(__name__)
+
+# arguments of pandemic_multiple_time_steps that do not change the outputs
+# of the historical period
+RUN_CONTROL_ARGS = {"report", "checkpoint_dir", "checkpoint_every", "resume_from"}
+
+
+def fork_step(date_list, fork_date):
+    """
+    Returns the index of the first time step of the forecast period.
+
+    Parameters
+    ----------
+    date_list : list
+        List of unique time step values (YYYY or YYYYMM)
+    fork_date : str or int
+        First year (YYYY) or month (YYYYMM) of the forecast period. It must
+        start a year, since the trade normalization bounds of a time step
+        use all time steps of its year.
+
+    Returns
+    -------
+    step : int
+        Number of time steps of the shared historical period
+
+    """
+    fork_month = time_step_to_month(fork_date)
+    if fork_month % 12 != 0:
+        raise ValueError(f"Fork date {fork_date} is not the start of a year")
+
+    return int(np.sum(create_calendar(date_list) < fork_month))
+
+
+def prefix_hash(trades, date_list, locations, fork_date, **kwargs):
+    """
+    Returns a hash of the inputs of the historical period: the trades and
+    time steps before the fork date, the locations at the start of the
+    simulation, and the other arguments of pandemic_multiple_time_steps
+    (parameters, random seed, run, commodity, etc.).
+
+    Parameters
+    ----------
+    trades : numpy.array
+        t x n x n matrix of trade values
+    date_list : list
+        List of unique time step values (YYYY or YYYYMM)
+    locations : data_frame
+        data frame of countries at the start of the simulation
+    fork_date : str or int
+        First year (YYYY) or month (YYYYMM) of the forecast period
+    **kwargs
+        Other arguments of pandemic_multiple_time_steps
+
+    Returns
+    -------
+    inputs_hash : str
+        Hexadecimal SHA-256 digest of the inputs
+
+    """
+    step = fork_step(date_list, fork_date)
+    digest = hashlib.sha256()
+
+    def update(value):
+        if isinstance(value, (list, tuple)):
+            digest.update(f"{type(value).__name__}{len(value)}".encode())
+            for item in value:
+                update(item)
+        elif isinstance(value, (np.ndarray, np.generic)):
+            value = np.ascontiguousarray(value)
+            digest.update(f"{value.dtype}{value.shape}".encode())
+            digest.update(value.tobytes())
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+    update(np.asarray(trades[:step]))
+    update([str(ts) for ts in date_list[:step]])
+    columns = [c for c in locations.columns if c != "geometry"]
+    update(columns)
+    update(pd.util.hash_pandas_object(locations[columns], index=True).values)
+    for key in sorted(set(kwargs) - RUN_CONTROL_ARGS):
+        update(key)
+        update(kwargs[key])
+
+    return digest.hexdigest()
+
+
+def snapshot_matches(snapshot_dir, inputs_hash):
+    """
+    Returns True if a directory holds a snapshot of the historical period
+    simulated from inputs with the given hash (see prefix_hash).
+
+    Parameters
+    ----------
+    snapshot_dir : str
+        Directory path of the snapshot (see simulate_prefix)
+    inputs_hash : str
+        Hash of the inputs of the historical period
+
+    Returns
+    -------
+    matches : bool
+        True if the snapshot exists and was simulated from the same inputs
+
+    """
+    if not has_checkpoint(snapshot_dir):
+        return False
+    state = read_checkpoint(snapshot_dir)
+
+    return "inputs_hash" in state and str(state["inputs_hash"]) == inputs_hash
+
+
+def replace_snapshot(built_dir, snapshot_dir, inputs_hash):
+    """
+    Moves a snapshot built in a temporary directory into place with a
+    directory rename. A snapshot of other inputs in snapshot_dir is moved
+    aside and removed first. If another run already saved a snapshot of the
+    same inputs, it is kept and built_dir is left to the caller to remove.
+
+    Parameters
+    ----------
+    built_dir : str
+        Directory path of the built snapshot, next to snapshot_dir
+    snapshot_dir : str
+        Directory path of the snapshot
+    inputs_hash : str
+        Hash of the inputs of the historical period of the built snapshot
+
+    Returns
+    -------
+    None
+
+    """
+    while not snapshot_matches(snapshot_dir, inputs_hash):
+        try:
+            os.replace(built_dir, snapshot_dir)
+            return
+        except OSError:
+            if not os.path.isdir(snapshot_dir):
+                raise
+        # a directory cannot be renamed over a non-empty one, so the
+        # snapshot of other inputs is renamed to a unique path and removed
+        stale_dir = f"{built_dir}.stale"
+        try:
+            os.replace(snapshot_dir, stale_dir)
+        except FileNotFoundError:
+            continue
+        shutil.rmtree(stale_dir)
+
+
+def simulate_prefix(snapshot_dir, trades, date_list, locations, fork_date, **kwargs):
+    """
+    Simulates the time steps before the fork date and saves the model state
+    at the fork date as a checkpoint to resume forecast scenarios from. The
+    hash of the inputs of the historical period (see prefix_hash) is saved
+    with the model state, so a snapshot of other inputs is not reused (see
+    snapshot_matches). The snapshot is built in a temporary directory next
+    to snapshot_dir and then replaces a previous snapshot (see
+    replace_snapshot), so runs sharing snapshot_dir in parallel never see a
+    partial snapshot.
+
+    Parameters
+    ----------
+    snapshot_dir : str
+        Directory path to save the snapshot, one per realization (i.e.,
+        random seed) and set of historical parameters
+    trades : numpy.array
+        t x n x n matrix of trade values, of which the time steps before the
+        fork date are used
+    date_list : list
+        List of unique time step values (YYYY or YYYYMM)
+    locations : data_frame
+        data frame of countries at the start of the simulation (not
+        modified)
+    fork_date : str or int
+        First year (YYYY) or month (YYYYMM) of the forecast period
+    **kwargs
+        Other arguments of pandemic_multiple_time_steps
+
+    Returns
+    -------
+    outputs : tuple
+        Outputs of pandemic_multiple_time_steps for the historical period
+
+    """
+    step = fork_step(date_list, fork_date)
+    inputs_hash = prefix_hash(trades, date_list, locations, fork_date, **kwargs)
+    logger.info("Simulating %d historical time steps", step)
+    parent_dir = os.path.dirname(os.path.abspath(snapshot_dir))
+    os.makedirs(parent_dir, exist_ok=True)
+    built_dir = tempfile.mkdtemp(dir=parent_dir, prefix=".snapshot-")
+    try:
+        outputs = pandemic_multiple_time_steps(
+            trades=trades[:step],
+            date_list=date_list[:step],
+            locations=locations.copy(),
+            checkpoint_dir=built_dir,
+            checkpoint_every=max(step, 1),
+            **kwargs,
+        )
+        # the hash is added before the snapshot is moved into place
+        state = read_checkpoint(built_dir)
+        state["inputs_hash"] = np.array(inputs_hash)
+        write_checkpoint(built_dir, state, {}, blocks=state["blocks"])
+        replace_snapshot(built_dir, snapshot_dir, inputs_hash)
+    finally:
+        if os.path.isdir(built_dir):
+            shutil.rmtree(built_dir)
+
+    return outputs
+
+
+def run_scenario(
+    snapshot_dir, trades, date_list, locations, inputs_hash=None, **kwargs
+):
+    """
+    Runs a forecast scenario from the snapshot of the historical period.
+    The outputs are the same as those of a simulation of all time steps.
+
+    Parameters
+    ----------
+    snapshot_dir : str
+        Directory path of the snapshot (see simulate_prefix)
+    trades : numpy.array
+        t x n x n matrix of historical and scenario forecast trade values
+    date_list : list
+        List of unique time step values (YYYY or YYYYMM), starting with the
+        time steps of the snapshot
+    locations : data_frame
+        data frame of countries at the start of the simulation (not
+        modified)
+    inputs_hash : str
+        Hash of the inputs of the historical period (see prefix_hash). If
+        given, a snapshot simulated from other inputs is not resumed from.
+        Default is None.
+    **kwargs
+        Other arguments of pandemic_multiple_time_steps (e.g., forecast
+        parameters or checkpoint_dir)
+
+    Returns
+    -------
+    outputs : tuple
+        Outputs of pandemic_multiple_time_steps for all time steps
+
+    """
+    if inputs_hash is not None and not snapshot_matches(snapshot_dir, inputs_hash):
+        raise ValueError(
+            f"Snapshot in {snapshot_dir} was not simulated from the inputs of "
+            "the historical period"
+        )
+
+    return pandemic_multiple_time_steps(
+        trades=trades,
+        date_list=date_list,
+        locations=locations.copy(),
+        resume_from=snapshot_dir,
+        **kwargs,
+    )
+
+
+def _run_scenario(scenario):
+    return run_scenario(**scenario)
+
+
+def run_scenarios(scenarios, processes=None):
+    """
+    Runs forecast scenarios from snapshots of the historical period in
+    parallel processes.
+
+    Parameters
+    ----------
+    scenarios : list
+        List of dictionaries of run_scenario arguments, one per scenario
+    processes : int
+        Number of worker processes. If 1, scenarios run one after the other
+        in this process. If None, the number of CPUs is used. Default is
+        None.
+
+    Returns
+    -------
+    outputs : list
+        Outputs of pandemic_multiple_time_steps for each scenario
+
+    """
+    if processes == 1:
+        return [run_scenario(**scenario) for scenario in scenarios]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_run_scenario, scenarios))
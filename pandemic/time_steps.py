@@ -0,0 +1,181 @@
+"""
+PoPS Pandemic - Simulation
+
+Module containing the calendar used to map time step names (YYYY for annual
+or YYYYMM for monthly time steps) to integer months once, so time steps and
+transmission lags can be compared and added as integers.
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import os
+import numpy as np
+
+# Infective month of locations where the pest is not present
+NEVER_INFECTIVE = np.iinfo(np.int64).max
+
+
+def time_step_from_path(path):
+    """
+    Returns the time step name of a trade data file named with the time step
+    after the last underscore (e.g., HS0602_trades_201001.csv).
+
+    Parameters
+    ----------
+    path : str
+        Path to a trade data file
+
+    Returns
+    -------
+    time_step : str
+        Time step name (YYYY or YYYYMM)
+
+    """
+    return str.split(os.path.splitext(os.path.split(path)[1])[0], "_")[-1]
+
+
+def date_list_from_files(file_list):
+    """
+    Returns the sorted list of unique time step names of trade data files.
+
+    Parameters
+    ----------
+    file_list : list
+        List of trade data files (see time_step_from_path)
+
+    Returns
+    -------
+    date_list : list
+        Sorted list of unique time step names (YYYY or YYYYMM)
+
+    """
+    return sorted(set(time_step_from_path(f) for f in file_list))
+
+
+def time_step_to_month(time_step):
+    """
+    Returns the number of months since year 0 of the first month of a time
+    step. Annual time steps start in January.
+
+    Parameters
+    ----------
+    time_step : str
+        Time step name (YYYY or YYYYMM)
+
+    Returns
+    -------
+    month : int
+        Months since year 0 (i.e., year * 12 + month - 1)
+
+    """
+    time_step = str(time_step)
+    month = int(time_step[:4]) * 12
+    if len(time_step) > 4:
+        month += int(time_step[4:]) - 1
+
+    return month
+
+
+def month_to_time_step(month, monthly):
+    """
+    Returns the name of the first time step starting on or after a month.
+
+    Parameters
+    ----------
+    month : int
+        Months since year 0 (see time_step_to_month)
+    monthly : bool
+        True for monthly (YYYYMM) and False for annual (YYYY) time steps
+
+    Returns
+    -------
+    time_step : str
+        Time step name (YYYY or YYYYMM)
+
+    """
+    year, month_of_year = divmod(int(month), 12)
+    if monthly:
+        return f"{year}{month_of_year + 1:02d}"
+    if month_of_year > 0:
+        year += 1
+
+    return str(year)
+
+
+def create_calendar(date_list):
+    """
+    Returns the month of each time step as an integer array, so the engine
+    compares integers instead of parsing time step names.
+
+    Parameters
+    ----------
+    date_list : list
+        List of unique time step names (YYYY or YYYYMM)
+
+    Returns
+    -------
+    step_months : numpy.array
+        Array of t months since year 0 (see time_step_to_month)
+
+    """
+    return np.array([time_step_to_month(ts) for ts in date_list], dtype=np.int64)
+
+
+def infective_months(infective):
+    """
+    Returns the month from which each location is infective.
+
+    Parameters
+    ----------
+    infective : list
+        List of n infective time step names (YYYY or YYYYMM), None where the
+        pest is not present
+
+    Returns
+    -------
+    infective_months : numpy.array
+        Array of n months since year 0 (NEVER_INFECTIVE where the pest is
+        not present)
+
+    """
+    return np.array(
+        [NEVER_INFECTIVE if ts is None else time_step_to_month(ts) for ts in infective],
+        dtype=np.int64,
+    )
+
+
+def lag_to_months(time_infect, time_infect_units):
+    """
+    Returns a transmission lag in months.
+
+    Parameters
+    ----------
+    time_infect : int
+        Time until a country is infectious
+    time_infect_units : str
+        Units of the transmission lag (i.e., year(s) or month(s)). If None,
+        the lag is in years, as assumed before units could be set.
+
+    Returns
+    -------
+    lag_months : int
+        Transmission lag in months
+
+    """
+    if time_infect_units is None:
+        return int(time_infect) * 12
+    units = str(time_infect_units).lower().rstrip("s")
+    if units == "year":
+        return int(time_infect) * 12
+    if units == "month":
+        return int(time_infect)
+    raise ValueError(f"Unknown transmission lag unit: {time_infect_units}")
@@ -0,0 +1,260 @@
+"""
+PoPS Pandemic - Simulation
+
+Module containing zonal statistics used to summarize categorical rasters
+(e.g., Koppen climate classification, host presence) by country.
+
+Copyright (C) 2019-2020 by the authors.
+
+Authors: Chris Jones (cmjone25 ncsu edu)
+
+The code contained herein is licensed under the GNU General Public
+License. You may obtain a copy of the GNU General Public License
+Version 3 or later at the following locations:
+
+http://www.opensource.org/licenses/gpl-license.html
+http://www.gnu.org/copyleft/gpl.html
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+
+def rasterize_countries(countries, out_shape, transform, label_path=None):
+    """
+    Returns a label grid with the position (1 to n) of the country covering
+    each raster cell and 0 for cells outside all countries. If a label path
+    is given, the grid is read from it when it exists and saved to it
+    otherwise, so country polygons are only rasterized once.
+
+    Parameters
+    ----------
+    countries : geodataframe
+        A geopandas dataframe of countries in the coordinate reference system
+        of the rasters to summarize
+    out_shape : tuple
+        Number of rows and columns of the rasters to summarize
+    transform : affine.Affine
+        Affine transform of the rasters to summarize
+    label_path : str
+        Optional path (.npy) of the cached label grid. Default is None.
+
+    Returns
+    -------
+    labels : numpy.array
+        rows x columns array of country labels
+
+    """
+    if label_path is not None and os.path.exists(label_path):
+        labels = np.load(label_path, mmap_mode="r")
+        if labels.shape != tuple(out_shape):
+            raise ValueError(
+                f"Label grid {label_path} has shape {labels.shape}, "
+                f"expected {tuple(out_shape)}"
+            )
+        return labels
+
+    from rasterio import features
+
+    shapes = zip(countries.geometry, range(1, len(countries) + 1))
+    labels = features.rasterize(
+        shapes, out_shape=out_shape, transform=transform, fill=0, dtype="int32"
+    )
+    if label_path is not None:
+        np.save(label_path, labels)
+
+    return labels
+
+
+def read_block(raster, row_start, row_stop):
+    """
+    Returns rows of a raster as a float array.
+
+    Parameters
+    ----------
+    raster : numpy.array or str
+        Array or file path of a single band raster. Files are read with
+        windowed reads so only the requested rows are loaded.
+    row_start : int
+        First row to read
+    row_stop : int
+        Row after the last row to read
+
+    Returns
+    -------
+    block : numpy.array
+        (row_stop - row_start) x columns array of raster values
+
+    """
+    if isinstance(raster, str):
+        import rasterio
+        from rasterio.windows import Window
+
+        with rasterio.open(raster) as src:
+            window = Window(0, row_start, src.width, row_stop - row_start)
+            block = src.read(1, window=window, masked=True)
+            return block.astype("float64").filled(np.nan)
+
+    return np.asarray(raster[row_start:row_stop], dtype="float64")
+
+
+def categorical_counts(labels, raster, n_locations, mask=None, block_rows=512):
+    """
+    Returns the number of cells of each raster class within each country.
+    Cells are counted in blocks of rows with a single np.bincount over the
+    (country label, class) pairs of each block to bound memory use. Cells
+    with NaN values or outside all countries are not counted.
+
+    Parameters
+    ----------
+    labels : numpy.array
+        rows x columns array of country labels (see rasterize_countries)
+    raster : numpy.array or str
+        Array or file path of a single band raster of non-negative integer
+        classes, aligned with the label grid
+    n_locations : int
+        Number of countries (n) in the label grid
+    mask : numpy.array or str
+        Optional array or file path of a raster aligned with the label grid;
+        cells where the mask is 0 or NaN are not counted. Default is None.
+    block_rows : int
+        Number of rows processed at once. Default is 512.
+
+    Returns
+    -------
+    counts : numpy.array
+        n x k array of cell counts where k is the largest class + 1
+
+    """
+    counts = np.zeros((n_locations, 1), dtype="int64")
+    for row_start in range(0, labels.shape[0], block_rows):
+        row_stop = min(row_start + block_rows, labels.shape[0])
+        block_labels = np.asarray(labels[row_start:row_stop])
+        block = read_block(raster, row_start, row_stop)
+        valid = (block_labels > 0) & np.isfinite(block)
+        if mask is not None:
+            block_mask = read_block(mask, row_start, row_stop)
+            valid &= np.isfinite(block_mask) & (block_mask != 0)
+        if not valid.any():
+            continue
+
+        classes = block[valid].astype("int64")
+        n_classes = max(counts.shape[1], classes.max() + 1)
+        if n_classes > counts.shape[1]:
+            counts = np.pad(counts, ((0, 0), (0, n_classes - counts.shape[1])))
+        pairs = (block_labels[valid] - 1) * n_classes + classes
+        counts += np.bincount(pairs, minlength=n_locations * n_classes).reshape(
+            n_locations, n_classes
+        )
+
+    return counts
+
+
+def zonal_category_counts(
+    countries, rasters, transform, label_path=None, mask=None, block_rows=512
+):
+    """
+    Returns the number of cells of each class within each country for any
+    number of categorical rasters, rasterizing country polygons once.
+
+    Parameters
+    ----------
+    countries : geodataframe
+        A geopandas dataframe of countries with an ISO3 column, in the
+        coordinate reference system of the rasters
+    rasters : dict
+        Dictionary of raster names and arrays or file paths of aligned
+        single band rasters of non-negative integer classes
+    transform : affine.Affine
+        Affine transform of the rasters
+    label_path : str
+        Optional path (.npy) of the cached label grid. Default is None.
+    mask : numpy.array or str
+        Optional array or file path of a raster aligned with the rasters;
+        cells where the mask is 0 or NaN are not counted. Default is None.
+    block_rows : int
+        Number of rows processed at once. Default is 512.
+
+    Returns
+    -------
+    counts : dict
+        Dictionary of raster names and data frames of cell counts with
+        countries (ISO3) as rows and classes as columns
+
+    """
+    first = next(iter(rasters.values()))
+    if isinstance(first, str):
+        import rasterio
+
+        with rasterio.open(first) as src:
+            out_shape = (src.height, src.width)
+    else:
+        out_shape = first.shape
+    labels = rasterize_countries(countries, out_shape, transform, label_path)
+
+    counts = {}
+    for name, raster in rasters.items():
+        raster_counts = categorical_counts(
+            labels, raster, len(countries), mask=mask, block_rows=block_rows
+        )
+        counts[name] = pd.DataFrame(raster_counts, index=countries["ISO3"].values)
+
+    return counts
+
+
+def koppen_percent_area(koppen_counts, kg_codes):
+    """
+    Returns the proportion of each country's area in each Koppen-Geiger
+    climate class. Class 0 (no climate class) is included in the total area
+    but not returned.
+
+    Parameters
+    ----------
+    koppen_counts : data_frame
+        data frame of Koppen class cell counts by country (see
+        zonal_category_counts)
+    kg_codes : list
+        List of Koppen-Geiger class codes for classes 1 to k (e.g., Af, Am)
+
+    Returns
+    -------
+    koppen_df : data_frame
+        data frame with countries (ISO3) as rows and Koppen-Geiger class
+        codes as columns
+
+    """
+    koppen_counts = koppen_counts.reindex(
+        columns=range(len(kg_codes) + 1), fill_value=0
+    )
+    total = koppen_counts.sum(axis=1).replace(0, np.nan)
+    koppen_df = koppen_counts.iloc[:, 1:].div(total, axis=0).fillna(0)
+    koppen_df.columns = list(kg_codes)
+    koppen_df.index.name = "ISO3"
+
+    return koppen_df
+
+
+def host_percent_area(host_counts):
+    """
+    Returns the proportion of each country's area with host present, from
+    cell counts of a binary host raster.
+
+    Parameters
+    ----------
+    host_counts : data_frame
+        data frame of host (1) and no host (0) cell counts by country (see
+        zonal_category_counts)
+
+    Returns
+    -------
+    host_area : pandas.Series
+        Host Percent Area of each country (ISO3)
+
+    """
+    host_counts = host_counts.reindex(columns=[0, 1], fill_value=0)
+    total = (host_counts[0] + host_counts[1]).replace(0, np.nan)
+    host_area = (host_counts[1] / total).fillna(0)
+    host_area.name = "Host Percent Area"
+
+    return host_area
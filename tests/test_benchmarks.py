@@ -0,0 +1,34 @@
+import numpy as np
+from pandemic.benchmarks.run_benchmarks import compare_results, run_benchmarks
+from pandemic.benchmarks.synthetic import model_parameters, synthetic_world
+from pandemic.ecological_calculations import create_climate_similarities_matrix
+
+
+def test_synthetic_world():
+    world = synthetic_world(12, 24, trade_density=0.5, host_coverage=0.5, seed=1)
+    locations = world["locations"]
+    assert world["trades"].shape == (24, 12, 12)
+    assert world["date_list"][0] == "200001" and world["date_list"][-1] == "200112"
+    assert (np.diagonal(world["trades"], axis1=1, axis2=2) == 0).all()
+    assert locations["Presence"].sum() == 1
+    assert (locations.loc[locations["Presence"], "Host Percent Area"] > 0).all()
+    assert np.allclose(
+        world["climate_similarities"],
+        create_climate_similarities_matrix(world["distances"], locations),
+    )
+
+
+def test_model_parameters():
+    parameters = model_parameters(synthetic_world(12, 24, seed=1))
+    assert parameters["phi"] * parameters["w_phi"] * parameters["alpha"] <= 1
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(sizes=[8], n_steps=2, repeat=1)
+    assert all(r["seconds"] is not None for r in results["results"])
+
+    slower = {
+        "results": [dict(r, seconds=r["seconds"] * 2) for r in results["results"]]
+    }
+    assert len(compare_results(results, slower)) == len(results["results"])
+    assert compare_results(slower, results) == []
@@ -0,0 +1,102 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandemic.benchmarks.synthetic import synthetic_world
+from pandemic.bundle import (
+    MANIFEST_FILE,
+    derived_constants,
+    read_bundle,
+    write_bundle,
+)
+from pandemic.model import run_simulation
+
+
+def synthetic_inputs():
+    world = synthetic_world(8, 24, trade_density=0.8, seed=3)
+    countries = world["locations"].drop(columns=["geometry"])
+    countries["Host Percent Area T3"] = countries["Host Percent Area"] / 2
+    countries["Phytosanitary Capacity 2001"] = countries["Phytosanitary Capacity"]
+    countries["Infective"] = None
+    codes = countries["ISO3"]
+    return world, {
+        "countries": countries,
+        "distances": world["distances"],
+        "climate_similarities": world["climate_similarities"],
+        "trades_list": [world["trades"], world["trades"] * 2],
+        "code_list": ["6801", "6802"],
+        "commodities_available": ["6801", "6802"],
+        "date_list": world["date_list"],
+        "example_trade_matrix": pd.DataFrame(
+            world["trades"][0], index=codes, columns=codes.values
+        ),
+        "load_report": {"phases": {}, "counters": {}, "steps": []},
+    }
+
+
+def test_bundle_round_trip(tmp_path):
+    world, inputs = synthetic_inputs()
+    bundle_dir = str(tmp_path / "bundle")
+    write_bundle(bundle_dir, inputs)
+    bundle = read_bundle(bundle_dir)
+
+    pd.testing.assert_frame_equal(
+        bundle["countries"], inputs["countries"], check_like=True
+    )
+    assert isinstance(bundle["trades_list"][1], np.memmap)
+    np.testing.assert_array_equal(bundle["trades_list"][1], world["trades"] * 2)
+    np.testing.assert_array_equal(bundle["distances"], inputs["distances"])
+    assert bundle["code_list"] == inputs["code_list"]
+    assert bundle["date_list"] == list(inputs["date_list"])
+    pd.testing.assert_frame_equal(
+        bundle["example_trade_matrix"], inputs["example_trade_matrix"]
+    )
+    constants = derived_constants(inputs["countries"], world["climate_similarities"])
+    assert bundle["constants"] == constants
+    assert "load_bundle" in bundle["load_report"]["phases"]
+
+
+def test_bundle_version(tmp_path):
+    _, inputs = synthetic_inputs()
+    bundle_dir = str(tmp_path / "bundle")
+    manifest = write_bundle(bundle_dir, inputs)
+    manifest["version"] = 0
+    with open(os.path.join(bundle_dir, MANIFEST_FILE), "w") as file:
+        json.dump(manifest, file)
+    with pytest.raises(ValueError):
+        read_bundle(bundle_dir)
+
+
+def test_run_simulation_from_bundle(tmp_path):
+    world, inputs = synthetic_inputs()
+    write_bundle(str(tmp_path / "bundle"), inputs)
+    config = {
+        "commodity_forecast_path": None,
+        "native_countries_list": ["Country 0"],
+        "season_dict": world["season_dict"],
+        "alpha": 0.3,
+        "mu": 0.0001,
+        "lamda_c_list": [1, 0],
+        "phi": 1,
+        "w_phi": 1,
+        "start_year": 2000,
+        "random_seed": 5,
+        "transmission_lag_unit": "year",
+        "transmission_lag_type": "static",
+        "time_to_infectivity": 1,
+        "transmission_lag_shape": None,
+        "transmission_lag_scale": None,
+        "save_entry": False,
+        "save_estab": False,
+        "save_intro": True,
+        "save_country_intros": False,
+        "backend": "numpy",
+    }
+    outputs = []
+    for source in [inputs, read_bundle(str(tmp_path / "bundle"))]:
+        out_dir = str(tmp_path / f"out_{len(outputs)}")
+        outpath = run_simulation(config, source, out_dir, "sim", "test", 1)["6801"]
+        outputs.append(pd.read_csv(os.path.join(outpath, "pandemic_output.csv")))
+    pd.testing.assert_frame_equal(outputs[0], outputs[1])
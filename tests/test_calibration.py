@@ -0,0 +1,134 @@
+import inspect
+
+import numpy as np
+from pandemic.benchmarks.golden import GOLDEN_PARAMETERS, GOLDEN_WORLD
+from pandemic.benchmarks.synthetic import model_parameters, synthetic_world
+from pandemic.calibration import (
+    arrival_years,
+    cache_pair_factors,
+    evaluate_parameters,
+    parameter_grid,
+    run_sweep,
+    sample_parameters,
+)
+from pandemic.expected_value import expected_presence
+from pandemic.model_equations import pandemic_multiple_time_steps
+
+
+def sweep_inputs():
+    world = synthetic_world(n_steps=4, monthly=False, **GOLDEN_WORLD)
+    model_kwargs = model_parameters(world)
+    model_kwargs.update(GOLDEN_PARAMETERS)
+    model_kwargs.update(
+        trades=world["trades"],
+        distances=world["distances"],
+        climate_similarities=world["climate_similarities"],
+        locations=world["locations"],
+        start_year=int(world["date_list"][0]),
+        date_list=world["date_list"],
+        season_dict=world["season_dict"],
+        transmission_lag_type="static",
+        time_infect_units="year",
+        time_infect=1,
+        gamma_shape=None,
+        gamma_scale=None,
+        backend="numpy",
+        random_seed=4,
+    )
+    return world, model_kwargs
+
+
+def test_parameter_samples():
+    grid = parameter_grid({"alpha": [0.5, 1.0], "mu": [0, 1e-5, 1e-4]})
+    assert len(grid) == 6
+    assert grid[1] == {"alpha": 0.5, "mu": 1e-5}
+
+    samples = sample_parameters({"alpha": (0, 1), "mu": (0, 1e-4)}, 10, seed=1)
+    alpha = np.array([sample["alpha"] for sample in samples])
+    # one Latin hypercube sample in each tenth of the range
+    assert np.array_equal(np.sort(np.floor(alpha * 10)), np.arange(10))
+    assert samples == sample_parameters({"alpha": (0, 1), "mu": (0, 1e-4)}, 10, seed=1)
+
+
+def test_arrival_years():
+    presence = np.array([[0, 1, 0], [0.6, 1, 0.2]])
+    arrivals = arrival_years(presence, ["2010", "2011"], ["A", "B", "C"])
+    assert arrivals["A"] == 2011 and arrivals["B"] == 2010
+    assert np.isnan(arrivals["C"])
+
+
+def test_run_sweep():
+    world, model_kwargs = sweep_inputs()
+    # observed arrivals of the simulation with alpha = 1 and the same seed
+    outputs = pandemic_multiple_time_steps(
+        **dict(model_kwargs, locations=world["locations"].copy())
+    )
+    presence = outputs[0][[f"Presence {ts}" for ts in world["date_list"]]]
+    arrivals = arrival_years(
+        presence.values.astype(float).T,
+        world["date_list"],
+        outputs[0]["NAME"].values,
+    )
+    observed = arrivals.dropna().to_dict()
+    assert evaluate_parameters({}, model_kwargs, observed)["score"] == 0
+
+    parameter_sets = parameter_grid({"alpha": [0.2, 1.0], "mu": [1e-5]})
+    results = run_sweep(parameter_sets, model_kwargs, observed, processes=1)
+    assert list(results.columns) == ["alpha", "mu", "score", "locations_reached"]
+    assert results["alpha"][0] == 1.0 and results["score"][0] == 0
+    assert results["score"][1] > 0
+
+    parallel = run_sweep(parameter_sets, model_kwargs, observed, processes=2)
+    assert parallel.equals(results)
+
+    expected = run_sweep(
+        parameter_sets, model_kwargs, observed, expected_value=True, processes=1
+    )
+    assert len(expected) == 2 and np.isfinite(expected["score"]).all()
+
+
+def test_cached_pair_factors():
+    world, model_kwargs = sweep_inputs()
+    cached = cache_pair_factors(model_kwargs, {"alpha", "mu"})
+    assert cached["pair_factors"]["climate"] is not None
+    swept_beta = cache_pair_factors(model_kwargs, {"beta"})
+    assert swept_beta["pair_factors"]["climate"] is None
+    assert "pair_factors" not in cache_pair_factors(model_kwargs, {"trades"})
+
+    # factors computed once give the probabilities of other parameter values
+    for kwargs in (cached, swept_beta):
+        kwargs = dict(kwargs, alpha=0.7, mu=2e-5, beta=0.4)
+        parameters = dict(kwargs)
+        outputs = pandemic_multiple_time_steps(
+            **dict(kwargs, locations=world["locations"].copy())
+        )
+        del parameters["pair_factors"]
+        direct = pandemic_multiple_time_steps(
+            **dict(parameters, locations=world["locations"].copy())
+        )
+        for k in (1, 2, 3):
+            assert np.allclose(outputs[k], direct[k], rtol=1e-12, atol=0)
+        assert np.array_equal(outputs[5], direct[5])
+
+        accepted = inspect.signature(expected_presence).parameters
+        presence, _ = expected_presence(
+            **{key: value for key, value in kwargs.items() if key in accepted}
+        )
+        direct_presence, _ = expected_presence(
+            **{key: value for key, value in parameters.items() if key in accepted}
+        )
+        assert np.allclose(presence, direct_presence, rtol=1e-12, atol=0)
+
+
+def test_sweep_shares_random_seed():
+    world, model_kwargs = sweep_inputs()
+    del model_kwargs["random_seed"]
+    observed = {name: 2001 for name in world["locations"]["NAME"]}
+    # the same parameter set is scored on the same draws
+    results = run_sweep([{"alpha": 0.5}] * 6, model_kwargs, observed, processes=1)
+    assert results["score"].nunique() == 1
+
+    bounds = {"alpha": (0, 1)}
+    assert sample_parameters(bounds, 4, seed=None) != sample_parameters(
+        bounds, 4, seed=None
+    )
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pandemic.model_equations
+import pytest
+from pandemic.benchmarks.golden import outputs_to_arrays, run_case
+from pandemic.checkpoints import read_checkpoint, write_atomic
+
+
+def test_write_atomic(tmp_path):
+    path = str(tmp_path / "arrays.npz")
+    write_atomic(path, {"a": np.arange(3)})
+    write_atomic(path, {"a": np.arange(4)}, compressed=True)
+    with np.load(path) as file:
+        assert (file["a"] == np.arange(4)).all()
+    assert os.listdir(tmp_path) == ["arrays.npz"]
+
+
+def test_resume_from_checkpoint(tmp_path, monkeypatch):
+    checkpoint_dir = str(tmp_path / "checkpoint")
+    expected = outputs_to_arrays(run_case("monthly_stochastic"))
+
+    # kill the run during time step 14, after the checkpoint of step 10
+    single_time_step = pandemic.model_equations.pandemic_single_time_step
+    calls = []
+
+    def killed_time_step(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 14:
+            raise KeyboardInterrupt
+        return single_time_step(*args, **kwargs)
+
+    monkeypatch.setattr(
+        pandemic.model_equations, "pandemic_single_time_step", killed_time_step
+    )
+    with pytest.raises(KeyboardInterrupt):
+        run_case(
+            "monthly_stochastic", checkpoint_dir=checkpoint_dir, checkpoint_every=5
+        )
+    monkeypatch.undo()
+    assert int(read_checkpoint(checkpoint_dir)["step"]) == 10
+
+    resumed = outputs_to_arrays(
+        run_case(
+            "monthly_stochastic",
+            checkpoint_dir=checkpoint_dir,
+            checkpoint_every=5,
+            resume_from=checkpoint_dir,
+        )
+    )
+    for key in expected:
+        assert np.array_equal(expected[key], resumed[key]), key
+    assert int(read_checkpoint(checkpoint_dir)["step"]) == 24
+
+    with pytest.raises(ValueError):
+        run_case("annual_static", resume_from=checkpoint_dir)
+    with pytest.raises(ValueError):
+        run_case("monthly_stochastic", seed=0, resume_from=checkpoint_dir)
+    with pytest.raises(FileNotFoundError):
+        run_case("monthly_no_lag", resume_from=str(tmp_path / "missing"))
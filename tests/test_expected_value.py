@@ -0,0 +1,57 @@
+import numpy as np
+from pandemic.benchmarks.golden import (
+    GOLDEN_CASES,
+    GOLDEN_PARAMETERS,
+    GOLDEN_WORLD,
+    run_case,
+)
+from pandemic.benchmarks.synthetic import model_parameters, synthetic_world
+from pandemic.expected_value import expected_presence, lag_cdf
+
+
+def test_lag_cdf():
+    months = np.array([-1, 0, 11, 12, 24])
+    assert np.array_equal(lag_cdf(months, None, "year", 1, None, None), [0, 1, 1, 1, 1])
+    assert np.array_equal(
+        lag_cdf(months, "static", "year", 1, None, None), [0, 0, 0, 1, 1]
+    )
+    cdf = lag_cdf(months, "stochastic", "year", None, 2, 0.5)
+    assert cdf[0] == 0
+    assert (np.diff(cdf) >= 0).all() and cdf[-1] < 1
+
+
+def test_expected_presence_matches_realizations():
+    case = "monthly_stochastic"
+    settings = GOLDEN_CASES[case]
+    world = synthetic_world(
+        n_steps=settings["n_steps"], monthly=settings["monthly"], **GOLDEN_WORLD
+    )
+    parameters = model_parameters(world)
+    parameters.update(GOLDEN_PARAMETERS)
+    presence, introduction = expected_presence(
+        trades=world["trades"],
+        distances=world["distances"],
+        climate_similarities=world["climate_similarities"],
+        locations=world["locations"],
+        date_list=world["date_list"],
+        season_dict=world["season_dict"],
+        transmission_lag_type=settings["lag"],
+        time_infect_units="year",
+        time_infect=1,
+        gamma_shape=2,
+        gamma_scale=0.5,
+        **parameters,
+    )
+    assert presence.shape == (24, 16)
+    assert (np.diff(presence, axis=0) >= 0).all()
+    assert np.allclose(presence[-1] - presence[0], introduction[1:].sum(axis=0))
+
+    # mean presence of stochastic realizations
+    realizations = []
+    for seed in range(40):
+        locations = run_case(case, backend="numpy", seed=seed)[0]
+        columns = [f"Presence {ts}" for ts in world["date_list"]]
+        realizations.append(locations[columns].values.astype(float).T)
+    mean_presence = np.mean(realizations, axis=0)
+    assert np.abs(mean_presence - presence).max() < 0.25
+    assert abs(mean_presence[-1].sum() - presence[-1].sum()) < 1
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+from pandemic.generate_trade_forecasts import create_trade_arrays
+
+
+def test_create_trade_arrays(tmp_path):
+    codes = ["USA", "CHN", "BRA"]
+    list_of_csvs = []
+    for year in range(3):
+        path = str(tmp_path / f"trades_{2015 + year}.csv")
+        values = np.arange(9).reshape(3, 3) + 100 * year
+        pd.DataFrame(values, index=codes, columns=codes).to_csv(path)
+        list_of_csvs.append(path)
+
+    hist_arr, forecast_arr = create_trade_arrays(list_of_csvs, 4, random_seed=1)
+    assert forecast_arr.shape == (4, 3, 3)
+    # each value is one of the historical values of its pair
+    assert ((forecast_arr - hist_arr[0]) % 100 == 0).all()
+    assert np.array_equal(
+        forecast_arr, create_trade_arrays(list_of_csvs, 4, random_seed=1)[1]
+    )
@@ -0,0 +1,155 @@
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandemic.helpers import load_trade_cube
+
+# get_comtrade is a data preparation script rather than part of the package
+spec = importlib.util.spec_from_file_location(
+    "get_comtrade",
+    os.path.join(
+        os.path.dirname(__file__), "..", "Data", "Comtrade", "get_comtrade.py"
+    ),
+)
+get_comtrade = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(get_comtrade)
+
+# two historical UN codes of Germany share a cube row
+UN_TO_ISO = {"276": "DEU", "280": "DEU", "842": "USA"}
+UN_COUNTRIES = pd.DataFrame({"UN": ["276", "280", "842"]})
+
+
+def availability(rows):
+    return pd.DataFrame(rows, columns=["r", "ps", "freq", "publicationDate"])
+
+
+def trade_data(rows):
+    return pd.DataFrame(rows, columns=["period", "rtCode", "ptCode", "TradeValue"])
+
+
+def test_changed_availability():
+    available = availability(
+        [
+            ["276", "2010", "ANNUAL", "2011-01"],
+            ["276", "2011", "ANNUAL", "2012-06"],
+            ["842", "2011", "ANNUAL", "2012-01"],
+        ]
+    )
+    manifest = pd.DataFrame(
+        [
+            ["6801", "276", "2010", "ANNUAL", "2011-01"],
+            ["6801", "276", "2011", "ANNUAL", "2012-01"],
+            ["6802", "842", "2011", "ANNUAL", "2012-01"],
+        ],
+        columns=["hs", "r", "ps", "freq", "publicationDate"],
+    )
+
+    changed = get_comtrade.changed_availability(available, manifest, "6801")
+
+    # republished and never fetched (for this HS code) periods
+    assert changed[["r", "ps"]].values.tolist() == [["276", "2011"], ["842", "2011"]]
+
+
+def test_update_fetch_manifest(tmp_path):
+    path = str(tmp_path / "manifest.csv")
+    manifest = get_comtrade.read_fetch_manifest(path)
+    manifest = get_comtrade.update_fetch_manifest(
+        manifest, availability([["276", "2011", "ANNUAL", "2012-01"]]), "6801", path
+    )
+    manifest = get_comtrade.update_fetch_manifest(
+        manifest, availability([["276", "2011", "ANNUAL", "2012-06"]]), "6801", path
+    )
+
+    saved = get_comtrade.read_fetch_manifest(path)
+    assert saved.values.tolist() == [["6801", "276", "2011", "ANNUAL", "2012-06"]]
+    assert manifest.values.tolist() == saved.values.tolist()
+
+
+def test_plan_hs_fetch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    requested = availability(
+        [
+            ["276", "2011", "ANNUAL", "2012-06"],
+            ["280", "2011", "ANNUAL", "2012-01"],
+            ["842", "2011", "ANNUAL", "2012-01"],
+        ]
+    )
+    manifest = pd.DataFrame(
+        [
+            ["6801", "276", "2011", "ANNUAL", "2012-01"],
+            ["6801", "280", "2011", "ANNUAL", "2012-01"],
+            ["6801", "842", "2011", "ANNUAL", "2012-01"],
+        ],
+        columns=["hs", "r", "ps", "freq", "publicationDate"],
+    )
+    annual = {2010: ["276", "842"], 2011: ["276", "280", "842"]}
+
+    # without a saved cube, all requested data are fetched
+    plan = get_comtrade.plan_hs_fetch(
+        "6801", requested, manifest, annual, {}, True, UN_TO_ISO
+    )
+    assert plan[1] is None and plan[2] == annual
+
+    os.makedirs("6801")
+    open("6801/6801_trades.npz", "w").close()
+    fetched, changed, annual_dict, monthly_dict = get_comtrade.plan_hs_fetch(
+        "6801", requested, manifest, annual, {}, True, UN_TO_ISO
+    )
+    assert fetched["r"].tolist() == ["276"]
+    assert changed.values.tolist() == [["276", 2011]]
+    # the other reporter of the DEU row is fetched again to rebuild the row
+    assert annual_dict == {2011: ["276", "280"]} and monthly_dict == {}
+
+
+def test_update_hs_timestep_matrices(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    years = [2010, 2011]
+    get_comtrade.save_hs_timestep_matrices(
+        "6801",
+        years,
+        trade_data(
+            [
+                [2010, 276, "842", 1.0],
+                [2010, 280, "842", 2.0],
+                [2010, 842, "276", 3.0],
+                [2011, 276, "842", 4.0],
+                [2011, 280, "842", 5.0],
+                [2011, 842, "276", 6.0],
+            ]
+        ),
+        UN_COUNTRIES,
+        UN_TO_ISO,
+    )
+    os.remove("6801/6801_2010.csv")
+
+    # 276 revised its 2011 imports, 280 is fetched again for the same row
+    get_comtrade.update_hs_timestep_matrices(
+        "6801",
+        years,
+        trade_data([[2011, 276, "842", 10.0], [2011, 280, "842", 5.0]]),
+        UN_COUNTRIES,
+        UN_TO_ISO,
+        pd.DataFrame({"country": ["276"], "year": [2011]}),
+    )
+
+    trades, date_list, iso_codes = load_trade_cube("6801/6801_trades.npz")
+    assert date_list == ["2010", "2011"] and iso_codes == ["DEU", "USA"]
+    assert np.array_equal(trades[0], [[0, 3], [3, 0]])
+    assert np.array_equal(trades[1], [[0, 15], [6, 0]])
+    # only the matrices of changed timesteps are rewritten
+    assert not os.path.exists("6801/6801_2010.csv")
+    matrix = pd.read_csv("6801/6801_2011.csv", index_col=0)
+    assert np.array_equal(matrix.values, trades[1])
+
+    # the saved cube does not match a crosswalk with other countries
+    with pytest.raises(ValueError):
+        get_comtrade.update_hs_timestep_matrices(
+            "6801",
+            years,
+            trade_data([[2011, 276, "842", 10.0]]),
+            pd.DataFrame({"UN": ["276", "842", "124"]}),
+            {"276": "DEU", "842": "USA", "124": "CAN"},
+            pd.DataFrame({"country": ["276"], "year": [2011]}),
+        )
@@ -0,0 +1,53 @@
+import logging
+import os
+
+import numpy as np
+from pandemic.benchmarks.golden import (
+    GOLDEN_CASES,
+    check_golden,
+    compare_distributions,
+    compare_outputs,
+    outputs_to_arrays,
+    run_case,
+)
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+
+
+def test_golden_outputs():
+    for backend in ["python", "numpy", "numba"]:
+        checks = check_golden(GOLDEN_DIR, backend=backend)
+        for case, case_checks in checks.items():
+            assert all(case_checks.values()), (backend, case, case_checks)
+
+
+def test_golden_distributions():
+    comparison = compare_distributions(
+        "monthly_stochastic", backend="numpy", seeds=range(40)
+    )
+    assert comparison["ks_pvalue"] > 0.01
+    assert comparison["max_presence_z"] < 4
+
+
+def test_run_case_restores_log_level():
+    logger = logging.getLogger("pandemic")
+    level = logger.level
+    logger.setLevel(logging.DEBUG)
+    try:
+        run_case("annual_static")
+        assert logger.level == logging.DEBUG
+    finally:
+        logger.setLevel(level)
+
+
+def test_golden_single_precision():
+    for case in GOLDEN_CASES:
+        with np.load(os.path.join(GOLDEN_DIR, f"{case}.npz")) as fixture:
+            golden = {key: fixture[key] for key in fixture.files}
+        outputs = outputs_to_arrays(run_case(case, backend="numpy", precision="single"))
+        assert outputs["introduction"].dtype == np.float32
+        assert outputs["country_introduction"].dtype == np.uint8
+        # time steps are computed in double precision, so introductions are
+        # the same and probabilities are rounded to single precision
+        checks = compare_outputs(golden, outputs, rtol=1e-6, atol=1e-12)
+        assert all(checks.values()), (case, checks)
@@ -1,5 +1,16 @@
+import numpy as np
 import pandas as pd
-from pandemic.helpers import location_pairs_with_host, filter_trades_list
+from pandemic.helpers import (
+    location_pairs_with_host,
+    active_location_pairs,
+    filter_trades_list,
+    save_trade_cube,
+    load_trade_cube,
+    deflate_and_aggregate_trade,
+    create_season_mask,
+    covariate_table,
+    trade_normalization_bounds,
+)
 
 
 def test_location_filter():
@@ -15,6 +26,16 @@ def test_location_filter():
     assert len(location_pairs_with_host(locations)) == 4
 
 
+def test_active_location_pairs():
+    host_mask = np.array([False, True, True, True])
+    origins, destinations = active_location_pairs([1, 3], host_mask)
+    assert list(zip(origins, destinations)) == [(1, 2), (1, 3), (3, 1), (3, 2)]
+
+    # origins without host are not evaluated
+    origins, destinations = active_location_pairs([0], host_mask)
+    assert len(origins) == 0 and len(destinations) == 0
+
+
 def test_filter_trades_list():
     start_year = 2010
     monthly_file_list = [
@@ -35,3 +56,102 @@ def test_filter_trades_list():
 
     assert len(filter_trades_list(monthly_file_list, start_year)) == 3
     assert len(filter_trades_list(annual_file_list, start_year)) == 4
+
+
+def test_trade_cube_round_trip(tmp_path):
+    trades = np.arange(18, dtype=float).reshape(2, 3, 3)
+    path = str(tmp_path / "HS68_trades.npz")
+    save_trade_cube(path, trades, [200001, 200002], ["USA", "CHN", "BRA"])
+    cube, date_list, iso3_codes = load_trade_cube(path)
+
+    assert (cube == trades).all()
+    assert date_list == ["200001", "200002"]
+    assert iso3_codes == ["USA", "CHN", "BRA"]
+
+
+def test_deflate_and_aggregate_trade(tmp_path):
+    date_list = ["201901", "201902"]
+    iso3_codes = ["USA", "CHN"]
+    save_trade_cube(
+        str(tmp_path / "6801.npz"), np.ones((2, 2, 2)), date_list, iso3_codes
+    )
+    save_trade_cube(
+        str(tmp_path / "6802.npz"), np.full((2, 2, 2), 3.0), date_list, iso3_codes
+    )
+    cpi = {"201901": 100.0, "201902": 200.0}
+
+    trades, dates, codes = deflate_and_aggregate_trade(
+        [str(tmp_path / "6801.npz"), str(tmp_path / "6802.npz")],
+        str(tmp_path / "agg.npz"),
+        cpi=cpi,
+        base_ts="201901",
+        csv_dir=str(tmp_path / "monthly_agg"),
+        file_prefix="HS68",
+    )
+
+    assert (trades[0] == 4).all() and (trades[1] == 2).all()
+    assert (load_trade_cube(str(tmp_path / "agg.npz"))[0] == trades).all()
+    saved = pd.read_csv(
+        tmp_path / "monthly_agg" / "HS68_trades_201902.csv", index_col=0
+    )
+    assert list(saved.index) == iso3_codes
+    assert (saved.values == 2).all()
+
+
+def test_create_season_mask():
+    locations = pd.DataFrame(
+        {"ISO3": ["USA", "BRA", "ECU", "CHN"], "LAT": [38.0, -10.0, -1.0, 35.0]}
+    )
+    season_dict = {
+        "NH_season": ["09", "10", "11", "12", "01", "02", "03", "04"],
+        "SH_season": ["04", "05", "06", "07", "08", "09", "10"],
+        "lat_bands": [{"min_lat": -5, "max_lat": 5, "season": ["06"]}],
+        "country_seasons": {"CHN": ["01", "07"]},
+    }
+    season_mask = create_season_mask(locations, season_dict)
+
+    assert season_mask.shape == (12, 4)
+    assert list(np.flatnonzero(season_mask[:, 0]) + 1) == [1, 2, 3, 4, 9, 10, 11, 12]
+    assert list(np.flatnonzero(season_mask[:, 1]) + 1) == [4, 5, 6, 7, 8, 9, 10]
+    assert list(np.flatnonzero(season_mask[:, 2]) + 1) == [6]
+    assert list(np.flatnonzero(season_mask[:, 3]) + 1) == [1, 7]
+
+
+def test_covariate_table():
+    locations = pd.DataFrame(
+        {
+            "ISO3": ["ECU", "USA"],
+            "Host Percent Area": [0.1, 0.2],
+            "Host Percent Area T1": [0.3, 0.4],
+            "Host Percent Area T3": [0.5, 0.6],
+        }
+    )
+    host = covariate_table(locations, "Host Percent Area", ["T0", "T1", "T2", "T3"])
+    assert host.shape == (4, 2)
+    assert np.array_equal(host[:, 1], [0.2, 0.4, 0.4, 0.6])
+    phyto = covariate_table(locations, "Phytosanitary Capacity", ["2010", "2011"])
+    assert np.array_equal(phyto, np.zeros((2, 2)))
+
+
+def test_trade_normalization_bounds():
+    trades = np.array(
+        [
+            [[0, 5], [2, 0]],
+            [[0, 9], [0, 0]],
+            [[0, 1], [4, 0]],
+        ],
+        dtype=float,
+    )
+    date_list = ["201001", "201002", "201101"]
+
+    min_Tc, max_Tc = trade_normalization_bounds(trades, date_list)
+    assert list(min_Tc) == [2, 2, 1] and list(max_Tc) == [9, 9, 4]
+
+    min_Tc, max_Tc = trade_normalization_bounds(trades, date_list, method="origin")
+    assert min_Tc.shape == (3, 2)
+    assert list(min_Tc[0]) == [2, 5] and list(max_Tc[2]) == [4, 1]
+
+    min_Tc, max_Tc = trade_normalization_bounds(
+        trades, date_list, method="quantile", quantiles=(0, 1)
+    )
+    assert list(min_Tc) == [2, 2, 1] and list(max_Tc) == [9, 9, 4]
@@ -0,0 +1,41 @@
+import json
+import os
+from pandemic.instrumentation import (
+    add_count,
+    create_report,
+    profiling,
+    step_histogram,
+    timed,
+    write_timing_report,
+)
+
+
+def test_timing_report(tmp_path):
+    report = create_report()
+    for _ in range(2):
+        with timed(report, "simulation"):
+            add_count(report, "introductions", 3)
+    report["steps"] = [0.1, 0.2, 0.3]
+
+    # no report, no instrumentation
+    with timed(None, "simulation"):
+        add_count(None, "introductions", 3)
+
+    with profiling(report, str(tmp_path), 1, profile=True, trace_memory=True):
+        [i for i in range(1000)]
+
+    write_timing_report(report, str(tmp_path), 1)
+    with open(tmp_path / "run_1_timing.json") as file:
+        timing = json.load(file)
+    assert timing["phases"]["simulation"] >= 0
+    assert timing["counters"]["introductions"] == 6
+    assert timing["counters"]["peak_memory_bytes"] > 0
+    assert timing["steps"]["steps"] == 3
+    assert sum(timing["steps"]["counts"]) == 3
+    assert os.path.exists(tmp_path / "run_1_profile.prof")
+
+
+def test_step_histogram():
+    assert step_histogram([]) == {"steps": 0}
+    histogram = step_histogram([1.0, 3.0], bins=2)
+    assert histogram["mean"] == 2.0 and histogram["counts"] == [1, 1]
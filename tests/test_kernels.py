@@ -0,0 +1,115 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from pandemic import kernels
+from pandemic.kernels import (
+    evaluate_pairs,
+    pair_probabilities_loop,
+    pair_probabilities_numpy,
+)
+from pandemic.random_streams import create_generator
+from pandemic.time_steps import NEVER_INFECTIVE
+
+
+def pair_inputs(n=6, seed=0):
+    rs = np.random.RandomState(seed)
+    trade = rs.randint(0, 100, size=(n, n)).astype(float)
+    trade[rs.rand(n, n) < 0.3] = 0
+    origins = np.repeat(np.arange(2), n)
+    destinations = np.tile(np.arange(n), 2)
+    keep = origins != destinations
+    infective = np.full(n, NEVER_INFECTIVE, dtype=np.int64)
+    infective[0] = 2010
+    infective[1] = 2012
+    return (
+        origins[keep],
+        destinations[keep],
+        infective,
+        2011,
+        rs.choice([0.0, 0.5], n),
+        rs.rand(n),
+        np.array([1.0, 0.0, 1.0, 1.0, 1.0, 1.0][:n]),
+        trade,
+        rs.rand(n, n) * 1000,
+        rs.rand(n, n),
+        np.zeros(n),
+        np.full(n, 100.0),
+        0.9,
+        0.5,
+        0.0001,
+        1,
+        1,
+        1,
+        1.0,
+        1.0,
+    )
+
+
+def test_pair_probabilities_backends_agree():
+    args = pair_inputs()
+    loop = pair_probabilities_loop(*args)
+    vectorized = pair_probabilities_numpy(*args)
+    for expected, actual in zip(loop, vectorized):
+        assert np.allclose(expected, actual, rtol=1e-12, atol=0)
+
+    # origin 1 is not yet infective
+    entry, establishment, introduction = loop
+    assert (introduction[args[0] == 1] == 0).all()
+    assert (establishment[args[0] == 0] > 0).all()
+    assert (entry[(args[0] == 0) & (args[7][args[1], args[0]] == 0)] == 0).all()
+
+
+def test_evaluate_pairs_same_introductions():
+    args = pair_inputs()
+    outputs = []
+    for backend in ["numpy", "numba"]:
+        rng = create_generator(3)
+        outputs.append(evaluate_pairs(6, *args, backend=backend, rng=rng))
+    for expected, actual in zip(*outputs):
+        assert np.allclose(expected, actual, rtol=1e-12, atol=0)
+    assert np.array_equal(outputs[0][3], outputs[1][3])
+    assert np.array_equal(outputs[0][4], outputs[1][4])
+
+
+def test_numba_fallback(monkeypatch):
+    args = pair_inputs()
+    monkeypatch.setattr(kernels, "compiled_pair_probabilities", lambda: None)
+    with pytest.warns(UserWarning):
+        fallback = kernels.pair_probabilities(*args, backend="numba")
+    assert np.array_equal(fallback[2], pair_probabilities_numpy(*args)[2])
+    with pytest.raises(ValueError):
+        kernels.pair_probabilities(*args, backend="fortran")
+
+
+def test_numba_imported_lazily():
+    # the engine is imported without Numba, which is only needed by the
+    # numba backend
+    code = "import sys, pandemic.model_equations; print('numba' in sys.modules)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert output.stdout.strip() == "False"
+
+
+def test_joint_pair_probabilities():
+    args = list(pair_inputs())
+    trade = args[7]
+    # a second commodity with half the trade and its own importance
+    args[7] = np.stack([trade, trade / 2])
+    args[10] = np.zeros((2, 6))
+    args[11] = np.full((2, 6), 100.0)
+    args[15] = np.array([0.6, 0.4])
+    vectorized = pair_probabilities_numpy(*args)
+    loop = kernels.joint_pair_probabilities(pair_probabilities_loop, *args)
+    for expected, actual in zip(loop, vectorized):
+        assert np.allclose(expected, actual, rtol=1e-12, atol=0)
+
+    # entry on either commodity
+    single = list(pair_inputs())
+    entries = []
+    for c in range(2):
+        single[7], single[15] = args[7][c], args[15][c]
+        entries.append(pair_probabilities_loop(*single)[0])
+    assert np.allclose(vectorized[0], 1 - (1 - entries[0]) * (1 - entries[1]))
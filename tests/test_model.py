@@ -0,0 +1,146 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+from pandemic.benchmarks.synthetic import synthetic_world
+from pandemic.model import load_countries, run_simulation
+
+
+def simulation_inputs():
+    world = synthetic_world(8, 24, trade_density=0.8, seed=3)
+    countries = world["locations"].drop(columns=["geometry"])
+    codes = countries["ISO3"]
+    return world, {
+        "countries": countries,
+        "distances": world["distances"],
+        "climate_similarities": world["climate_similarities"],
+        "trades_list": [world["trades"], world["trades"]],
+        "code_list": ["6801", "6802"],
+        "commodities_available": ["6801", "6802"],
+        "date_list": world["date_list"],
+        "example_trade_matrix": pd.DataFrame(
+            world["trades"][0], index=codes, columns=codes
+        ),
+        "load_report": {"phases": {}, "counters": {}, "steps": []},
+    }
+
+
+def simulation_config(world):
+    return {
+        "commodity_forecast_path": None,
+        "native_countries_list": ["Country 0"],
+        "season_dict": world["season_dict"],
+        "alpha": 0.3,
+        "mu": 0.0001,
+        "lamda_c_list": [1, 0],
+        "phi": 1,
+        "w_phi": 1,
+        "start_year": 2000,
+        "random_seed": 5,
+        "transmission_lag_unit": "year",
+        "transmission_lag_type": "static",
+        "time_to_infectivity": 1,
+        "transmission_lag_shape": None,
+        "transmission_lag_scale": None,
+        "save_entry": False,
+        "save_estab": False,
+        "save_intro": True,
+        "save_country_intros": False,
+        "backend": "numpy",
+    }
+
+
+def test_run_simulation(tmp_path):
+    world, inputs = simulation_inputs()
+    countries = inputs["countries"]
+    config = simulation_config(world)
+    columns = list(countries.columns)
+
+    outpaths = run_simulation(config, inputs, str(tmp_path), "sim", "test", 1)
+    assert list(outpaths) == ["6801"]
+    outpath = outpaths["6801"]
+    assert os.path.exists(os.path.join(outpath, "pandemic_output.csv"))
+    assert os.path.exists(os.path.join(outpath, "pandemic_output_aggregated.csv"))
+    assert os.path.exists(os.path.join(outpath, "run_1_timing.json"))
+    assert len(os.listdir(os.path.join(outpath, "prob_intro"))) == 24
+    assert not os.path.exists(os.path.join(outpath, "prob_entry"))
+    # inputs can be reused for other runs
+    assert list(countries.columns) == columns
+    assert "geopandas" not in sys.modules
+
+
+def test_load_countries(tmp_path):
+    path = str(tmp_path / "countries.csv")
+    pd.DataFrame({"NAME": ["Namibia"], "ISO3": ["NAM"]}).to_csv(path, index=False)
+    countries = load_countries(path)
+    assert countries["NAME"][0] == "Namibia"
+
+
+def test_run_simulation_joint_commodities(tmp_path):
+    world, inputs = simulation_inputs()
+    config = simulation_config(world)
+    config["lamda_c_list"] = [1, 0.5]
+    config["joint_commodities"] = True
+
+    outpaths = run_simulation(config, inputs, str(tmp_path), "sim", "test", 1)
+    assert list(outpaths) == ["joint"]
+    assert len(os.listdir(os.path.join(outpaths["joint"], "prob_intro"))) == 24
+
+
+def test_run_simulation_expected_value(tmp_path):
+    world, inputs = simulation_inputs()
+    config = simulation_config(world)
+    config["expected_value"] = True
+
+    outpaths = run_simulation(config, inputs, str(tmp_path), "sim", "test", 1)
+    presence = pd.read_csv(os.path.join(outpaths["6801"], "expected_presence.csv"))
+    assert len(presence) == 8
+    assert presence[f"Probability of presence {world['date_list'][0]}"][0] == 1
+
+
+def test_run_simulation_rebuilds_stale_snapshot(tmp_path, caplog):
+    world, inputs = simulation_inputs()
+    config = dict(simulation_config(world), fork_date="2001")
+    outpath = run_simulation(config, inputs, str(tmp_path), "sim", "test", 1)["6801"]
+    first = pd.read_csv(os.path.join(outpath, "pandemic_output.csv"))
+
+    # a snapshot of other historical parameters is not reused
+    changed = dict(config, alpha=0.9)
+    run_simulation(changed, inputs, str(tmp_path), "sim", "test", 1)
+    assert "simulated from other inputs" in caplog.text
+    caplog.clear()
+    run_simulation(changed, inputs, str(tmp_path), "sim", "test", 1)
+    assert "simulated from other inputs" not in caplog.text
+
+    run_simulation(config, inputs, str(tmp_path), "sim", "test", 1)
+    assert pd.read_csv(os.path.join(outpath, "pandemic_output.csv")).equals(first)
+
+
+def test_run_simulation_forecast_parameters(tmp_path, caplog):
+    world, inputs = simulation_inputs()
+    config = dict(simulation_config(world), fork_date="2001")
+    outpath = run_simulation(config, inputs, str(tmp_path), "sim", "test", 1)["6801"]
+    first = pd.read_csv(os.path.join(outpath, "pandemic_output.csv"))
+    state_path = os.path.join(str(tmp_path), "snapshots", "6801", "run_1", "state.npz")
+    modified = os.stat(state_path).st_mtime_ns
+
+    # scenarios with other forecast parameters resume from the same snapshot
+    forecast = dict(config, forecast_parameters={"alpha": 0.9, "lamda_c_list": [2, 0]})
+    run_simulation(forecast, inputs, str(tmp_path), "sim", "test", 1)
+    assert "simulated from other inputs" not in caplog.text
+    assert os.stat(state_path).st_mtime_ns == modified
+    second = pd.read_csv(os.path.join(outpath, "pandemic_output.csv"))
+    columns = [c for c in first.columns if c.startswith("Probability of introduction")]
+    historical = [c for c in columns if c.endswith(tuple(world["date_list"][:12]))]
+    assert len(historical) == 12
+    assert second[historical].equals(first[historical])
+    assert not second[columns].equals(first[columns])
+
+    # the random seed is shared by the historical and forecast periods
+    with pytest.raises(ValueError):
+        changed = dict(config, forecast_parameters={"random_seed": 1})
+        run_simulation(changed, inputs, str(tmp_path), "sim", "test", 1)
+    with pytest.raises(ValueError):
+        changed = dict(simulation_config(world), forecast_parameters={"alpha": 0.9})
+        run_simulation(changed, inputs, str(tmp_path), "sim", "test", 1)
@@ -1,7 +1,11 @@
+import logging
+
 import numpy as np
 import pandas as pd
 
-from pandemic.model_equations import pandemic_single_time_step
+from pandemic.model_equations import introduce_pests, pandemic_single_time_step
+from pandemic.random_streams import create_generator
+from pandemic.time_steps import NEVER_INFECTIVE, infective_months
 
 
 def test_pandemic_runs():
@@ -39,11 +43,11 @@ def test_pandemic_runs():
         mu=0.0002,
         lamda_c=1,
         phi=5,
-        sigma_epsilon=0.5,
         sigma_h=0.5,
         sigma_kappa=0.5,
-        sigma_phi=2,
-        sigma_T=20,
+        w_phi=1,
+        min_Tc=0,
+        max_Tc=500,
         time_step=time_step,
         season_dict=season_dict,
         time_infect=time_infect,
@@ -54,3 +58,69 @@ def test_pandemic_runs():
     )
     assert (e[0] >= 0).all() and (e[0] <= 1).all()
     assert (e[1] >= 0).all() and (e[1] <= 1).all()
+
+
+def test_introduce_pests():
+    locations = pd.DataFrame(
+        {
+            "NAME": ["United States", "China", "Brazil"],
+            "Presence": [True, False, True],
+            "Infective": ["201001", None, "201506"],
+        }
+    )
+    infective = infective_months(locations["Infective"])
+
+    # reintroductions only move infectivity earlier
+    locations = introduce_pests(
+        locations, infective, [1, 1, 2], "201503", "static", "month", 2, 2, 1
+    )
+    assert locations["Presence"].all()
+    assert list(locations["Infective"]) == ["201001", "201505", "201505"]
+
+    # stochastic lags are drawn once per introduction
+    infective[1] = NEVER_INFECTIVE
+    lags = np.round(create_generator(0).gamma(2, 1, 2)).astype(int)
+    introduce_pests(
+        locations,
+        infective,
+        [1, 0],
+        "2015",
+        "stochastic",
+        "year",
+        0,
+        2,
+        1,
+        rng=create_generator(0),
+    )
+    assert infective[1] == (2015 + lags[0]) * 12
+    assert infective[0] == 2010 * 12
+
+    # units are not needed without a lag and default to years for static lags
+    infective[1] = NEVER_INFECTIVE
+    introduce_pests(locations, infective, [1], "2016", None, None, 0, None, None)
+    assert infective[1] == 2016 * 12
+    infective[1] = NEVER_INFECTIVE
+    introduce_pests(locations, infective, [1], "2016", None, "week", 0, None, None)
+    assert infective[1] == 2016 * 12
+    infective[1] = NEVER_INFECTIVE
+    introduce_pests(locations, infective, [1], "2016", "static", None, 1, None, None)
+    assert infective[1] == 2017 * 12
+
+
+def test_introduce_pests_debug_log(caplog):
+    locations = pd.DataFrame(
+        {
+            "NAME": ["United States", "China"],
+            "Presence": [True, False],
+            "Infective": ["201001", None],
+        }
+    )
+    infective = infective_months(locations["Infective"])
+
+    with caplog.at_level(logging.INFO, logger="pandemic"):
+        introduce_pests(locations, infective, [1], "2015", None, None, 0, None, None)
+    assert caplog.records == []
+    infective[1] = NEVER_INFECTIVE
+    with caplog.at_level(logging.DEBUG, logger="pandemic"):
+        introduce_pests(locations, infective, [1], "2016", None, None, 0, None, None)
+    assert [r.getMessage() for r in caplog.records] == ["China infective: 2016"]
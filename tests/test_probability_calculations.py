@@ -1,4 +1,7 @@
+import numpy as np
 from pandemic.probability_calculations import (
+    combined_probability_of_entry,
+    combined_probability_of_introduction,
     probability_of_entry,
     probability_of_establishment,
     probability_of_introduction,
@@ -157,3 +160,24 @@ def test_probability_of_introduction():
         )
         <= 1
     )
+
+
+def test_combined_probability_of_introduction():
+    probabilities = np.array([[0, 0.5, 0.5], [0, 0, 0], [1, 0.2, 0]])
+    combined = combined_probability_of_introduction(probabilities)
+
+    assert np.allclose(combined, [0.75, 0, 1])
+    assert np.allclose(
+        combined_probability_of_introduction(np.stack([probabilities] * 2)),
+        [combined, combined],
+    )
+    # many small probabilities do not underflow to zero
+    assert combined_probability_of_introduction(np.full(10, 1e-17))[()] > 0
+
+
+def test_combined_probability_of_entry():
+    assert np.isclose(combined_probability_of_entry([0.5, 0.5]), 0.75)
+    assert np.isclose(combined_probability_of_entry([0.2]), 0.2)
+    assert np.allclose(
+        combined_probability_of_entry([[0, 0.5, 1], [0.5, 0.5, 0]]), [0.5, 0.75, 1]
+    )
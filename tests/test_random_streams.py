@@ -0,0 +1,12 @@
+import numpy as np
+from pandemic.random_streams import create_generator, draw_seed
+
+
+def test_create_generator():
+    draws = create_generator(7, run=2, commodity=1, step=30).random(5)
+    assert np.array_equal(
+        draws, create_generator(7, run=2, commodity=1, step=30).random(5)
+    )
+    for key in [(8, 2, 1, 30), (7, 3, 1, 30), (7, 2, 0, 30), (7, 2, 1, 31)]:
+        assert not np.array_equal(draws, create_generator(*key).random(5))
+    assert isinstance(draw_seed(), int)
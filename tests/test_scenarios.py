@@ -0,0 +1,156 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from pandemic.benchmarks.golden import GOLDEN_PARAMETERS, GOLDEN_WORLD
+from pandemic.benchmarks.synthetic import model_parameters, synthetic_world
+from pandemic.model_equations import pandemic_multiple_time_steps
+from pandemic.scenarios import (
+    fork_step,
+    prefix_hash,
+    replace_snapshot,
+    run_scenario,
+    run_scenarios,
+    simulate_prefix,
+    snapshot_matches,
+)
+
+world = synthetic_world(n_steps=36, **GOLDEN_WORLD)
+model_kwargs = dict(
+    model_parameters(world),
+    distances=world["distances"],
+    climate_similarities=world["climate_similarities"],
+    start_year=2000,
+    season_dict=world["season_dict"],
+    transmission_lag_type="stochastic",
+    time_infect_units="year",
+    time_infect=1,
+    gamma_shape=2,
+    gamma_scale=0.5,
+    random_seed=42,
+)
+model_kwargs.update(GOLDEN_PARAMETERS)
+
+
+def test_fork_step():
+    assert fork_step(world["date_list"], "2001") == 12
+    assert fork_step(world["date_list"], 200201) == 24
+    with pytest.raises(ValueError):
+        fork_step(world["date_list"], "200103")
+
+
+def test_scenarios_from_snapshot(tmp_path):
+    snapshot_dir = str(tmp_path / "snapshot")
+    forecast = world["trades"].copy()
+    forecast[12:] = synthetic_world(16, 36, seed=8)["trades"][12:]
+
+    simulate_prefix(
+        snapshot_dir,
+        world["trades"],
+        world["date_list"],
+        world["locations"],
+        "2001",
+        **model_kwargs,
+    )
+    scenarios = [
+        dict(
+            snapshot_dir=snapshot_dir,
+            trades=trades,
+            date_list=world["date_list"],
+            locations=world["locations"],
+            **model_kwargs,
+        )
+        for trades in [world["trades"], forecast]
+    ]
+    serial = run_scenarios(scenarios, processes=1)
+    parallel = run_scenarios(scenarios, processes=2)
+
+    expected = pandemic_multiple_time_steps(
+        trades=world["trades"],
+        date_list=world["date_list"],
+        locations=world["locations"].copy(),
+        **model_kwargs,
+    )
+    for k in [1, 2, 3, 5]:
+        assert np.array_equal(serial[0][k], expected[k])
+        assert np.array_equal(parallel[0][k], expected[k])
+        assert np.array_equal(parallel[1][k], serial[1][k])
+        # scenarios share the outputs of the historical period
+        assert np.array_equal(serial[1][k][:12], expected[k][:12])
+    assert serial[0][4].equals(expected[4])
+    assert serial[0][0]["Presence"].equals(expected[0]["Presence"])
+    assert np.abs(serial[1][3][12:] - expected[3][12:]).max() > 0.01
+
+
+def test_snapshot_inputs_hash(tmp_path):
+    snapshot_dir = str(tmp_path / "snapshot")
+    args = (world["trades"], world["date_list"], world["locations"], "2001")
+    inputs_hash = prefix_hash(*args, **model_kwargs)
+    assert not snapshot_matches(snapshot_dir, inputs_hash)
+
+    simulate_prefix(snapshot_dir, *args, **model_kwargs)
+    assert snapshot_matches(snapshot_dir, inputs_hash)
+
+    # forecast trades do not change the historical period
+    forecast = world["trades"].copy()
+    forecast[12:] *= 2
+    assert prefix_hash(forecast, *args[1:], **model_kwargs) == inputs_hash
+    # historical trades, parameters, and random seeds do
+    historical = world["trades"].copy()
+    historical[:12] *= 2
+    assert prefix_hash(historical, *args[1:], **model_kwargs) != inputs_hash
+    for key, value in [("alpha", 0.5), ("random_seed", None), ("run", 1)]:
+        changed = dict(model_kwargs, **{key: value})
+        assert not snapshot_matches(snapshot_dir, prefix_hash(*args, **changed))
+
+    other_hash = prefix_hash(*args, **dict(model_kwargs, alpha=0.5))
+    with pytest.raises(ValueError):
+        run_scenario(
+            snapshot_dir,
+            world["trades"],
+            world["date_list"],
+            world["locations"],
+            inputs_hash=other_hash,
+            **model_kwargs,
+        )
+    outputs = run_scenario(
+        snapshot_dir,
+        world["trades"],
+        world["date_list"],
+        world["locations"],
+        inputs_hash=inputs_hash,
+        **model_kwargs,
+    )
+    assert outputs[3].shape[0] == len(world["date_list"])
+
+
+def test_replace_snapshot(tmp_path):
+    snapshot_dir = str(tmp_path / "snapshot")
+    args = (world["trades"], world["date_list"], world["locations"], "2001")
+    inputs_hash = prefix_hash(*args, **model_kwargs)
+
+    # a snapshot of other inputs is replaced and no temporary directory is left
+    simulate_prefix(snapshot_dir, *args, **dict(model_kwargs, alpha=0.5))
+    simulate_prefix(snapshot_dir, *args, **model_kwargs)
+    assert snapshot_matches(snapshot_dir, inputs_hash)
+    assert os.listdir(str(tmp_path)) == ["snapshot"]
+
+    # a snapshot of the same inputs saved by another run is kept
+    built_dir = str(tmp_path / ".snapshot-other")
+    os.makedirs(built_dir)
+    replace_snapshot(built_dir, snapshot_dir, inputs_hash)
+    assert os.path.isdir(built_dir)
+    assert snapshot_matches(snapshot_dir, inputs_hash)
+
+    # runs building the same snapshot in parallel
+    parallel_dir = str(tmp_path / "parallel" / "snapshot")
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(simulate_prefix, parallel_dir, *args, **model_kwargs)
+            for _ in range(2)
+        ]
+        for future in futures:
+            future.result()
+    assert snapshot_matches(parallel_dir, inputs_hash)
+    assert os.listdir(str(tmp_path / "parallel")) == ["snapshot"]
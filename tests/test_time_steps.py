@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from pandemic.time_steps import (
+    NEVER_INFECTIVE,
+    create_calendar,
+    date_list_from_files,
+    infective_months,
+    lag_to_months,
+    month_to_time_step,
+    time_step_to_month,
+)
+
+
+def test_date_list_from_files():
+    file_list = [
+        "trade/HS0602_trades_201002.csv",
+        "trade/HS0602_trades_201001.csv",
+        "forecast/HS0602_trades_201001.csv",
+    ]
+    assert date_list_from_files(file_list) == ["201001", "201002"]
+
+
+def test_time_step_months():
+    assert time_step_to_month("201001") == 2010 * 12
+    assert time_step_to_month("201012") == 2010 * 12 + 11
+    assert time_step_to_month("2010") == 2010 * 12
+    assert month_to_time_step(time_step_to_month("201107"), monthly=True) == "201107"
+    assert month_to_time_step(time_step_to_month("2011"), monthly=False) == "2011"
+    # annual time steps are infective from the next year when a lag ends
+    # within the year
+    assert month_to_time_step(2011 * 12 + 6, monthly=False) == "2012"
+
+    assert np.array_equal(
+        np.diff(create_calendar(["201011", "201012", "201101"])), [1, 1]
+    )
+    assert list(infective_months(["201003", None])) == [
+        2010 * 12 + 2,
+        NEVER_INFECTIVE,
+    ]
+
+
+def test_lag_to_months():
+    assert lag_to_months(2, "year") == 24
+    assert lag_to_months(2, "years") == 24
+    assert lag_to_months(18, "months") == 18
+    assert lag_to_months(2, None) == 24
+    assert (
+        month_to_time_step(
+            time_step_to_month("201008") + lag_to_months(6, "month"), monthly=True
+        )
+        == "201102"
+    )
+    with pytest.raises(ValueError):
+        lag_to_months(1, "week")
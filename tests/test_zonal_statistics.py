@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+from pandemic.zonal_statistics import (
+    categorical_counts,
+    host_percent_area,
+    koppen_percent_area,
+)
+
+
+def test_categorical_counts():
+    labels = np.array([[1, 1, 2], [1, 2, 2], [0, 2, 0]])
+    raster = np.array([[1, 2, 2], [np.nan, 1, 1], [3, 0, 1]])
+    mask = np.array([[1, 1, 1], [1, 1, 0], [1, 1, 1]])
+
+    counts = categorical_counts(labels, raster, 2, mask=mask, block_rows=1)
+
+    assert counts.tolist() == [[0, 1, 1], [1, 1, 1]]
+
+
+def test_percent_area():
+    counts = pd.DataFrame([[2, 1, 1], [0, 0, 0]], index=["USA", "CHN"])
+
+    koppen_df = koppen_percent_area(counts, ["Af", "Am", "Aw"])
+    host_area = host_percent_area(counts)
+
+    assert koppen_df.loc["USA"].tolist() == [0.25, 0.25, 0.0]
+    assert koppen_df.loc["CHN"].tolist() == [0.0, 0.0, 0.0]
+    assert host_area.tolist() == [1 / 3, 0.0]